@@ -0,0 +1,135 @@
+from collections import deque
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_MAX_BATCH_SIZE = 40
+# A batch slower or larger than this shrinks the next batches
+TARGET_LATENCY_SECONDS = 10.0
+MAX_PAYLOAD_BYTES = 1024 * 1024
+
+
+class AdaptiveBatcher:
+    """
+    Hand out batches of course IDs for one term and adjust their size from feedback.
+
+    While batches come back faster than TARGET_LATENCY_SECONDS and smaller than
+    MAX_PAYLOAD_BYTES the batch size grows by half, up to max_size; a batch over
+    either limit halves it. A batch that fails or times out is split in half and
+    both halves are retried, down to single courses, so one bad course cannot
+    take nine others with it. With adaptive=False the size stays fixed but
+    failed batches are still split.
+    """
+
+    def __init__(
+        self,
+        course_ids,
+        initial_size=DEFAULT_BATCH_SIZE,
+        max_size=DEFAULT_MAX_BATCH_SIZE,
+        adaptive=True,
+        target_latency=TARGET_LATENCY_SECONDS,
+        max_payload_bytes=MAX_PAYLOAD_BYTES,
+    ):
+        self.pending = deque(course_ids)
+        self.retries = deque()
+        self.size = max(1, initial_size)
+        self.max_size = max(self.size, max_size) if adaptive else self.size
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.lost = []
+        self.history = []
+
+    def has_work(self):
+        return bool(self.retries or self.pending)
+
+    def next_batch(self):
+        """
+        Return the next list of course IDs to request, retried splits first
+        """
+        if self.retries:
+            return self.retries.popleft()
+        count = min(self.size, len(self.pending))
+        return [self.pending.popleft() for _ in range(count)]
+
+    def unfinished(self):
+        """
+        Return the course IDs that were given up or never handed out
+        """
+        unfinished = list(self.lost)
+        for batch in self.retries:
+            unfinished.extend(batch)
+        unfinished.extend(self.pending)
+        return unfinished
+
+    def record_success(self, batch, latency, payload_bytes):
+        """
+        Record a successful batch and grow or shrink the batch size
+
+        Args:
+            batch: Course IDs in the batch
+            latency: Request time in seconds
+            payload_bytes: Size of the response body
+        """
+        self.history.append(
+            {
+                "size": len(batch),
+                "latency": latency,
+                "bytes": payload_bytes,
+                "status": "ok",
+            }
+        )
+        if not self.adaptive:
+            return
+
+        if latency > self.target_latency or payload_bytes > self.max_payload_bytes:
+            self.size = max(1, len(batch) // 2)
+        elif len(batch) >= self.size:
+            # Only grow from batches that were actually full-sized
+            self.size = min(self.max_size, self.size + max(1, self.size // 2))
+
+    def record_failure(self, batch, latency, status, splittable=True):
+        """
+        Record a failed batch; split it for retry or give its courses up
+
+        Args:
+            batch: Course IDs in the batch
+            latency: Request time in seconds
+            status: HTTP status code or a short error description
+            splittable: False for failures a smaller batch cannot fix, such as
+                an expired token
+        """
+        self.history.append(
+            {
+                "size": len(batch),
+                "latency": latency,
+                "bytes": 0,
+                "status": str(status),
+            }
+        )
+        if splittable and len(batch) > 1:
+            half = len(batch) // 2
+            self.retries.append(batch[:half])
+            self.retries.append(batch[half:])
+            if self.adaptive:
+                self.size = max(1, min(self.size, half))
+        else:
+            self.lost.extend(batch)
+
+    def report(self, label):
+        """
+        Print the sizes and timings of every batch handed out so far
+        """
+        print(f"\nBatches for {label}:")
+        print(f"  {'#':>3}  {'size':>4}  {'latency':>8}  {'KB':>8}  status")
+        for number, entry in enumerate(self.history, start=1):
+            print(
+                f"  {number:>3}  {entry['size']:>4}  {entry['latency']:>7.2f}s  "
+                f"{entry['bytes'] / 1024:>8.1f}  {entry['status']}"
+            )
+        sizes = [entry["size"] for entry in self.history if entry["status"] == "ok"]
+        if sizes:
+            print(
+                f"  Requests: {len(self.history)}, batch sizes {min(sizes)}-{max(sizes)}, "
+                f"final size {self.size}"
+            )
+        if self.lost:
+            print(f"  Courses that could not be fetched: {', '.join(map(str, self.lost))}")
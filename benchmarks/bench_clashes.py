@@ -0,0 +1,71 @@
+"""
+Compare the sort-and-sweep clash search with pairwise comparison.
+
+Usage: python benchmarks/bench_clashes.py [copies ...]
+
+The class occurrences of every term are copied `copies` times, each copy
+shifted by whole weeks so the copies behave like further weeks or terms of
+history. Both searches must find the same room and instructor clashes.
+"""
+import glob
+import itertools
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timetable_clashes import find_clashes, load_occurrences
+
+
+def shifted(occurrences, copies):
+    result = []
+    for week in range(copies):
+        offset = timedelta(weeks=week)
+        for occurrence in occurrences:
+            copy = dict(occurrence)
+            copy["start"] = (datetime.fromisoformat(occurrence["start"]) + offset).isoformat()
+            copy["end"] = (datetime.fromisoformat(occurrence["end"]) + offset).isoformat()
+            result.append(copy)
+    return result
+
+
+def pairwise_clashes(occurrences):
+    rooms = instructors = 0
+    for first, second in itertools.combinations(occurrences, 2):
+        if first["start"] >= second["end"] or second["start"] >= first["end"]:
+            continue
+        if first["room"] and first["room"] == second["room"] and first["room"].upper() != "ONLINE":
+            rooms += 1
+        instructors += len(set(first["instructors"]) & set(second["instructors"]))
+    return rooms, instructors
+
+
+def main():
+    copies_list = [int(value) for value in sys.argv[1:]] or [1, 4, 16]
+    root = os.path.join(os.path.dirname(__file__), "..", "course_timetables")
+    occurrences = load_occurrences(sorted(glob.glob(os.path.join(root, "term_*"))))
+
+    print(f"  {'occurrences':>11} {'pairwise ms':>12} {'sweep ms':>9} {'speedup':>8}")
+    for copies in copies_list:
+        data = shifted(occurrences, copies)
+
+        started = time.perf_counter()
+        expected = pairwise_clashes(data)
+        pairwise_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        report = find_clashes(data)
+        sweep_seconds = time.perf_counter() - started
+
+        found = tuple(sum(len(c) for c in report[kind].values()) for kind in ("rooms", "instructors"))
+        assert found == expected, f"sweep found {found}, pairwise {expected}"
+        print(
+            f"  {len(data):>11} {pairwise_seconds * 1000:>12.1f} {sweep_seconds * 1000:>9.1f} "
+            f"{pairwise_seconds / sweep_seconds:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Crawl a local mock portal end to end and time every stage of the pipeline.
+
+Usage: python benchmarks/bench_end_to_end.py [--courses N] [--terms N] [--workers N]
+       [--latency S] [--error-rate R] [--throttle-rate R] [--charts]
+
+A mock_campusnexus.py server with synthetic data is started in-process and
+fetch_all_timetables.py crawls it into a temporary data directory. The report
+lists the crawl wall time, requests per second and bytes received and
+written, then the parse and analysis time of the heatmap stage and the time
+of the course summary stage on the crawled files. Without injected errors the
+crawl must end up with every synthetic event and course.
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fetch_all_timetables
+from course_catalogue import SUMMARY_FILE_NAME, build_catalogue, load_course_lookup, terms_from_directories
+from mock_campusnexus import MockSettings, start_server
+from timetable_events import iter_events
+from timetable_heatmap import aggregate_class_hours, find_batch_files, save_charts
+
+
+def directory_size(path):
+    files = total = 0
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            files += 1
+            total += os.path.getsize(os.path.join(root, file_name))
+    return files, total
+
+
+@contextlib.contextmanager
+def quiet():
+    # The crawler and the analysis stages print a line per batch or chunk
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, default=2, help="Current terms on the mock portal")
+    parser.add_argument("--courses", type=int, default=300, help="Courses per term")
+    parser.add_argument("--weeks", type=int, default=12, help="Teaching weeks per term")
+    parser.add_argument("--workers", type=int, default=4, help="Crawler --workers")
+    parser.add_argument("--batch-size", type=int, default=None, help="Crawler --batch-size")
+    parser.add_argument("--adaptive", action="store_true", help="Crawler --adaptive")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many random extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic data and failure draws")
+    parser.add_argument("--charts", action="store_true", help="Also time rendering the heatmap charts")
+    parser.add_argument("--keep", action="store_true", help="Keep the crawled data directory")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        terms=args.terms,
+        courses=args.courses,
+        weeks=args.weeks,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    server = start_server(settings)
+    data_dir = tempfile.mkdtemp(prefix="timetable_bench_")
+    crawl_args = [
+        "--api-url", server.base_url,
+        "--data-dir", data_dir,
+        "--token", "mock",
+        "--all-terms",
+        "--workers", str(args.workers),
+    ]
+    if args.batch_size:
+        crawl_args += ["--batch-size", str(args.batch_size)]
+    if args.adaptive:
+        crawl_args.append("--adaptive")
+
+    try:
+        with quiet():
+            crawl_seconds, exit_code = timed(fetch_all_timetables.main, crawl_args)
+        if exit_code:
+            # Failures on the term list are not retried by the crawler
+            print(f"Crawl failed with exit code {exit_code} after {server.stats.requests} requests "
+                  f"(statuses: {server.stats.statuses}); try another --seed")
+            return exit_code
+        timetables_dir = os.path.join(data_dir, "course_timetables")
+        files, written = directory_size(data_dir)
+        stats = server.stats
+        print(f"Mock portal: {args.terms} terms x {args.courses} courses, {args.latency * 1000:.0f} ms latency")
+        print("\n=== Crawl ===")
+        print(f"  Wall time:      {crawl_seconds:.2f} s")
+        print(f"  Requests:       {stats.requests} ({stats.requests / crawl_seconds:.1f} req/s)")
+        print(f"  Statuses:       {dict(sorted(stats.statuses.items()))}")
+        print(f"  Bytes received: {stats.bytes_sent / 1024:.0f} KB")
+        print(f"  Bytes written:  {written / 1024:.0f} KB in {files} files")
+
+        batch_files = find_batch_files(timetables_dir)
+        summary_file = os.path.join(data_dir, SUMMARY_FILE_NAME)
+        with quiet():
+            parse_seconds, events = timed(lambda: list(iter_events(batch_files)))
+            lookup_seconds, course_lookup = timed(load_course_lookup, summary_file)
+            analysis_seconds, aggregates = timed(aggregate_class_hours, events, course_lookup)
+            if args.charts:
+                chart_dir = os.path.join(data_dir, "charts")
+                os.makedirs(chart_dir)
+                chart_seconds, _ = timed(save_charts, aggregates, chart_dir)
+        print("\n=== Heatmap stage ===")
+        print(f"  Parse:          {parse_seconds * 1000:.0f} ms ({len(batch_files)} batch files, {len(events)} events)")
+        print(f"  Course lookup:  {lookup_seconds * 1000:.0f} ms")
+        print(f"  Analysis:       {analysis_seconds * 1000:.0f} ms ({int(aggregates['counts'].sum())} class hours)")
+        if args.charts:
+            print(f"  Charts:         {chart_seconds * 1000:.0f} ms")
+
+        terms = terms_from_directories(timetables_dir)
+        with quiet():
+            summary_seconds, catalogue = timed(build_catalogue, os.path.join(data_dir, "api_data"), terms)
+        print("\n=== Summary stage ===")
+        print(f"  Build:          {summary_seconds * 1000:.0f} ms ({catalogue['total_courses']} courses)")
+
+        if not args.error_rate:
+            crawled = {term["id"] for term in terms}
+            expected_events = server.catalogue.event_count(crawled)
+            assert len(events) == expected_events, f"crawled {len(events)} events, expected {expected_events}"
+            assert catalogue["total_courses"] == args.terms * args.courses, "course summary is incomplete"
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"\nCrawled data kept in {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
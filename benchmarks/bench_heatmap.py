@@ -0,0 +1,105 @@
+"""
+Compare the per-event heatmap aggregation with the vectorised one.
+
+Usage: python benchmarks/bench_heatmap.py [copies]
+
+Both paths aggregate every batch file under course_timetables/term_* into
+the day x hour matrix. The per-event path is the original loop: three
+strptime calls and one dict per class hour, a pivot table and a per-cell
+.at[] fill. The event list can be repeated `copies` times to see how the
+two scale with a larger tree. File reading is timed separately so only the
+aggregation is compared.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timetable_events import extract_course_code, iter_events
+from timetable_heatmap import (
+    DAYS_ORDER,
+    HOURS_RANGE,
+    aggregate_class_hours,
+    build_heatmap_matrix,
+    find_batch_files,
+    timetables_dir,
+)
+
+REPEATS = 5
+
+
+def per_event_heatmap(events):
+    classes = []
+    for event in events:
+        event_date = datetime.strptime(event['EventDate'], '%Y-%m-%dT%H:%M:%S')
+        event_start = datetime.strptime(event['EventStartTime'], '%Y-%m-%dT%H:%M:%S')
+        event_end = datetime.strptime(event['EventEndTime'], '%Y-%m-%dT%H:%M:%S')
+        course_code = event.get('CourseCode') or extract_course_code(event['EventDescription']) or 'Unknown'
+        for hour in range(event_start.hour, event_end.hour + 1):
+            classes.append({
+                'Day': event_date.strftime('%A'),
+                'Hour': hour,
+                'CourseCode': course_code,
+                'Description': event['EventDescription'],
+            })
+
+    df = pd.DataFrame(classes)
+    heatmap_data = pd.pivot_table(
+        df, values='CourseCode', index='Hour', columns='Day', aggfunc='count', fill_value=0
+    ).reindex(columns=DAYS_ORDER)
+    complete_heatmap = pd.DataFrame(index=HOURS_RANGE, columns=DAYS_ORDER, data=0)
+    for hour in heatmap_data.index:
+        for day in heatmap_data.columns:
+            if hour in complete_heatmap.index:
+                complete_heatmap.at[hour, day] = heatmap_data.at[hour, day]
+    return complete_heatmap.fillna(0).astype(int)
+
+
+def vectorised_heatmap(events):
+    aggregates = aggregate_class_hours(events, {}, chunk_size=len(events))
+    return build_heatmap_matrix(aggregates['counts'])
+
+
+def time_run(function, events):
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = function(events)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    batch_files = find_batch_files(timetables_dir)
+
+    started = time.perf_counter()
+    events = list(iter_events(batch_files))
+    read_seconds = time.perf_counter() - started
+    events = events * copies
+    print(f"{len(batch_files)} batch files, {len(events)} events (read in {read_seconds * 1000:.0f} ms)")
+
+    per_event_seconds, expected = time_run(per_event_heatmap, events)
+    # Silence the per-chunk progress lines of the vectorised path
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        vectorised_seconds, result = time_run(vectorised_heatmap, events)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    assert result.equals(expected), "vectorised heatmap differs from the per-event one"
+    print(f"  {'path':<12} {'ms':>9}")
+    print(f"  {'per-event':<12} {per_event_seconds * 1000:>9.1f}")
+    print(f"  {'vectorised':<12} {vectorised_seconds * 1000:>9.1f}")
+    print(f"  Speedup: {per_event_seconds / vectorised_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
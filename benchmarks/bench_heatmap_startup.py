@@ -0,0 +1,91 @@
+"""
+Time each output path of timetable_heatmap.py from a fresh interpreter.
+
+Usage: python benchmarks/bench_heatmap_startup.py [--repeats 3]
+
+Every path runs in a new Python process, the way the CLI is started, with
+the aggregate store already up to date. For each path the best wall time of
+`repeats` runs is printed, together with the time spent importing
+timetable_heatmap and which of pandas, numpy, matplotlib and seaborn ended
+up loaded. Charts and data files go to a temporary directory. The import
+and data-only paths must not load any of the four libraries.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn")
+
+# name, CLI arguments (None: only import the module)
+PATHS = (
+    ("import", None),
+    ("summary", ["summary"]),
+    ("data-only", ["--data-only"]),
+    ("heatmap", ["heatmap"]),
+    ("all charts", []),
+)
+DATA_ONLY_PATHS = ("import", "summary", "data-only")
+
+CHILD_SCRIPT = """
+import contextlib, io, json, sys, time
+started = time.perf_counter()
+import timetable_heatmap
+imported = time.perf_counter()
+arguments = json.loads(sys.argv[1])
+if arguments is not None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        timetable_heatmap.main(arguments)
+print(json.dumps({
+    "import_seconds": imported - started,
+    "modules": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def run_path(arguments, output_dir):
+    if arguments is not None:
+        arguments = arguments + ["--output-dir", output_dir]
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, json.dumps(arguments), json.dumps(HEAVY_MODULES)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per path; the best is reported")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Bring heatmap_aggregates.json up to date so no path reads batch files
+        run_path(["summary"], output_dir)
+
+        print(f"  {'path':<12} {'wall ms':>8} {'import ms':>10}  loaded")
+        for name, arguments in PATHS:
+            best = None
+            for _ in range(args.repeats):
+                elapsed, result = run_path(arguments, output_dir)
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, result)
+            elapsed, result = best
+            if name in DATA_ONLY_PATHS:
+                assert not result["modules"], f"{name} loaded {', '.join(result['modules'])}"
+            print(
+                f"  {name:<12} {elapsed * 1000:>8.0f} {result['import_seconds'] * 1000:>10.0f}  "
+                f"{', '.join(result['modules']) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Time parsing event descriptions into structured fields and check the dates.
+
+Usage: python benchmarks/bench_normalise.py [--courses N] [--repeats 3]
+
+The synthetic events of a mock_campusnexus.py term starting in November run
+into January, so their MM/DD date ranges cross New Year. Every normalised
+event must fall inside a date range of the room it was given, and a class
+moving rooms over New Year must get the room of its own date. The best time
+of `repeats` passes over fresh copies of the events is printed.
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mock_campusnexus import MockSettings, build_course_events, build_courses, build_terms
+from timetable_events import normalise_event, parse_date_ranges
+
+# A term that starts in November and ends in the following year
+TERM_MONTH = date(2025, 11, 1)
+
+
+def check_year_boundary():
+    # Events in January and in December of a range crossing New Year
+    expected = [{"Start": "2025-11-17", "End": "2026-01-30"}]
+    assert parse_date_ranges("11/17 to 01/30", 2026, 1) == expected, "January event of a range crossing New Year"
+    assert parse_date_ranges("11/17 to 01/30", 2025, 12) == expected, "December event of a range crossing New Year"
+    assert parse_date_ranges("01/05 to 01/30", 2026, 1) == [{"Start": "2026-01-05", "End": "2026-01-30"}]
+
+    event = {
+        "EventDate": "2026-01-12T00:00:00",
+        "EventDescription": "COS10001 - LE1 - 01, Melinda Kong; G401 - 11/17 to 12/15; EN506 - 12/29 to 01/26",
+    }
+    assert normalise_event(event), "description did not parse"
+    assert event["Room"] == "EN506", f"January class in {event['Room']} instead of EN506"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=300, help="Courses in the mock term")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the events; the best is reported")
+    args = parser.parse_args(argv)
+
+    check_year_boundary()
+
+    settings = MockSettings(terms=1, courses=args.courses)
+    term = build_terms(settings, TERM_MONTH)[1]
+    events = [
+        event
+        for course in build_courses(settings, term)
+        for event in build_course_events(settings, term, course)
+    ]
+    years = sorted({event["EventDate"][:4] for event in events})
+    assert len(years) > 1, f"the mock term does not cross New Year: {years}"
+
+    best = None
+    for _ in range(args.repeats):
+        batch = copy.deepcopy(events)
+        started = time.perf_counter()
+        for event in batch:
+            normalise_event(event)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    for event in batch:
+        day = event["EventDate"][:10]
+        ranges = [r for location in event["Locations"] if location["Room"] == event["Room"] for r in location["DateRanges"]]
+        assert any(r["Start"] <= day <= r["End"] for r in ranges), (
+            f"{day} is outside the dates of {event['Room']}: {event['EventDescription']}"
+        )
+
+    print(f"{len(events)} events from {term['start']} to {max(event['EventDate'][:10] for event in events)}")
+    print(f"  Normalise: {best * 1000:.0f} ms ({len(events) / best:,.0f} events/s)")
+    print("  Every event falls inside the dates of its room")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
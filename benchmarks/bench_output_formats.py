@@ -0,0 +1,89 @@
+"""
+Compare the size and load time of the timetable JSON output formats.
+
+Usage: python benchmarks/bench_output_formats.py [term_dir ...]
+
+For every term directory the batch files are measured as they are written
+today (indent=4), minified, minified + gzip/brotli, and as the columnar
+bundle. Load time is the time to turn the bytes back into Python events,
+including decompression and bundle or recurrence expansion.
+"""
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timetable_bundle import build_columnar_bundle, load_columnar_bundle, read_term_events
+from timetable_recurrence import compact_events, expand_events
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPEATS = 20
+
+
+def time_load(loader, payload):
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        loader(payload)
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def measure(events):
+    data = {"DataList": events}
+    indented = json.dumps(data, indent=4).encode("utf-8")
+    minified = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    bundle = json.dumps(build_columnar_bundle(events), separators=(",", ":")).encode("utf-8")
+    weekly = json.dumps(compact_events(events), separators=(",", ":")).encode("utf-8")
+
+    formats = [
+        ("indent=4 (current)", indented, lambda b: json.loads(b)["DataList"]),
+        ("minified", minified, lambda b: json.loads(b)["DataList"]),
+        ("minified + gzip", gzip.compress(minified, 9), lambda b: json.loads(gzip.decompress(b))["DataList"]),
+    ]
+    if brotli is not None:
+        formats.append(
+            ("minified + brotli", brotli.compress(minified, quality=11), lambda b: json.loads(brotli.decompress(b))["DataList"])
+        )
+    formats += [
+        ("columnar bundle", bundle, lambda b: load_columnar_bundle(json.loads(b))),
+        ("columnar bundle + gzip", gzip.compress(bundle, 9), lambda b: load_columnar_bundle(json.loads(gzip.decompress(b)))),
+        ("weekly recurrences", weekly, lambda b: expand_events(json.loads(b))),
+        ("weekly recurrences + gzip", gzip.compress(weekly, 9), lambda b: expand_events(json.loads(gzip.decompress(b)))),
+    ]
+
+    for name, payload, loader in formats:
+        assert loader(payload) == events, name
+    return [(name, len(payload), time_load(loader, payload)) for name, payload, loader in formats]
+
+
+def report(rows):
+    baseline = rows[0][1]
+    print(f"  {'format':<26} {'bytes':>10} {'ratio':>7} {'load ms':>9}")
+    for name, size, load_ms in rows:
+        print(f"  {name:<26} {size:>10} {size / baseline:>6.0%} {load_ms:>9.2f}")
+
+
+def main():
+    root = os.path.join(os.path.dirname(__file__), "..", "course_timetables")
+    term_dirs = sys.argv[1:] or sorted(glob.glob(os.path.join(root, "term_*")))
+
+    all_events = []
+    for term_dir in term_dirs:
+        events = read_term_events(term_dir)
+        all_events.extend(events)
+        print(f"\n{os.path.basename(term_dir)}: {len(events)} events")
+        report(measure(events))
+
+    print(f"\nAll terms: {len(all_events)} events")
+    report(measure(all_events))
+
+
+if __name__ == "__main__":
+    main()
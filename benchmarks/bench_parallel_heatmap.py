@@ -0,0 +1,117 @@
+"""
+Time the heatmap analytics serially and on process pools of growing size.
+
+Usage: python benchmarks/bench_parallel_heatmap.py [--workers 1 2 4] [--per-term]
+
+Every run aggregates all batch files under course_timetables/term_* from
+scratch into in-memory aggregates (no heatmap_aggregates.json is read or
+written) and draws the combined chart set, plus one set per term with
+--per-term, into a temporary directory. Runs on a pool must produce the same
+totals and byte-identical PNG files as the serial run. The speedup is
+bounded by the number of cores, which is printed first.
+"""
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from course_catalogue import load_course_lookup
+from timetable_heatmap import (
+    CHARTS,
+    HeatmapAggregates,
+    course_summary_file,
+    draw_charts,
+    find_batch_files,
+    report_charts,
+    timetables_dir,
+)
+
+
+def run(workers, batch_files, course_lookup, output_dir, per_term):
+    """
+    Returns:
+        Tuple of (aggregation seconds, drawing seconds, aggregates)
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if executor:
+            # Start the workers before timing, as a long-running pool would have
+            list(executor.map(abs, range(workers)))
+
+        started = time.perf_counter()
+        store = HeatmapAggregates()
+        store.update(batch_files, timetables_dir, course_lookup, executor)
+        aggregates = store.to_aggregates()
+        aggregate_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        chart_sets = [draw_charts(aggregates, output_dir, executor)]
+        if per_term:
+            for term_name, term_store in store.term_aggregates().items():
+                chart_sets.append(draw_charts(term_store.to_aggregates(), os.path.join(output_dir, term_name), executor))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for results in chart_sets:
+                report_charts(results)
+        draw_seconds = time.perf_counter() - started
+    finally:
+        if executor:
+            executor.shutdown()
+    return aggregate_seconds, draw_seconds, aggregates
+
+
+def chart_files(output_dir):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), output_dir)
+        for root, _, names in os.walk(output_dir)
+        for name in names
+        if name in {file_name for _, file_name, _, _ in CHARTS}
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Pool sizes to time (1 = serial)")
+    parser.add_argument("--per-term", action="store_true", help="Also draw a chart set per term")
+    args = parser.parse_args(argv)
+
+    course_lookup = load_course_lookup(course_summary_file)
+    batch_files = find_batch_files(timetables_dir)
+    print(f"{len(batch_files)} batch files, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        serial_dir = os.path.join(temp_dir, "serial")
+        serial_aggregate, serial_draw, expected = run(1, batch_files, course_lookup, serial_dir, args.per_term)
+        expected_files = chart_files(serial_dir)
+
+        print(f"  {'workers':>7} {'aggregate s':>11} {'draw s':>8} {'total s':>8} {'speedup':>8}")
+        print(f"  {1:>7} {serial_aggregate:>11.2f} {serial_draw:>8.2f} {serial_aggregate + serial_draw:>8.2f} {1.0:>7.2f}x")
+        for workers in args.workers:
+            if workers <= 1:
+                continue
+            output_dir = os.path.join(temp_dir, f"workers_{workers}")
+            aggregate_seconds, draw_seconds, aggregates = run(
+                workers, batch_files, course_lookup, output_dir, args.per_term
+            )
+
+            assert aggregates['counts'].equals(expected['counts']), "class hour counts differ from the serial run"
+            assert aggregates['course_hours'].equals(expected['course_hours']), "course hours differ from the serial run"
+            assert aggregates['descriptions'] == expected['descriptions'], "descriptions differ from the serial run"
+            assert chart_files(output_dir) == expected_files, "chart files differ from the serial run"
+            _, mismatch, errors = filecmp.cmpfiles(serial_dir, output_dir, expected_files, shallow=False)
+            assert not mismatch and not errors, f"charts differ from the serial run: {mismatch + errors}"
+
+            total = aggregate_seconds + draw_seconds
+            speedup = (serial_aggregate + serial_draw) / total
+            print(f"  {workers:>7} {aggregate_seconds:>11.2f} {draw_seconds:>8.2f} {total:>8.2f} {speedup:>7.2f}x")
+        print(f"  {len(expected_files)} charts per run, identical to the serial run")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
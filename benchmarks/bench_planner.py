@@ -0,0 +1,66 @@
+"""
+Time the group selection solver on generated worst-case timetables.
+
+Usage: python benchmarks/bench_planner.py [groups_per_type]
+
+Every generated course has a 1.5 hour lecture and tutorial and lab choices
+with `groups_per_type` groups each (8 by default), placed at random on
+weekdays between 8:00 and 21:00. Lectures never clash with each other, so
+each run has to search the tutorial and lab combinations.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timetable_planner import SLOTS_PER_DAY, find_selections
+
+SEEDS = range(5)
+
+
+def slots(day, hour, length):
+    return ((1 << length) - 1) << (day * SLOTS_PER_DAY + hour * 2)
+
+
+def generate(course_count, groups_per_type, seed):
+    random.seed(seed)
+    courses = {}
+    lectures = 0
+    for number in range(course_count):
+        while True:
+            lecture = slots(random.randrange(5), random.randrange(8, 18), 3)
+            if not lectures & lecture:
+                lectures |= lecture
+                break
+        choices = {
+            kind: {
+                f"{kind}1-{group:02d}": slots(random.randrange(5), random.randrange(8, 19), random.choice([2, 4]))
+                for group in range(1, groups_per_type + 1)
+            }
+            for kind in ("TU", "LA")
+        }
+        courses[f"C{number:03d}_1"] = (lecture, choices)
+    return courses
+
+
+def main():
+    groups_per_type = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"  {'courses':>7} {'mode':<10} {'worst ms':>9} {'mean ms':>8}")
+    for course_count in (6, 8):
+        for rank in (None, "days", "early"):
+            timings = []
+            for seed in SEEDS:
+                courses = generate(course_count, groups_per_type, seed)
+                started = time.perf_counter()
+                find_selections(courses, limit=20, rank=rank)
+                timings.append(time.perf_counter() - started)
+            print(
+                f"  {course_count:>7} {rank or 'unranked':<10} "
+                f"{max(timings) * 1000:>9.2f} {sum(timings) / len(timings) * 1000:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Re-crawl a local mock portal with changing batch layouts and check the totals.
+
+Usage: python benchmarks/bench_recrawl.py [--courses N] [--batch-size N] [--workers N]
+
+A mock_campusnexus.py server with unchanged synthetic data is crawled into
+the same temporary data directory several times: with fixed batches, with
+--adaptive sizing, with forced splits, and with one course that always fails
+and is given up. Every run renumbers the batches, so batch files from earlier
+runs must not stay behind next to the new ones. After each run the batch
+files of every term must hold each synthetic event exactly once, including
+the previous events of the lost course. Every run passes --changes, and
+as nothing changes on the portal no run may add an entry to the change
+feed. The wall time of each crawl is printed.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fetch_all_timetables
+from mock_campusnexus import MockSettings, start_server
+from timetable_diff import CHANGE_FEED_FILE_NAME
+from timetable_events import iter_events
+from timetable_heatmap import find_batch_files
+
+
+def crawl(settings, data_dir, crawl_args):
+    server = start_server(settings)
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            exit_code = fetch_all_timetables.main([
+                "--api-url", server.base_url,
+                "--data-dir", data_dir,
+                "--token", "mock",
+                "--all-terms",
+            ] + crawl_args)
+        return time.perf_counter() - started, exit_code, server.catalogue.event_count()
+    finally:
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=60, help="Courses per term")
+    parser.add_argument("--batch-size", type=int, default=10, help="Crawler --batch-size")
+    parser.add_argument("--workers", type=int, default=2, help="Crawler --workers")
+    args = parser.parse_args(argv)
+
+    # The first course of the first term; the mock numbers courses term ID * 10000 + n
+    lost_course = 401 * 10000 + 1
+    runs = (
+        ("fixed batches", {}, []),
+        ("adaptive", {}, ["--adaptive"]),
+        ("forced splits", {"max_batch_courses": max(1, args.batch_size // 2)}, []),
+        ("lost course", {"failing_courses": [lost_course]}, []),
+        ("lost course again", {"failing_courses": [lost_course]}, ["--adaptive"]),
+        ("fixed batches", {}, []),
+    )
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        timetables_dir = os.path.join(data_dir, "course_timetables")
+        feed_file = os.path.join(timetables_dir, CHANGE_FEED_FILE_NAME)
+        print(f"  {'run':<18} {'wall s':>7} {'files':>6} {'events':>7}")
+        for name, mock_options, crawl_args in runs:
+            settings = MockSettings(courses=args.courses, **mock_options)
+            seconds, exit_code, expected = crawl(
+                settings,
+                data_dir,
+                ["--batch-size", str(args.batch_size), "--workers", str(args.workers), "--changes"] + crawl_args,
+            )
+            # The crawler exits with 1 when courses were not fetched
+            expected_exit_code = 1 if settings.failing_courses else 0
+            assert exit_code == expected_exit_code, f"{name}: crawl exited with {exit_code}"
+
+            batch_files = find_batch_files(timetables_dir)
+            events = [json.dumps(event, sort_keys=True) for event in iter_events(batch_files)]
+            assert len(events) == len(set(events)), (
+                f"{name}: {len(events) - len(set(events))} events are in more than one batch file"
+            )
+            assert len(events) == expected, f"{name}: {len(events)} events, expected {expected}"
+            assert not os.path.exists(feed_file), f"{name}: change feed entry for an unchanged portal"
+            print(f"  {name:<18} {seconds:>7.2f} {len(batch_files):>6} {len(events):>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import json
+import os
+
+from course_search_index import write_search_index
+from snapshot_store import SNAPSHOT_FILE_PATTERN, SnapshotStore
+from timetable_output import write_json
+
+SUMMARY_FILE_NAME = "course_summary.json"
+
+
+def index_latest_snapshots(api_data_dir):
+    """
+    Find the most recent course list snapshot of every term in the snapshot
+    store index, and in courses_term_*.json files written before the store
+    existed, with a single directory scan
+
+    Args:
+        api_data_dir: Directory holding the snapshot store
+
+    Returns:
+        Dictionary of term ID to the path of its latest snapshot, relative
+        to api_data_dir
+    """
+    if not os.path.isdir(api_data_dir):
+        return {}
+    latest = SnapshotStore(api_data_dir).latest_course_lists()
+    for file_name in os.listdir(api_data_dir):
+        match = SNAPSHOT_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        term_id = int(match.group(1))
+        # The timestamp sorts chronologically, so the largest one is the latest
+        if term_id not in latest or match.group(2) > latest[term_id][0]:
+            latest[term_id] = (match.group(2), file_name)
+    return {term_id: path for term_id, (_, path) in latest.items()}
+
+
+def terms_from_directories(output_dir):
+    """
+    Rebuild the term list from the term_{id}_{code} directory names
+
+    Args:
+        output_dir: The course_timetables directory
+
+    Returns:
+        List of term dictionaries with id, code and name
+    """
+    terms = []
+    for term_dir in sorted(os.listdir(output_dir)):
+        if not term_dir.startswith("term_") or not os.path.isdir(os.path.join(output_dir, term_dir)):
+            continue
+        parts = term_dir.split("_", 2)
+        if len(parts) >= 3:
+            terms.append({
+                "id": int(parts[1]),
+                "code": parts[2],
+                "name": parts[2].replace("_", " ").upper()
+            })
+    return terms
+
+
+def build_catalogue(api_data_dir, terms):
+    """
+    Build the course catalogue of the given terms from their latest snapshots
+
+    Besides the flat course list and the code -> terms mapping the summary has
+    always had, the catalogue carries the lookup maps the pipeline needs:
+    course ID -> code and term ID -> course codes.
+
+    Args:
+        api_data_dir: Directory holding the courses_term_*.json snapshots
+        terms: List of term dictionaries to include
+
+    Returns:
+        Catalogue dictionary, written out as course_summary.json
+    """
+    latest_snapshots = index_latest_snapshots(api_data_dir)
+    all_courses = []
+    term_course_mappings = {}
+    course_codes = {}
+    term_courses = {}
+
+    for term in terms:
+        term_id = term["id"]
+        term_name = term["name"]
+        term_courses[str(term_id)] = []
+
+        latest_file = latest_snapshots.get(term_id)
+        if not latest_file:
+            print(f"  No course data found for term {term_name}")
+            continue
+        file_path = os.path.join(api_data_dir, latest_file)
+
+        print(f"  Loading course data for term {term_name} from {latest_file}")
+        try:
+            with open(file_path, 'r') as f:
+                course_data = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"  Error loading course data from {file_path}: {str(e)}")
+            continue
+
+        for course in course_data.get("DataList") or []:
+            # Create a course summary object with essential information
+            all_courses.append({
+                "id": course["CourseID"],
+                "code": course["CourseCode"],
+                "name": course["CourseDescription"],
+                "term_id": term_id,
+                "term_name": term_name,
+                "term_code": term["code"]
+            })
+
+            course_codes[str(course["CourseID"])] = course["CourseCode"]
+            term_courses[str(term_id)].append(course["CourseCode"])
+            term_course_mappings.setdefault(course["CourseCode"], []).append({
+                "term_id": term_id,
+                "term_name": term_name,
+                "term_code": term["code"]
+            })
+
+    return {
+        "courses": all_courses,
+        "term_mappings": term_course_mappings,
+        "course_codes": course_codes,
+        "term_courses": term_courses,
+        "total_courses": len(all_courses),
+        "unique_courses": len(term_course_mappings),
+        "terms": [{"id": term["id"], "name": term["name"], "code": term["code"]} for term in terms]
+    }
+
+
+def write_course_summary(current_dir, terms):
+    """
+    Create a comprehensive course summary with all courses from all terms
+
+    Args:
+        current_dir: Project directory holding api_data and course_summary.json
+        terms: List of term dictionaries to include
+
+    Returns:
+        The catalogue that was written
+    """
+    print("\nCreating comprehensive course summary...")
+    catalogue = build_catalogue(os.path.join(current_dir, "api_data"), terms)
+
+    summary_file = os.path.join(current_dir, SUMMARY_FILE_NAME)
+    write_json(summary_file, catalogue)
+
+    print(f"Comprehensive course summary saved to {summary_file}")
+    print(f"  Total courses: {catalogue['total_courses']}")
+    print(f"  Unique course codes: {catalogue['unique_courses']}")
+    print(f"Course search index saved to {write_search_index(current_dir, catalogue)}")
+    return catalogue
+
+
+def load_course_lookup(summary_file):
+    """
+    Load the course ID -> course code map from course_summary.json.
+    Summaries written before the map existed are indexed from their course list.
+
+    Args:
+        summary_file: Path of course_summary.json
+
+    Returns:
+        Dictionary of str(CourseID) to course code; empty if there is no summary
+    """
+    if not os.path.exists(summary_file):
+        return {}
+    with open(summary_file, 'r') as f:
+        summary = json.load(f)
+    if "course_codes" in summary:
+        return summary["course_codes"]
+    return {str(course["id"]): course["code"] for course in summary.get("courses", [])}
+
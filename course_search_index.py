@@ -0,0 +1,140 @@
+import argparse
+import glob
+import json
+import os
+
+from data_manifest import write_data_manifest
+from timetable_output import write_json
+
+SEARCH_INDEX_DIR_NAME = "search_index"
+SEARCH_TERMS_FILE_NAME = "terms.json"
+SEARCH_INDEX_VERSION = 1
+# The web app searches from the second character on, so every query has at
+# least one gram
+GRAM_SIZE = 2
+
+
+def shard_file_name(term_id):
+    return f"term_{term_id}.json"
+
+
+def text_grams(text, size=GRAM_SIZE):
+    """
+    Return the distinct substrings of length `size` of the upper-cased text
+    """
+    text = text.upper()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def encode_posting(rows):
+    """
+    Encode ascending row numbers as the comma-separated gaps between them,
+    e.g. [3, 4, 10] -> "3,1,6"; short numbers keep the shards small
+    """
+    previous = 0
+    gaps = []
+    for row in rows:
+        gaps.append(str(row - previous))
+        previous = row
+    return ",".join(gaps)
+
+
+def build_search_shard(term, courses):
+    """
+    Build the search index of one term.
+
+    A course matches a query when its code or name contains the query, the
+    test script.js has always done. Every query of GRAM_SIZE or more
+    characters only matches courses that hold each of its grams, so the app
+    intersects the postings of the query's grams, shortest first, and checks
+    the few candidates left instead of every course of the term.
+
+    Args:
+        term: Term dictionary with id, name and code
+        courses: Course summary entries of the term, in display order
+
+    Returns:
+        Dictionary with the term, the courses as [id, code, name] rows, and
+        "grams", mapping each gram to the rows of the courses whose code or
+        name contains it, see encode_posting()
+    """
+    rows = []
+    grams = {}
+    for row, course in enumerate(courses):
+        rows.append([course["id"], course["code"], course["name"]])
+        for gram in text_grams(course["code"]) | text_grams(course["name"]):
+            grams.setdefault(gram, []).append(row)
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "term": {"id": term["id"], "name": term["name"], "code": term["code"]},
+        "gram_size": GRAM_SIZE,
+        "courses": rows,
+        "grams": {gram: encode_posting(posting) for gram, posting in sorted(grams.items())},
+    }
+
+
+def write_search_index(current_dir, catalogue):
+    """
+    Write search_index/terms.json, the term list the app starts with, and one
+    search_index/term_{id}.json shard per term, fetched once the term is
+    selected; shards of terms no longer listed are removed
+
+    Args:
+        current_dir: Project directory
+        catalogue: Course catalogue, see course_catalogue.build_catalogue()
+
+    Returns:
+        Path of the search index directory
+    """
+    index_dir = os.path.join(current_dir, SEARCH_INDEX_DIR_NAME)
+    os.makedirs(index_dir, exist_ok=True)
+
+    courses_by_term = {}
+    for course in catalogue["courses"]:
+        courses_by_term.setdefault(course["term_id"], []).append(course)
+
+    terms = []
+    shard_files = set()
+    for term in catalogue["terms"]:
+        courses = courses_by_term.get(term["id"], [])
+        file_name = shard_file_name(term["id"])
+        write_json(os.path.join(index_dir, file_name), build_search_shard(term, courses))
+        shard_files.add(file_name)
+        terms.append({
+            "id": term["id"],
+            "name": term["name"],
+            "code": term["code"],
+            "courses": len(courses),
+            "shard": f"{SEARCH_INDEX_DIR_NAME}/{file_name}",
+        })
+
+    for path in glob.glob(os.path.join(index_dir, "term_*.json")):
+        if os.path.basename(path) not in shard_files:
+            os.remove(path)
+
+    write_json(os.path.join(index_dir, SEARCH_TERMS_FILE_NAME), {
+        "version": SEARCH_INDEX_VERSION,
+        "total_courses": catalogue["total_courses"],
+        "terms": terms,
+    })
+    return index_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write the per-term course search index of the web app from course_summary.json."
+    )
+    parser.parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(current_dir, "course_summary.json"), "r") as f:
+        catalogue = json.load(f)
+    index_dir = write_search_index(current_dir, catalogue)
+    print(f"Search index saved to {index_dir} ({len(catalogue['terms'])} term shards)")
+
+    manifest_file, changed, removed = write_data_manifest(current_dir)
+    print(f"Data manifest saved to {manifest_file} ({changed} changed, {removed} removed files)")
+
+
+if __name__ == "__main__":
+    main()
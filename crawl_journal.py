@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+JOURNAL_FILE_NAME = "crawl_journal.jsonl"
+
+
+class CrawlJournal:
+    """
+    Append-only record of a crawl, one JSON object per line.
+
+    A run starts with a "start" record holding the selected terms, gets one
+    "batch" record for every batch whose files have been written, and ends with
+    a "finish" record once every course was fetched. A run without a "finish"
+    record can be resumed: its terms are reused and the courses of journaled
+    batches are not requested again.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, JOURNAL_FILE_NAME)
+        self._lock = threading.Lock()
+        self.records = self._load()
+
+    def _load(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by an interrupted write is simply dropped
+                    print(f"Ignoring truncated journal line in {self.path}")
+        return records
+
+    def _append(self, record):
+        record["time"] = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.records.append(record)
+
+    def unfinished_run(self):
+        """
+        Return the "start" record of the last run if it never finished, else None
+        """
+        for record in reversed(self.records):
+            if record["event"] == "finish":
+                return None
+            if record["event"] == "start":
+                return record
+        return None
+
+    def start_run(self, terms):
+        """
+        Begin a new run, discarding the records of any previous run
+
+        Args:
+            terms: List of term dictionaries selected for the run
+        """
+        with self._lock:
+            open(self.path, "w").close()
+            self.records = []
+        self._append({"event": "start", "terms": terms})
+
+    def resume_run(self):
+        self._append({"event": "resume"})
+
+    def record_batch(self, term_id, batch_num, batch_result):
+        """
+        Record a batch whose batch file and course files are on disk
+
+        Args:
+            term_id: Term ID
+            batch_num: Zero-based batch number within the term
+            batch_result: Successful result returned by fetch_batch
+        """
+        self._append(
+            {
+                "event": "batch",
+                "term_id": term_id,
+                "batch_num": batch_num,
+                "batch_file": batch_result["batch_file"],
+                "course_ids": batch_result["course_ids"],
+                "course_codes": batch_result["course_codes"],
+                "hash": batch_result["hash"],
+                "changed": batch_result["changed"],
+                "courses": batch_result["courses"],
+            }
+        )
+
+    def completed_batches(self, term_id):
+        """
+        Return the batch records of the current run for a term
+
+        Args:
+            term_id: Term ID
+
+        Returns:
+            List of batch records, oldest first
+        """
+        batches = []
+        for record in self.records:
+            if record["event"] == "start":
+                batches = []
+            elif record["event"] == "batch" and record["term_id"] == term_id:
+                batches.append(record)
+        return batches
+
+    def finish_run(self):
+        self._append({"event": "finish"})
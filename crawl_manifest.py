@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILE_NAME = "crawl_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def content_hash(data):
+    """
+    Hash JSON-serialisable data independently of key order and whitespace
+
+    Args:
+        data: Any JSON-serialisable value
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_manifest(output_dir):
+    """
+    Load the crawl manifest from the timetable output directory
+
+    Args:
+        output_dir: The course_timetables directory
+
+    Returns:
+        Manifest dictionary; empty if there is no usable manifest yet
+    """
+    manifest_file = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_file):
+        try:
+            with open(manifest_file, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+            print(f"Ignoring manifest with unsupported version in {manifest_file}")
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable manifest {manifest_file}: {str(e)}")
+    return {"version": MANIFEST_VERSION, "terms": {}}
+
+
+def save_manifest(output_dir, manifest):
+    manifest_file = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest_file
+
+
+def get_term_entry(manifest, term_id):
+    """
+    Return the manifest entry recorded for a term by the previous run
+
+    Args:
+        manifest: Manifest dictionary
+        term_id: Term ID
+
+    Returns:
+        Dictionary with courses_hash, batches and courses, or None
+    """
+    return manifest["terms"].get(str(term_id))
+
+
+def set_term_entry(manifest, term, courses_hash, batches, courses):
+    """
+    Record the state of a term after a crawl
+
+    Args:
+        manifest: Manifest dictionary to update
+        term: Term dictionary with id, name and code
+        courses_hash: Hash of the term's GetAllCoursesByTermId DataList
+        batches: Dictionary of batch file name to {"course_ids": [...], "hash": str}
+        courses: Dictionary of course code to the hash of its per-course events
+    """
+    manifest["terms"][str(term["id"])] = {
+        "name": term["name"],
+        "code": term["code"],
+        "courses_hash": courses_hash,
+        "batches": dict(sorted(batches.items())),
+        "courses": dict(sorted(courses.items())),
+    }
@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+METRICS_FILE_NAME = "crawl_metrics.jsonl"
+PROMETHEUS_FILE_NAME = "crawl_metrics.prom"
+METRIC_PREFIX = "timetable_crawl"
+
+PERCENTILES = (50, 90, 99)
+# Upper bounds of the latency histogram, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def percentile(values, pct):
+    """
+    Return the pct-th percentile of values with linear interpolation between
+    the closest ranks, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def endpoint_name(url):
+    """
+    Name a request by the last path segment of its URL, e.g. "GetAllCoursesByTermId"
+    """
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def prometheus_labels(**labels):
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class CrawlMetrics:
+    """
+    One record per API request of a crawl, appended to crawl_metrics.jsonl as
+    the requests complete, plus a Prometheus text-format snapshot and a
+    latency summary per endpoint at the end of the run.
+
+    A record holds the endpoint, term and batch, the status (or the exception
+    name when no response arrived), the latency of the final attempt, the
+    elapsed time including retries and backoff, the response size, the
+    number of retries, and the time spent parsing the response and writing
+    its files. Comparing latency with parse and write time tells a slow
+    portal from a large payload or a slow disk.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, METRICS_FILE_NAME)
+        self.prometheus_path = os.path.join(output_dir, PROMETHEUS_FILE_NAME)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.records = []
+        # Every run starts a new file; the records of a run belong together
+        open(self.path, "w").close()
+
+    def record(
+        self,
+        endpoint,
+        status,
+        latency=0.0,
+        elapsed=0.0,
+        response_bytes=0,
+        retries=0,
+        term_id=None,
+        batch=None,
+        parse_seconds=0.0,
+        write_seconds=0.0,
+    ):
+        """
+        Record one API request
+
+        Args:
+            endpoint: Endpoint name, see endpoint_name()
+            status: HTTP status code, or the exception name if the request failed
+            latency: Seconds of the final attempt
+            elapsed: Seconds including retries and backoff
+            response_bytes: Size of the final response body
+            retries: Number of retries after 429/503 answers
+            term_id: Term ID, if the request belongs to a term
+            batch: One-based batch number, for timetable batches
+            parse_seconds: Seconds spent decoding and normalising the response
+            write_seconds: Seconds spent writing the files of the response
+        """
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "endpoint": endpoint,
+            "term_id": term_id,
+            "batch": batch,
+            "status": status,
+            "latency": round(latency, 6),
+            "elapsed": round(elapsed, 6),
+            "bytes": response_bytes,
+            "retries": retries,
+            "parse_seconds": round(parse_seconds, 6),
+            "write_seconds": round(write_seconds, 6),
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.records.append(record)
+
+    def summarise(self):
+        """
+        Aggregate the records per endpoint
+
+        Returns:
+            Dictionary of endpoint to requests, errors, bytes, retries and
+            latency/write percentiles in seconds ({"p50": ..., "max": ...})
+        """
+        by_endpoint = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            by_endpoint.setdefault(record["endpoint"], []).append(record)
+
+        summary = {}
+        for endpoint, records in sorted(by_endpoint.items()):
+            latencies = [r["latency"] for r in records]
+            writes = [r["write_seconds"] for r in records]
+            summary[endpoint] = {
+                "requests": len(records),
+                "errors": sum(1 for r in records if r["status"] != 200),
+                "bytes": sum(r["bytes"] for r in records),
+                "retries": sum(r["retries"] for r in records),
+                "latency": {f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+                "write": {f"p{p}": percentile(writes, p) for p in PERCENTILES},
+            }
+            summary[endpoint]["latency"]["max"] = max(latencies)
+            summary[endpoint]["write"]["max"] = max(writes)
+        return summary
+
+    def prometheus_text(self):
+        """
+        Render the records in the Prometheus text exposition format, for the
+        node_exporter textfile collector or a pushgateway
+        """
+        with self._lock:
+            records = list(self.records)
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        counts = {}
+        totals = {}
+        for record in records:
+            key = (record["endpoint"], str(record["status"]))
+            counts[key] = counts.get(key, 0) + 1
+            endpoint_totals = totals.setdefault(
+                record["endpoint"], {"bytes": 0, "retries": 0, "parse": 0.0, "write": 0.0, "latencies": []}
+            )
+            endpoint_totals["bytes"] += record["bytes"]
+            endpoint_totals["retries"] += record["retries"]
+            endpoint_totals["parse"] += record["parse_seconds"]
+            endpoint_totals["write"] += record["write_seconds"]
+            endpoint_totals["latencies"].append(record["latency"])
+
+        metric("requests_total", "counter", "API requests by endpoint and final status")
+        for (endpoint, status), count in sorted(counts.items()):
+            lines.append(f"{METRIC_PREFIX}_requests_total{prometheus_labels(endpoint=endpoint, status=status)} {count}")
+
+        metric("request_duration_seconds", "histogram", "Latency of the final attempt of each request")
+        for endpoint, endpoint_totals in sorted(totals.items()):
+            latencies = endpoint_totals["latencies"]
+            for bound in LATENCY_BUCKETS:
+                in_bucket = sum(1 for latency in latencies if latency <= bound)
+                lines.append(
+                    f"{METRIC_PREFIX}_request_duration_seconds_bucket"
+                    f"{prometheus_labels(endpoint=endpoint, le=bound)} {in_bucket}"
+                )
+            lines.append(
+                f"{METRIC_PREFIX}_request_duration_seconds_bucket"
+                f"{prometheus_labels(endpoint=endpoint, le='+Inf')} {len(latencies)}"
+            )
+            lines.append(f"{METRIC_PREFIX}_request_duration_seconds_sum{prometheus_labels(endpoint=endpoint)} {sum(latencies):.6f}")
+            lines.append(f"{METRIC_PREFIX}_request_duration_seconds_count{prometheus_labels(endpoint=endpoint)} {len(latencies)}")
+
+        for name, field, help_text in (
+            ("response_bytes_total", "bytes", "Bytes received in final responses"),
+            ("retries_total", "retries", "Retries after 429/503 answers"),
+            ("parse_seconds_total", "parse", "Seconds spent decoding and normalising responses"),
+            ("write_seconds_total", "write", "Seconds spent writing output files"),
+        ):
+            metric(name, "counter", help_text)
+            for endpoint, endpoint_totals in sorted(totals.items()):
+                value = endpoint_totals[field]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{METRIC_PREFIX}_{name}{prometheus_labels(endpoint=endpoint)} {value}")
+
+        metric("run_start_timestamp_seconds", "gauge", "Unix time the crawl started")
+        lines.append(f"{METRIC_PREFIX}_run_start_timestamp_seconds {self.started:.3f}")
+        metric("run_duration_seconds", "gauge", "Wall time of the crawl")
+        lines.append(f"{METRIC_PREFIX}_run_duration_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """
+        Write the Prometheus snapshot; it is replaced in one step so a
+        collector never reads half a file
+
+        Returns:
+            Path of the .prom file
+        """
+        temp_path = self.prometheus_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, self.prometheus_path)
+        return self.prometheus_path
+
+    def report(self):
+        """
+        Print the latency percentiles and write times of every endpoint
+        """
+        print("\n=== Request Latency by Endpoint ===")
+        header = "  ".join(f"{f'p{p}':>7}" for p in PERCENTILES)
+        print(f"{'Endpoint':<28} {'Req':>5} {'Err':>4} {'Retry':>5} {header} {'max':>7}  {'KB':>8} {'write p50':>9}")
+        for endpoint, summary in self.summarise().items():
+            latency = summary["latency"]
+            values = "  ".join(f"{latency[f'p{p}'] * 1000:>5.0f}ms" for p in PERCENTILES)
+            print(
+                f"{endpoint:<28} {summary['requests']:>5} {summary['errors']:>4} {summary['retries']:>5} "
+                f"{values} {latency['max'] * 1000:>5.0f}ms  {summary['bytes'] / 1024:>8.1f} "
+                f"{summary['write']['p50'] * 1000:>7.1f}ms"
+            )
+        print(f"Per-request metrics saved to {self.path}")
+        print(f"Prometheus metrics saved to {self.prometheus_path}")
+
+    def finish(self):
+        self.write_prometheus()
+        self.report()
@@ -0,0 +1,128 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from crawl_manifest import content_hash
+from timetable_output import write_json
+
+DATA_MANIFEST_FILE_NAME = "data_manifest.json"
+DATA_MANIFEST_VERSION = 1
+# Hex digits of the SHA-256 kept per file; plenty to tell two versions apart
+HASH_LENGTH = 16
+
+# Files the web app fetches, relative to the project directory
+DATA_FILE_PATTERNS = (
+    "course_summary.json",
+    os.path.join("search_index", "*.json"),
+    os.path.join("course_timetables", "term_*", "*_timetable.json"),
+    os.path.join("course_timetables", "term_*", "ics", "*.ics"),
+)
+
+
+def file_hash(path):
+    """
+    Hash a file's bytes, which is what the browser caches
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def list_data_files(root_dir):
+    """
+    List the data files of the web app; batch files are only read by the
+    pipeline, so they are left out
+
+    Args:
+        root_dir: Project directory
+
+    Returns:
+        Sorted list of paths relative to root_dir, with forward slashes
+    """
+    paths = []
+    for pattern in DATA_FILE_PATTERNS:
+        for path in glob.glob(os.path.join(root_dir, pattern)):
+            if os.path.basename(path).startswith("batch_"):
+                continue
+            paths.append(os.path.relpath(path, root_dir or os.curdir).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def load_data_manifest(root_dir):
+    manifest_file = os.path.join(root_dir, DATA_MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+    except ValueError:
+        return None
+    return manifest if manifest.get("version") == DATA_MANIFEST_VERSION else None
+
+
+def build_data_manifest(root_dir):
+    """
+    List every data file of the web app with its content hash and size.
+    The service worker keeps a cached file for as long as its hash stays the
+    same, so only files whose hash changed are downloaded again.
+
+    Args:
+        root_dir: Project directory
+
+    Returns:
+        Manifest dictionary with version, a hash over all entries (which
+        changes whenever any file does) and "files", mapping each relative
+        path to {"hash", "size"}
+    """
+    files = {}
+    for relative_path in list_data_files(root_dir):
+        path = os.path.join(root_dir, relative_path)
+        files[relative_path] = {"hash": file_hash(path), "size": os.path.getsize(path)}
+    return {
+        "version": DATA_MANIFEST_VERSION,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "hash": content_hash(files)[:HASH_LENGTH],
+        "files": files,
+    }
+
+
+def write_data_manifest(root_dir):
+    """
+    Write data_manifest.json next to course_summary.json. The file is left
+    untouched when no data file changed, so its own cache entry stays valid.
+
+    Args:
+        root_dir: Project directory
+
+    Returns:
+        Tuple of (manifest file path, number of added or changed files,
+        number of removed files)
+    """
+    manifest_file = os.path.join(root_dir, DATA_MANIFEST_FILE_NAME)
+    previous_files = (load_data_manifest(root_dir) or {}).get("files", {})
+    manifest = build_data_manifest(root_dir)
+
+    changed = sum(1 for path, entry in manifest["files"].items() if previous_files.get(path) != entry)
+    removed = sum(1 for path in previous_files if path not in manifest["files"])
+    if changed or removed or not os.path.exists(manifest_file):
+        write_json(manifest_file, manifest)
+    return manifest_file, changed, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write data_manifest.json, the content hashes the service worker caches data files by."
+    )
+    parser.parse_args()
+
+    manifest_file, changed, removed = write_data_manifest(os.path.dirname(os.path.abspath(__file__)))
+    print(f"Data manifest saved to {manifest_file} ({changed} changed, {removed} removed files)")
+
+
+if __name__ == "__main__":
+    main()
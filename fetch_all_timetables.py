@@ -1,7 +1,75 @@
-import json
+import argparse
+import glob
 import os
+import random
+import sys
+import threading
+import time
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from adaptive_batcher import AdaptiveBatcher, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE
+from course_catalogue import SUMMARY_FILE_NAME, write_course_summary
+from crawl_journal import CrawlJournal
+from crawl_manifest import (
+    content_hash,
+    get_term_entry,
+    load_manifest,
+    save_manifest,
+    set_term_entry,
+)
+from crawl_metrics import CrawlMetrics, endpoint_name
+from data_manifest import write_data_manifest
+from snapshot_store import (
+    DEFAULT_KEEP_DAILY,
+    DEFAULT_KEEP_LAST,
+    TERMS_KEY,
+    SnapshotStore,
+    course_list_key,
+)
+from timetable_bundle import write_term_bundle
+from timetable_events import (
+    course_file_name,
+    iter_file_events,
+    normalise_events,
+    partition_events,
+    write_course_partitions,
+    write_term_index,
+)
+from timetable_diff import (
+    append_change_feed,
+    build_change_document,
+    diff_events,
+    exclude_courses,
+    read_batch_events,
+)
+from timetable_ics import ICS_DIR_NAME, write_term_calendars
+from timetable_output import configure_output, remove_json, write_json
+from timetable_recurrence import write_term_recurrences
+
+API_BASE_URL = "https://custom-100380.campusnexus.cloud/WebServices/api"
+TIMETABLE_URL = f"{API_BASE_URL}/CourseRegistration/GetClassScheduleByTermId"
+
+# Throttling responses from the portal that are worth retrying
+RETRY_STATUS_CODES = (429, 503)
+# Failures that splitting a batch into smaller ones cannot fix
+UNSPLITTABLE_STATUS_CODES = (400, 401, 403, 404, 429)
+# The portal rejects expired tokens with these
+AUTH_FAILURE_STATUS_CODES = (401, 403)
+
+# Let cron jobs run without prompts
+TOKEN_ENV_VAR = "CAMPUSNEXUS_TOKEN"
+TERMS_ENV_VAR = "CAMPUSNEXUS_TERMS"
+# Point the crawler at another server, e.g. mock_campusnexus.py
+API_URL_ENV_VAR = "CAMPUSNEXUS_API_URL"
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 60
+# Batches are numbered from 1, so the events lost courses keep from earlier
+# runs never collide with a batch of this run
+CARRY_OVER_BATCH_FILE_NAME = "batch_0_timetable.json"
 
 
 def is_current_or_future_term(term_name, current_date):
@@ -69,43 +137,207 @@ def is_current_or_future_term(term_name, current_date):
         return False
 
 
-def fetch_courses_from_api(term_id, headers):
+class CrawlStats:
+    """
+    Thread-safe counters used to report crawl throughput at the end of a run.
+    With a CrawlMetrics, every request is also recorded on its own.
+    """
+
+    def __init__(self, metrics=None):
+        self._lock = threading.Lock()
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.courses = 0
+
+    def record_response(self, response):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(response.content)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_courses(self, count):
+        with self._lock:
+            self.courses += count
+
+    def record_request(self, request_info):
+        """
+        Pass one request to the metrics, if there are any
+
+        Args:
+            request_info: Keyword arguments of CrawlMetrics.record(), as filled
+                in by post_with_backoff() and the caller
+        """
+        if self.metrics:
+            self.metrics.record(**request_info)
+
+    def report(self):
+        """
+        Print request, byte and course throughput since the stats were created.
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print("\n=== Crawl Throughput ===")
+        print(f"Elapsed: {elapsed:.2f}s")
+        print(f"Requests: {self.requests} ({self.requests / elapsed:.2f} req/s)")
+        print(f"Retries after 429/503: {self.retries}")
+        print(
+            f"Received: {self.bytes_received / 1024:.1f} KB "
+            f"({self.bytes_received / 1024 / elapsed:.1f} KB/s)"
+        )
+        print(f"Courses fetched: {self.courses} ({self.courses / elapsed:.2f} courses/s)")
+
+
+def configure_api(base_url):
+    """
+    Send every request of the crawl to another API root, such as a local
+    mock_campusnexus.py server
+
+    Args:
+        base_url: URL the endpoint paths are appended to, e.g.
+            "http://127.0.0.1:8765/WebServices/api"
+    """
+    global API_BASE_URL, TIMETABLE_URL
+    API_BASE_URL = base_url.rstrip("/")
+    TIMETABLE_URL = f"{API_BASE_URL}/CourseRegistration/GetClassScheduleByTermId"
+
+
+def create_session(pool_size):
+    """
+    Create a requests session that keeps connections to the portal alive
+
+    Args:
+        pool_size: Maximum number of pooled connections, normally the worker count
+
+    Returns:
+        A requests.Session shared by every request of the crawl
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def retry_delay(response, attempt):
+    """
+    Work out how long to wait before retrying a throttled request.
+    The server's Retry-After header wins, otherwise exponential backoff with jitter.
+
+    Args:
+        response: The 429/503 response
+        attempt: Zero-based retry attempt
+
+    Returns:
+        Delay in seconds
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    delay = BACKOFF_BASE_SECONDS * (2**attempt)
+    return min(delay + random.uniform(0, delay / 2), MAX_BACKOFF_SECONDS)
+
+
+def post_with_backoff(session, url, payload, headers, stats=None, request_info=None):
+    """
+    POST to the API, backing off and retrying while the portal answers 429 or 503
+
+    Args:
+        session: requests.Session (or the requests module) used to send the request
+        url: Endpoint URL
+        payload: JSON payload
+        headers: API request headers including token
+        stats: Optional CrawlStats to record the request in
+        request_info: Optional dictionary that receives the status, the latency
+            of the final attempt, the elapsed time including backoff, the
+            response size and the number of retries
+
+    Returns:
+        The final response, which may still be a 429/503 once retries run out
+    """
+    started = time.perf_counter()
+    for attempt in range(MAX_RETRIES + 1):
+        attempt_started = time.perf_counter()
+        response = session.post(
+            url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS
+        )
+        if request_info is not None:
+            finished = time.perf_counter()
+            request_info.update(
+                status=response.status_code,
+                latency=finished - attempt_started,
+                elapsed=finished - started,
+                response_bytes=len(response.content),
+                retries=attempt,
+            )
+        if stats:
+            stats.record_response(response)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            return response
+
+        delay = retry_delay(response, attempt)
+        print(
+            f"  Server returned {response.status_code}, retrying in {delay:.1f}s "
+            f"(attempt {attempt + 1}/{MAX_RETRIES})"
+        )
+        if stats:
+            stats.record_retry()
+        time.sleep(delay)
+    return response
+
+
+def fetch_courses_from_api(term_id, headers, session=requests, stats=None, store=None, cache_ttl=0):
     """
     Fetch course data directly from the API for a given term ID
 
     Args:
         term_id: Term ID to fetch courses for
         headers: API request headers including token
+        session: Shared requests.Session, defaults to one-off connections
+        stats: Optional CrawlStats to record the request in
+        store: SnapshotStore the course list is saved to (default: the api_data
+            store next to this script)
+        cache_ttl: Reuse a stored course list younger than this many seconds
+            instead of calling the API
 
     Returns:
         Dictionary containing course data or None if request failed
     """
-    url = "https://custom-100380.campusnexus.cloud/WebServices/api/CourseRegistration/GetAllCoursesByTermId"
+    if store is None:
+        store = SnapshotStore(os.path.join(os.path.dirname(__file__), "api_data"))
+    cached = store.fresh(course_list_key(term_id), cache_ttl)
+    if cached is not None:
+        print(f"Using the course list for term {term_id} stored less than {cache_ttl:.0f}s ago")
+        return cached
+
+    url = f"{API_BASE_URL}/CourseRegistration/GetAllCoursesByTermId"
     payload = {"TermId": term_id}
+    request_info = {"endpoint": endpoint_name(url), "term_id": term_id}
 
     try:
         print(f"Fetching course data for term {term_id} from API...")
-        response = requests.post(url, json=payload, headers=headers)
+        response = post_with_backoff(session, url, payload, headers, stats, request_info)
 
         if response.status_code == 200:
+            parse_started = time.perf_counter()
             course_data = response.json()
+            request_info["parse_seconds"] = time.perf_counter() - parse_started
             print(
                 f"Successfully retrieved {len(course_data.get('DataList', []))} courses from API"
             )
 
-            # Save the data to a file for future reference
-            current_dir = os.path.dirname(__file__)
-            api_data_dir = os.path.join(current_dir, "api_data")
-            if not os.path.exists(api_data_dir):
-                os.makedirs(api_data_dir)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_path = os.path.join(
-                api_data_dir, f"courses_term_{term_id}_{timestamp}.json"
-            )
-            with open(file_path, "w") as f:
-                json.dump(course_data, f, indent=4)
-            print(f"Course data saved to {file_path}")
+            # Save the data for future reference; an unchanged list is stored once
+            write_started = time.perf_counter()
+            entry, written = store.put(course_list_key(term_id), course_data)
+            request_info["write_seconds"] = time.perf_counter() - write_started
+            if written:
+                print(f"Course data saved to {store.object_path(entry['hash'])}")
+            else:
+                print(f"Course list for term {term_id} is unchanged, keeping existing snapshot")
 
             return course_data
         else:
@@ -114,62 +346,573 @@ def fetch_courses_from_api(term_id, headers):
             return None
     except Exception as e:
         print(f"Error fetching course data: {str(e)}")
+        request_info["status"] = type(e).__name__
         return None
+    finally:
+        if stats:
+            stats.record_request(request_info)
 
 
-def main():
-    # File paths
-    current_dir = os.path.dirname(__file__)
-    output_dir = os.path.join(current_dir, "course_timetables")
+def fetch_batch(
+    session,
+    term,
+    term_dir,
+    batch_num,
+    batch,
+    term_course_codes,
+    headers,
+    stats,
+    previous_term=None,
+):
+    """
+    Fetch the class schedule for one batch of courses and save it to the term directory.
+    With a previous manifest entry, a batch whose events are unchanged is not
+    rewritten, and only course files whose events changed are rewritten.
 
-    # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
+    Args:
+        session: Shared requests.Session
+        term: Term dictionary with id, name and code
+        term_dir: Output directory for the term
+        batch_num: Zero-based batch number within the term
+        batch: List of course IDs in the batch
+        term_course_codes: Mapping of course ID to course code for the term
+        headers: API request headers including token
+        stats: CrawlStats to record the request in
+        previous_term: Manifest entry of the term from the previous run (incremental mode)
 
-    # Prompt for API token
-    print("\nYou'll need to get a new token from the Swinburne website.")
-    print("To do this:")
-    print("1. Login to https://custom-100380.campusnexus.cloud/PortalExtension/")
-    print("2. Open Developer Tools (F12)")
-    print("3. Go to Network tab")
-    print("4. Navigate to class timetable section")
-    print("5. Look for API requests and find the 'token' header value")
-    new_token = input("\nPaste your new token here: ")
-    token = new_token.strip()
-    if not token:
-        print("No token provided. Exiting.")
-        return
+    Returns:
+        Dictionary with "ok", the request latency and payload size, and either
+        the batch file name, course IDs, content hash, per-course index entries
+        and whether anything was rewritten, or the failure status and whether a
+        smaller batch could succeed ("splittable")
+    """
+    batch_result = {
+        "ok": False,
+        "latency": 0.0,
+        "bytes": 0,
+        "status": None,
+        "splittable": True,
+    }
+    request_info = {
+        "endpoint": endpoint_name(TIMETABLE_URL),
+        "term_id": term["id"],
+        "batch": batch_num + 1,
+    }
+    started = time.perf_counter()
+    try:
+        # Convert the batch to comma-separated string
+        course_ids_str = ",".join(map(str, batch))
+        print(
+            f"[{term['id']}] Processing batch {batch_num + 1}: Course IDs {course_ids_str}"
+        )
 
-    # Headers for the API request
-    headers = {
-        "accept": "application/json, text/plain, */*",
-        "accept-language": "en",
-        "content-type": "application/json",
-        "origin": "https://custom-100380.campusnexus.cloud",
-        "referer": "https://custom-100380.campusnexus.cloud/PortalExtension/",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36 Edg/136.0.0.0",
-        "token": token,
+        # Payload structure based on the curl command
+        payload = {
+            "TermId": term["id"],  # Use the current term ID
+            "CourseIds": course_ids_str,
+            "IsAllWeek": True,
+        }
+
+        # Make the actual API call
+        response = post_with_backoff(session, TIMETABLE_URL, payload, headers, stats, request_info)
+        batch_result["latency"] = time.perf_counter() - started
+        batch_result["bytes"] = len(response.content)
+        batch_result["status"] = response.status_code
+
+        if response.status_code == 200:
+            parse_started = time.perf_counter()
+            timetable_data = response.json()
+            stats.record_courses(len(batch))
+
+            # Parse every EventDescription once so no consumer has to
+            unparsed = normalise_events(timetable_data)
+            request_info["parse_seconds"] = time.perf_counter() - parse_started
+            if unparsed:
+                print(
+                    f"  [{term['id']}] Warning: {unparsed} event descriptions in batch "
+                    f"{batch_num + 1} could not be parsed"
+                )
+
+            # Only the events matter; ExtendedToken changes on every response
+            batch_name = f"batch_{batch_num + 1}_timetable.json"
+            batch_file = os.path.join(term_dir, batch_name)
+            batch_hash = content_hash(timetable_data.get("DataList"))
+            batch_codes = [
+                term_course_codes.get(course_id, f"Unknown_{course_id}")
+                for course_id in batch
+            ]
+            batch_result.update(
+                {
+                    "ok": True,
+                    "batch_file": batch_name,
+                    "course_ids": list(batch),
+                    "course_codes": batch_codes,
+                    "hash": batch_hash,
+                    "courses": {},
+                    "changed": True,
+                }
+            )
+
+            previous_batch = (previous_term or {}).get("batches", {}).get(batch_name)
+            if (
+                previous_batch
+                and previous_batch["hash"] == batch_hash
+                and previous_batch["course_ids"] == batch_result["course_ids"]
+                and os.path.exists(batch_file)
+            ):
+                print(f"  [{term['id']}] Unchanged: batch {batch_num + 1}, skipping write")
+                batch_result["changed"] = False
+                return batch_result
+
+            # Save full batch response in the term directory
+            write_started = time.perf_counter()
+            write_json(batch_file, timetable_data)
+
+            print(f"  [{term['id']}] Success: Found data for batch {batch_num + 1}")
+
+            # Route each event to its own course file instead of copying the batch
+            partitions, unmatched = partition_events(timetable_data, batch_codes)
+            if unmatched:
+                print(
+                    f"  [{term['id']}] Warning: {len(unmatched)} events in batch "
+                    f"{batch_num + 1} did not match a requested course"
+                )
+            batch_result["courses"] = write_course_partitions(
+                term_dir,
+                partitions,
+                batch_name,
+                (previous_term or {}).get("courses"),
+            )
+            request_info["write_seconds"] = time.perf_counter() - write_started
+            return batch_result
+        else:
+            print(
+                f"  [{term['id']}] Error: API returned status code {response.status_code} "
+                f"for batch {batch_num + 1}"
+            )
+            print(
+                f"  Response: {response.text[:200]}..."
+            )  # Print first 200 chars of response
+            # A smaller batch will not fix a bad token or exhausted throttling
+            batch_result["splittable"] = response.status_code not in UNSPLITTABLE_STATUS_CODES
+            return batch_result
+
+    except Exception as e:
+        print(f"  [{term['id']}] Error processing batch {batch_num + 1}: {str(e)}")
+        batch_result["latency"] = time.perf_counter() - started
+        batch_result["status"] = type(e).__name__
+        request_info["status"] = type(e).__name__
+        return batch_result
+    finally:
+        stats.record_request(request_info)
+
+
+def write_carry_over_batch(term_dir, lost_courses):
+    """
+    Collect the previous events of courses that could not be fetched into one
+    batch file, so they stay in the term without the earlier batch files that
+    also hold courses this run fetched again
+
+    Args:
+        term_dir: Output directory for the term
+        lost_courses: Dictionary of lost course ID to course code
+
+    Returns:
+        Manifest entry of the carry-over batch, or None when the lost courses
+        have no previous events
+    """
+    events = []
+    for code in lost_courses.values():
+        course_file = os.path.join(term_dir, course_file_name(code))
+        if os.path.exists(course_file):
+            events.extend(iter_file_events(course_file))
+
+    batch_file = os.path.join(term_dir, CARRY_OVER_BATCH_FILE_NAME)
+    if not events:
+        remove_json(batch_file)
+        return None
+    write_json(batch_file, {"DataList": events})
+    return {"course_ids": list(lost_courses), "hash": content_hash(events)}
+
+
+def crawl_terms(
+    session,
+    terms,
+    headers,
+    output_dir,
+    workers,
+    stats,
+    manifest,
+    incremental=False,
+    batch_size=DEFAULT_BATCH_SIZE,
+    max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+    adaptive=False,
+    journal=None,
+    bundle=False,
+    recurrences=False,
+    calendars=False,
+    store=None,
+    cache_ttl=0,
+    changes=False,
+):
+    """
+    Fetch course lists and timetable batches for all terms on a shared worker pool.
+    Batches are handed out by one AdaptiveBatcher per term as soon as its course
+    list arrives, and never more than `workers` requests are in flight across
+    terms and batches. The manifest is updated with the new hashes of every term
+    that was crawled. Completed batches are written to the journal, and courses
+    the journal already holds for the current run are not requested again. An
+    authentication failure stops the crawl so it can be resumed with a new token.
+
+    Args:
+        session: Shared requests.Session
+        terms: List of term dictionaries to crawl
+        headers: API request headers including token
+        output_dir: Root directory for the term directories
+        workers: Maximum number of requests in flight
+        stats: CrawlStats to record requests in
+        manifest: Crawl manifest from the previous run, updated in place
+        incremental: Skip rewriting outputs whose content hash is unchanged
+        batch_size: Number of courses in the first batch of each term
+        max_batch_size: Upper limit for adaptive batch growth
+        adaptive: Grow and shrink batch sizes from latency and payload size
+        journal: Optional CrawlJournal of the current run
+        bundle: Also write a columnar bundle.json for every changed term
+        recurrences: Also write the weekly recurrences.json for every changed term
+        calendars: Also pre-build the ICS calendars of every changed term
+        store: SnapshotStore for the course lists (default: the api_data store
+            next to the output directory)
+        cache_ttl: Reuse course lists stored less than this many seconds ago
+        changes: Diff the events of every term against the previous batch
+            files and append the changes to change_feed.jsonl; pre-built
+            calendars are then only rebuilt for the courses that changed
+
+    Returns:
+        Dictionary of term ID to {"success": int, "errors": int, "lost": list,
+        "courses_changed": bool, "changed": bool}; "lost" lists the course codes
+        that were not fetched
+    """
+    if store is None:
+        store = SnapshotStore(os.path.join(os.path.dirname(output_dir), "api_data"))
+    results = {
+        term["id"]: {
+            "success": 0,
+            "errors": 0,
+            "lost": [],
+            "courses_changed": False,
+            "changed": False,
+        }
+        for term in terms
     }
+    previous_terms = {
+        term["id"]: get_term_entry(manifest, term["id"]) if incremental else None
+        for term in terms
+    }
+    terms_by_id = {term["id"]: term for term in terms}
+    term_dirs = {}
+    term_courses_hashes = {}
+    term_course_codes = {}
+    term_batches = {}
+    batchers = {}
+    batch_numbers = {}
+    previous_events = {}
+    token_expired = False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        course_futures = {
+            executor.submit(
+                fetch_courses_from_api,
+                term["id"],
+                headers,
+                session,
+                stats,
+                store,
+                cache_ttl,
+            ): term
+            for term in terms
+        }
+        batch_futures = {}
+        in_flight = set(course_futures)
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future in course_futures:
+                    term = course_futures[future]
+                    course_data = future.result()
+                    if (
+                        not course_data
+                        or "DataList" not in course_data
+                        or not course_data["DataList"]
+                    ):
+                        print(f"No courses found for term {term['name']}. Skipping.")
+                        continue
+
+                    term_dir = os.path.join(output_dir, f"term_{term['id']}_{term['code']}")
+                    if not os.path.exists(term_dir):
+                        os.makedirs(term_dir, exist_ok=True)
+                        print(f"Created term directory: {term_dir}")
+                    term_dirs[term["id"]] = term_dir
+                    term_batches[term["id"]] = []
+                    if changes:
+                        # Read before the first batch of this run overwrites them
+                        previous_batch_files = list((get_term_entry(manifest, term["id"]) or {}).get("batches", {}))
+                        previous_events[term["id"]] = read_batch_events(term_dir, previous_batch_files or None)
+
+                    courses_hash = content_hash(course_data["DataList"])
+                    term_courses_hashes[term["id"]] = courses_hash
+                    previous_term = previous_terms[term["id"]]
+                    if not previous_term or previous_term["courses_hash"] != courses_hash:
+                        results[term["id"]]["courses_changed"] = True
+
+                    # Extract course IDs and codes for this term only
+                    term_course_ids = []
+                    term_course_codes[term["id"]] = {}
+                    for course in course_data["DataList"]:
+                        term_course_ids.append(course["CourseID"])
+                        term_course_codes[term["id"]][course["CourseID"]] = course["CourseCode"]
+
+                    print(f"Found {len(term_course_ids)} courses for term {term['name']}")
+
+                    # Courses journaled by an interrupted run are not fetched again
+                    journaled = journal.completed_batches(term["id"]) if journal else []
+                    done_ids = {
+                        course_id for record in journaled for course_id in record["course_ids"]
+                    }
+                    term_batches[term["id"]].extend(journaled)
+                    remaining_ids = [
+                        course_id for course_id in term_course_ids if course_id not in done_ids
+                    ]
+                    if journaled:
+                        print(
+                            f"Resuming term {term['id']}: {len(journaled)} batches already done, "
+                            f"{len(remaining_ids)} courses left"
+                        )
 
-    GetTimeTablePublishedTerms = "https://custom-100380.campusnexus.cloud/WebServices/api/HelperService/GetTimeTablePublishedTerms"
+                    # Process courses in batches to avoid too long URL
+                    batchers[term["id"]] = AdaptiveBatcher(
+                        remaining_ids, batch_size, max_batch_size, adaptive
+                    )
+                    batch_numbers[term["id"]] = max(
+                        (record["batch_num"] + 1 for record in journaled), default=0
+                    )
+                else:
+                    term, batch, batch_num = batch_futures.pop(future)
+                    batcher = batchers[term["id"]]
+                    batch_result = future.result()
+                    if batch_result["ok"]:
+                        results[term["id"]]["success"] += 1
+                        term_batches[term["id"]].append(batch_result)
+                        batcher.record_success(
+                            batch, batch_result["latency"], batch_result["bytes"]
+                        )
+                        if journal:
+                            journal.record_batch(term["id"], batch_num, batch_result)
+                    else:
+                        results[term["id"]]["errors"] += 1
+                        batcher.record_failure(
+                            batch,
+                            batch_result["latency"],
+                            batch_result["status"],
+                            batch_result["splittable"],
+                        )
+                        if batch_result["status"] in AUTH_FAILURE_STATUS_CODES and not token_expired:
+                            token_expired = True
+                            print(
+                                "\nThe token was rejected; finishing requests in flight and stopping. "
+                                "Rerun with --resume and a fresh token to continue."
+                            )
+                        if batch_result["splittable"] and len(batch) > 1:
+                            print(
+                                f"  [{term['id']}] Splitting failed batch of {len(batch)} courses and retrying"
+                            )
+
+            # Top the pool back up, taking batches from each term in turn
+            while len(in_flight) < workers and not token_expired:
+                ready = [term_id for term_id, batcher in batchers.items() if batcher.has_work()]
+                if not ready:
+                    break
+                for term_id in ready:
+                    if len(in_flight) >= workers:
+                        break
+                    batch = batchers[term_id].next_batch()
+                    batch_future = executor.submit(
+                        fetch_batch,
+                        session,
+                        terms_by_id[term_id],
+                        term_dirs[term_id],
+                        batch_numbers[term_id],
+                        batch,
+                        term_course_codes[term_id],
+                        headers,
+                        stats,
+                        previous_terms[term_id],
+                    )
+                    batch_numbers[term_id] += 1
+                    batch_futures[batch_future] = (
+                        terms_by_id[term_id],
+                        batch,
+                        batch_numbers[term_id] - 1,
+                    )
+                    in_flight.add(batch_future)
+
+    for term in terms:
+        if term["id"] not in term_dirs:
+            continue
+        term_result = results[term["id"]]
+        batcher = batchers[term["id"]]
+        batcher.report(f"term {term['id']} ({term['name']})")
+        lost_courses = {
+            course_id: term_course_codes[term["id"]].get(course_id, course_id)
+            for course_id in batcher.unfinished()
+        }
+        term_result["lost"] = list(lost_courses.values())
+        previous_term = previous_terms[term["id"]] or get_term_entry(manifest, term["id"]) or {}
+
+        batches = {}
+        courses = {}
+        # Lost courses keep their previous events and hashes so the next run
+        # retries them
+        if lost_courses:
+            carry_over = write_carry_over_batch(term_dirs[term["id"]], lost_courses)
+            if carry_over:
+                batches[CARRY_OVER_BATCH_FILE_NAME] = carry_over
+            previous_courses = previous_term.get("courses", {})
+            for code in term_result["lost"]:
+                if code in previous_courses:
+                    courses[code] = previous_courses[code]
+        course_entries = {}
+        for batch_result in term_batches[term["id"]]:
+            batches[batch_result["batch_file"]] = {
+                "course_ids": batch_result["course_ids"],
+                "hash": batch_result["hash"],
+            }
+            if batch_result["changed"]:
+                course_entries.update(batch_result["courses"])
+            else:
+                # Unchanged batch: its courses keep the hashes recorded last time
+                previous_courses = previous_term.get("courses", {})
+                for code in batch_result["course_codes"]:
+                    if code in previous_courses:
+                        courses[code] = previous_courses[code]
+        for code, entry in course_entries.items():
+            courses[code] = entry["hash"]
+
+        # Split retries and adaptive sizing number the batches differently on
+        # every run; files from earlier runs would be read twice by every
+        # consumer that globs batch_*_timetable.json
+        for path in glob.glob(os.path.join(term_dirs[term["id"]], "batch_*_timetable.json")):
+            if os.path.basename(path) not in batches:
+                remove_json(path)
+
+        written = [code for code, entry in course_entries.items() if entry["written"]]
+        term_result["changed"] = term_result["courses_changed"] or bool(written)
+        if written:
+            print(f"Term {term['id']}: rewrote {len(written)} course files")
+
+        changed_courses = None
+        # A first crawl has nothing to compare with
+        if changes and previous_events[term["id"]]:
+            # Only the batches of this run; the carry-over batch holds old events
+            fetched_batch_files = [
+                batch_result["batch_file"] for batch_result in term_batches[term["id"]]
+            ]
+            term_changes = diff_events(
+                previous_events[term["id"]], read_batch_events(term_dirs[term["id"]], fetched_batch_files)
+            )
+            # Lost courses were not fetched, so their events are not comparable
+            term_changes = exclude_courses(term_changes, term_result["lost"])
+            document = build_change_document(term_changes, term)
+            if any(document["summary"].values()):
+                feed_file = append_change_feed(output_dir, document)
+                summary = document["summary"]
+                print(
+                    f"Term {term['id']}: {summary['added']} added, {summary['removed']} removed and "
+                    f"{summary['modified']} modified events in {len(document['courses'])} courses, "
+                    f"saved to {feed_file}"
+                )
+            changed_courses = document["courses"]
+            # Calendars that were never built have to be built in full
+            if not os.path.isdir(os.path.join(term_dirs[term["id"]], ICS_DIR_NAME)):
+                changed_courses = None
+
+        if term_result["changed"] or not incremental:
+            write_term_index(term_dirs[term["id"]], term, course_entries)
+            if bundle:
+                print(f"Columnar bundle saved to {write_term_bundle(term_dirs[term['id']], term)}")
+            if recurrences:
+                print(f"Weekly recurrences saved to {write_term_recurrences(term_dirs[term['id']], term)}")
+            if calendars:
+                calendar_courses, vevents = write_term_calendars(
+                    term_dirs[term["id"]], term["id"], changed_courses
+                )
+                print(f"Term {term['id']}: pre-built calendars for {calendar_courses} courses ({vevents} weekly events)")
+        set_term_entry(manifest, term, term_courses_hashes[term["id"]], batches, courses)
+
+    return results
+
+
+def request_published_terms(session, headers, stats=None):
+    """
+    Call GetTimeTablePublishedTerms
+
+    Returns:
+        The JSON response, or None if the request failed
+    """
+    GetTimeTablePublishedTerms = f"{API_BASE_URL}/HelperService/GetTimeTablePublishedTerms"
     payload = {}
+    request_info = {"endpoint": endpoint_name(GetTimeTablePublishedTerms)}
 
     try:
         print("Fetching terms from API...")
-        response = requests.post(
-            GetTimeTablePublishedTerms, json=payload, headers=headers
+        response = post_with_backoff(
+            session, GetTimeTablePublishedTerms, payload, headers, stats, request_info
         )
         if response.status_code == 200:
+            parse_started = time.perf_counter()
             terms_data = response.json()
+            request_info["parse_seconds"] = time.perf_counter() - parse_started
             print(f"Successfully retrieved {len(terms_data)} terms from API")
+            return terms_data
         else:
             print(f"API request failed with status code {response.status_code}")
             print(f"Response: {response.text[:200]}...")
-            return
+            return None
     except Exception as e:
         print(f"Error fetching terms data: {str(e)}")
-        return
+        request_info["status"] = type(e).__name__
+        return None
+    finally:
+        if stats:
+            stats.record_request(request_info)
+
+
+def fetch_published_terms(session, headers, stats=None, store=None, cache_ttl=0):
+    """
+    Fetch the published terms and keep the current and upcoming ones
+
+    Args:
+        session: Shared requests.Session
+        headers: API request headers including token
+        stats: Optional CrawlStats to record the request in
+        store: Optional SnapshotStore to save the response to
+        cache_ttl: Reuse a stored response younger than this many seconds
+            instead of calling the API
+
+    Returns:
+        List of term dictionaries with id, name and code, or None if the request failed
+    """
+    terms_data = store.fresh(TERMS_KEY, cache_ttl) if store else None
+    if terms_data is not None:
+        print(f"Using the published terms stored less than {cache_ttl:.0f}s ago")
+    else:
+        terms_data = request_published_terms(session, headers, stats)
+        if terms_data is None:
+            return None
+        if store:
+            store.put(TERMS_KEY, terms_data)
+
     # Extract terms from the response
     terms = []
     current_date = datetime.now()
@@ -184,31 +927,245 @@ def main():
             )
 
     print(f"Found {len(terms)} current and upcoming terms")
+    return terms
 
-    # Ask if user wants to proceed with all terms or specify specific ones
-    choice = input(
-        "\nDo you want to: \n1. Proceed with all terms\n2. Specify term IDs\n> "
-    )
 
-    if choice == "2":
-        term_ids_input = input(
-            "\nEnter term IDs separated by commas (e.g., 303,312,345): "
+def parse_term_ids(term_ids_input):
+    return [
+        int(id.strip()) for id in term_ids_input.split(",") if id.strip().isdigit()
+    ]
+
+
+def select_terms(terms, args):
+    """
+    Pick the terms to crawl from --terms, the terms environment variable, or a prompt
+
+    Args:
+        terms: Current and upcoming terms from fetch_published_terms
+        args: Parsed command line arguments
+
+    Returns:
+        List of selected term dictionaries
+    """
+    term_ids_input = args.terms or os.environ.get(TERMS_ENV_VAR)
+    if term_ids_input:
+        choice = "2"
+    elif args.all_terms or not sys.stdin.isatty():
+        choice = "1"
+    else:
+        # Ask if user wants to proceed with all terms or specify specific ones
+        choice = input(
+            "\nDo you want to: \n1. Proceed with all terms\n2. Specify term IDs\n> "
         )
-        term_ids = [
-            int(id.strip()) for id in term_ids_input.split(",") if id.strip().isdigit()
-        ]
+
+    if choice == "2":
+        if not term_ids_input:
+            term_ids_input = input(
+                "\nEnter term IDs separated by commas (e.g., 303,312,345): "
+            )
+        term_ids = parse_term_ids(term_ids_input)
         terms = [term for term in terms if term["id"] in term_ids]
         print(
             f"Selected {len(terms)} terms: {', '.join([str(term['id']) for term in terms])}"
         )
     else:
         print("Proceeding with all terms")
+    return terms
 
-    if not terms:
-        print("No valid terms selected. Exiting.")
-        return
-    # Base URL for the timetable API - updated to correct endpoint
-    base_url = "https://custom-100380.campusnexus.cloud/WebServices/api/CourseRegistration/GetClassScheduleByTermId"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetch Swinburne Sarawak class timetables for current and upcoming terms."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Maximum number of concurrent API requests across terms and batches (default: 1)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rewrite files whose content changed since the last run (uses crawl_manifest.json)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Number of courses per GetClassScheduleByTermId request (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Grow the batch size while latency and payload size stay within limits",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=DEFAULT_MAX_BATCH_SIZE,
+        help=f"Upper limit for --adaptive batch growth (default: {DEFAULT_MAX_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--token",
+        help=f"Portal API token (default: ${TOKEN_ENV_VAR}, otherwise prompt)",
+    )
+    parser.add_argument(
+        "--terms",
+        help=f"Comma-separated term IDs to fetch, e.g. 303,312,345 (default: ${TERMS_ENV_VAR})",
+    )
+    parser.add_argument(
+        "--all-terms",
+        action="store_true",
+        help="Fetch all current and upcoming terms without prompting",
+    )
+    parser.add_argument(
+        "--api-url",
+        default=os.environ.get(API_URL_ENV_VAR, API_BASE_URL),
+        help=f"API root to crawl, e.g. a mock_campusnexus.py server (default: ${API_URL_ENV_VAR}, otherwise the portal)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.dirname(os.path.abspath(__file__)),
+        help="Directory to write course_timetables, api_data and course_summary.json to (default: next to this script)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        help="Reuse published terms and course lists fetched less than this many minutes ago (default: 0, always fetch)",
+    )
+    parser.add_argument(
+        "--keep-snapshots",
+        type=int,
+        default=DEFAULT_KEEP_LAST,
+        help=f"Course list snapshots to keep per term in api_data (default: {DEFAULT_KEEP_LAST})",
+    )
+    parser.add_argument(
+        "--keep-daily-snapshots",
+        type=int,
+        default=DEFAULT_KEEP_DAILY,
+        help=f"Also keep the last snapshot of each of the last N days (default: {DEFAULT_KEEP_DAILY})",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last unfinished crawl from crawl_journal.jsonl",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write minified JSON instead of indented JSON",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Also write .gz (and .br if brotli is installed) next to every JSON file",
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Also write a columnar bundle.json per term with repeated strings stored once",
+    )
+    parser.add_argument(
+        "--recurrences",
+        action="store_true",
+        help="Also write a recurrences.json per term with weekly repeats collapsed into one entry",
+    )
+    parser.add_argument(
+        "--ics",
+        action="store_true",
+        help="Also pre-build weekly recurring ICS calendars per course and per course group",
+    )
+    parser.add_argument(
+        "--changes",
+        action="store_true",
+        help="Append the events added, removed or modified since the last crawl to course_timetables/change_feed.jsonl",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.batch_size < 1 or args.max_batch_size < 1:
+        parser.error("batch sizes must be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_output(args.compact, args.precompress)
+    configure_api(args.api_url)
+
+    # File paths
+    current_dir = args.data_dir
+    output_dir = os.path.join(current_dir, "course_timetables")
+
+    # Create output directory if it doesn't exist
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created output directory: {output_dir}")
+
+    journal = CrawlJournal(output_dir)
+    resumed_run = journal.unfinished_run() if args.resume else None
+    if args.resume and not resumed_run:
+        print("No unfinished crawl in the journal, starting a new one.")
+
+    token = (args.token or os.environ.get(TOKEN_ENV_VAR) or "").strip()
+    if not token:
+        if not sys.stdin.isatty():
+            print(f"No token provided. Pass --token or set {TOKEN_ENV_VAR}. Exiting.")
+            return 1
+
+        # Prompt for API token
+        print("\nYou'll need to get a new token from the Swinburne website.")
+        print("To do this:")
+        print("1. Login to https://custom-100380.campusnexus.cloud/PortalExtension/")
+        print("2. Open Developer Tools (F12)")
+        print("3. Go to Network tab")
+        print("4. Navigate to class timetable section")
+        print("5. Look for API requests and find the 'token' header value")
+        new_token = input("\nPaste your new token here: ")
+        token = new_token.strip()
+        if not token:
+            print("No token provided. Exiting.")
+            return 1
+
+    # Headers for the API request
+    headers = {
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "en",
+        "content-type": "application/json",
+        "origin": "https://custom-100380.campusnexus.cloud",
+        "referer": "https://custom-100380.campusnexus.cloud/PortalExtension/",
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36 Edg/136.0.0.0",
+        "token": token,
+    }
+
+    # One keep-alive session for the whole crawl, sized to the worker pool
+    session = create_session(args.workers)
+    store = SnapshotStore(
+        os.path.join(current_dir, "api_data"), args.keep_snapshots, args.keep_daily_snapshots
+    )
+    cache_ttl = args.cache_ttl * 60
+    metrics = CrawlMetrics(output_dir)
+    stats = CrawlStats(metrics)
+
+    if resumed_run:
+        # Resume with the same terms; the journal knows which batches are done
+        terms = resumed_run["terms"]
+        print(
+            f"Resuming crawl started {resumed_run['time']} for terms: "
+            f"{', '.join(str(term['id']) for term in terms)}"
+        )
+        journal.resume_run()
+    else:
+        terms = fetch_published_terms(session, headers, stats, store, cache_ttl)
+        if terms is None:
+            metrics.finish()
+            return 1
+        terms = select_terms(terms, args)
+        if not terms:
+            print("No valid terms selected. Exiting.")
+            return 1
+        journal.start_run(terms)
 
     # Print warning about API rate limiting
     print(
@@ -218,193 +1175,88 @@ def main():
         "This may take some time and might result in API rate limiting or token expiration."
     )
     print("You may want to specify specific terms by ID instead.")
+    print(f"Using up to {args.workers} concurrent request(s).")
 
     # Track overall statistics
     total_success_count = 0
     total_error_count = 0
 
-    # Process each term separately
+    manifest = load_manifest(output_dir)
+    results = crawl_terms(
+        session,
+        terms,
+        headers,
+        output_dir,
+        args.workers,
+        stats,
+        manifest,
+        args.incremental,
+        args.batch_size,
+        args.max_batch_size,
+        args.adaptive,
+        journal,
+        args.bundle,
+        args.recurrences,
+        args.ics,
+        store,
+        cache_ttl,
+        args.changes,
+    )
+    manifest_file = save_manifest(output_dir, manifest)
+    print(f"Crawl manifest saved to {manifest_file}")
+
     for term in terms:
-        term_id = term["id"]
         term_dir = os.path.join(output_dir, f"term_{term['id']}_{term['code']}")
+        success_count = results[term["id"]]["success"]
+        error_count = results[term["id"]]["errors"]
 
-        if not os.path.exists(term_dir):
-            os.makedirs(term_dir)
-            print(f"Created term directory: {term_dir}")
-
-        print(f"\n=== Processing Term: {term['name']} (ID: {term['id']}) ===")
-
-        # Fetch course data for this specific term
-        course_data = fetch_courses_from_api(term_id, headers)
-        if (
-            not course_data
-            or "DataList" not in course_data
-            or not course_data["DataList"]
-        ):
-            print(f"No courses found for term {term['name']}. Skipping.")
-            continue
-
-        # Extract course IDs and codes for this term only
-        term_course_ids = []
-        term_course_codes = {}
-        for course in course_data["DataList"]:
-            term_course_ids.append(course["CourseID"])
-            term_course_codes[course["CourseID"]] = course["CourseCode"]
-
-        print(f"Found {len(term_course_ids)} courses for term {term['name']}")
-
-        # Process courses in batches to avoid too long URL
-        batch_size = 10  # Process 10 courses at a time
-        batches = [
-            term_course_ids[i : i + batch_size]
-            for i in range(0, len(term_course_ids), batch_size)
-        ]
-
-        # Process each batch for this term
-        success_count = 0
-        error_count = 0
-
-        for batch_num, batch in enumerate(batches):
-            try:
-                # Convert the batch to comma-separated string
-                course_ids_str = ",".join(map(str, batch))
-                print(
-                    f"Processing batch {batch_num + 1}/{len(batches)}: Course IDs {course_ids_str}"
-                )
-                
-                # Payload structure based on the curl command
-                payload = {
-                    "TermId": term["id"],  # Use the current term ID
-                    "CourseIds": course_ids_str,
-                    "IsAllWeek": True,
-                }
-                
-                # Make the actual API call
-                response = requests.post(base_url, json=payload, headers=headers)
-
-                if response.status_code == 200:
-                    timetable_data = response.json()
-
-                    # Save full batch response in the term directory
-                    batch_file = os.path.join(
-                        term_dir, f"batch_{batch_num + 1}_timetable.json"
-                    )
-                    with open(batch_file, "w") as file:
-                        json.dump(timetable_data, file, indent=4)
-
-                    print(f"  Success: Found data for batch {batch_num + 1}")
-                    
-                    # Also save individual course files if needed
-                    for course_id in batch:
-                        course_code = term_course_codes.get(
-                            course_id, f"Unknown_{course_id}"
-                        )
-                        course_file = os.path.join(
-                            term_dir, f"{course_code}_timetable.json"
-                        )
-
-                        # Filter the data for just this course (if the API returns data for all courses in one go)
-                        # This might need adjustment based on the actual structure of the response
-                        course_data = timetable_data  # Default to full data
-
-                        with open(course_file, "w") as file:
-                            json.dump(course_data, file, indent=4)
-
-                    success_count += 1
-                else:
-                    print(f"  Error: API returned status code {response.status_code}")
-                    print(
-                        f"  Response: {response.text[:200]}..."
-                    )  # Print first 200 chars of response
-                    error_count += 1
-
-            except Exception as e:
-                print(f"  Error processing batch {batch_num + 1}: {str(e)}")
-                error_count += 1
-                
         print(f"\nTerm {term['id']} ({term['name']}) processing complete!")
         print(f"Success: {success_count}")
         print(f"Errors: {error_count}")
+        if results[term["id"]]["lost"]:
+            print(f"Courses not fetched: {', '.join(map(str, results[term['id']]['lost']))}")
         print(f"Results saved to: {term_dir}")
-        
+
         total_success_count += success_count
         total_error_count += error_count
-    
-    # Create a comprehensive course summary with all courses from all terms
-    all_courses = []
-    term_course_mappings = {}
-    
-    print("\nCreating comprehensive course summary...")
-    
-    # First, collect all course data from the API data files
-    api_data_dir = os.path.join(current_dir, "api_data")
-    for term in terms:
-        term_id = term["id"]
-        term_name = term["name"]
-        
-        # Find the most recent API data file for this term
-        term_files = [f for f in os.listdir(api_data_dir) if f.startswith(f"courses_term_{term_id}_")]
-        if term_files:
-            latest_file = sorted(term_files)[-1]  # Get the most recent file
-            file_path = os.path.join(api_data_dir, latest_file)
-            
-            print(f"  Loading course data for term {term_name} from {latest_file}")
-            try:
-                with open(file_path, 'r') as f:
-                    course_data = json.load(f)
-                    
-                if "DataList" in course_data and course_data["DataList"]:
-                    for course in course_data["DataList"]:
-                        # Create a course summary object with essential information
-                        course_info = {
-                            "id": course["CourseID"],
-                            "code": course["CourseCode"],
-                            "name": course["CourseName"],
-                            "term_id": term_id,
-                            "term_name": term_name,
-                            "term_code": term["code"]
-                        }
-                        
-                        all_courses.append(course_info)
-                        
-                        # Store term mapping
-                        if course["CourseCode"] not in term_course_mappings:
-                            term_course_mappings[course["CourseCode"]] = []
-                        term_course_mappings[course["CourseCode"]].append({
-                            "term_id": term_id,
-                            "term_name": term_name,
-                            "term_code": term["code"]
-                        })
-            except Exception as e:
-                print(f"  Error loading course data from {file_path}: {str(e)}")
-    
-    # Save the comprehensive course summary
-    summary_data = {
-        "courses": all_courses,
-        "term_mappings": term_course_mappings,
-        "total_courses": len(all_courses),
-        "unique_courses": len(term_course_mappings),
-        "terms": [{"id": term["id"], "name": term["name"], "code": term["code"]} for term in terms]
-    }
-    
-    summary_file = os.path.join(current_dir, "course_summary.json")
-    with open(summary_file, "w") as f:
-        json.dump(summary_data, f, indent=4)
-    
-    print(f"Comprehensive course summary saved to {summary_file}")
-    print(f"  Total courses: {len(all_courses)}")
-    print(f"  Unique course codes: {len(term_course_mappings)}")
+
+    # Only regenerate the summary when a course list changed (incremental mode)
+    summary_file = os.path.join(current_dir, SUMMARY_FILE_NAME)
+    if (
+        not args.incremental
+        or not os.path.exists(summary_file)
+        or any(result["courses_changed"] for result in results.values())
+    ):
+        write_course_summary(current_dir, terms)
+    else:
+        print("\nCourse lists unchanged, keeping existing course summary")
+
+    manifest_file, changed_files, removed_files = write_data_manifest(current_dir)
+    print(f"Data manifest saved to {manifest_file} ({changed_files} changed, {removed_files} removed files)")
 
     print(f"\n=== All Terms Processing Complete ===")
     print(f"Total terms processed: {len(terms)}")
     print(f"Total Success: {total_success_count}")
     print(f"Total Errors: {total_error_count}")
     print(f"Results saved to: {output_dir}")
+    stats.report()
+    metrics.finish()
+
+    unfinished = sum(len(result["lost"]) for result in results.values())
+    if unfinished:
+        print(
+            f"\n{unfinished} courses were not fetched. "
+            "Run again with --resume to fetch only those."
+        )
+        return 1
+    journal.finish_run()
+    return 0
 
 
 if __name__ == "__main__":
     start_time = datetime.now()
-    main()
+    exit_code = main()
     end_time = datetime.now()
     duration = end_time - start_time
     print(f"Total execution time: {duration}")
+    sys.exit(exit_code)
@@ -0,0 +1,425 @@
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Same path layout as the portal, so only the host part of the URL changes
+API_PATH = "/WebServices/api"
+TERMS_ENDPOINT = "/HelperService/GetTimeTablePublishedTerms"
+COURSES_ENDPOINT = "/CourseRegistration/GetAllCoursesByTermId"
+SCHEDULE_ENDPOINT = "/CourseRegistration/GetClassScheduleByTermId"
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+SUBJECT_PREFIXES = ["ACC", "BCH", "COS", "DDD", "ENG", "FIN", "HIT", "ICT", "MKT", "SWE"]
+FIRST_NAMES = ["Melinda", "Kevin", "Changi", "Jenny", "Siaw San", "Ahmad", "Mei Ling", "Rajesh"]
+LAST_NAMES = ["Kong", "Voon", "Wong", "Liew", "Hwang", "Tan", "Lim", "Kumar"]
+BUILDINGS = ["A", "B", "E", "G"]
+# Start hours of classes; lectures are two hours, other sessions one or two
+START_HOURS = [8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+# Non-lecture sessions of a course, with how many groups each can have
+SESSION_KINDS = [("TU", 6), ("LA", 4), ("PR", 3)]
+
+
+class MockSettings:
+    """
+    Size of the synthetic catalogue and the misbehaviour of the mock portal.
+    """
+
+    def __init__(
+        self,
+        terms=2,
+        courses=200,
+        weeks=12,
+        break_week=7,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        token_requests=0,
+        max_batch_courses=0,
+        failing_courses=(),
+        seed=1,
+    ):
+        """
+        Args:
+            terms: Number of current terms; one past term is listed on top
+            courses: Courses offered per term
+            weeks: Teaching weeks per term
+            break_week: Week number (1-based) without classes; 0 for none
+            latency: Seconds added to every response
+            jitter: Up to this many extra seconds, drawn at random
+            error_rate: Share of requests that fail with a 500
+            throttle_rate: Share of requests answered with a 429
+            token_requests: The token expires after this many requests and
+                every later request gets a 401; 0 to never expire
+            max_batch_courses: Schedule requests for more courses fail with a
+                500, as the portal does for very long course lists; 0 for no limit
+            failing_courses: Course IDs whose schedule requests always fail
+                with a 500, so the crawler gives them up
+            seed: Seed of the synthetic data and the failure draws
+        """
+        self.terms = terms
+        self.courses = courses
+        self.weeks = weeks
+        self.break_week = break_week
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.token_requests = token_requests
+        self.max_batch_courses = max_batch_courses
+        self.failing_courses = set(failing_courses)
+        self.seed = seed
+
+
+def build_terms(settings, today=None):
+    """
+    List the published terms: `settings.terms` terms starting this month, which
+    the crawler keeps, and one from last year, which it filters out
+
+    Returns:
+        List of term dictionaries with id, name, code and start (a Monday)
+    """
+    today = today or date.today()
+    month = MONTH_NAMES[today.month - 1]
+    terms = [{
+        "id": 100,
+        "name": f"{today.year - 1} {month} Term 1",
+        "code": f"{today.year - 1}_{month[:3].upper()}_T1",
+        "start": None,
+    }]
+    first_day = date(today.year, today.month, 1)
+    start = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+    for number in range(1, settings.terms + 1):
+        terms.append({
+            "id": 400 + number,
+            "name": f"{today.year} {month} Term {number}",
+            "code": f"{today.year}_{month[:3].upper()}_T{number}",
+            "start": start,
+        })
+    return terms
+
+
+def build_courses(settings, term):
+    """
+    List the courses of a term in the GetAllCoursesByTermId shape
+    """
+    courses = []
+    for index in range(settings.courses):
+        prefix = SUBJECT_PREFIXES[index % len(SUBJECT_PREFIXES)]
+        level = index // len(SUBJECT_PREFIXES) % 4 + 1
+        courses.append({
+            "Id": 0,
+            "TermID": 0,
+            "Term": None,
+            "CourseID": term["id"] * 10000 + index + 1,
+            "CourseCode": f"{prefix}{level}{index + 1:04d}",
+            "CourseDescription": f"{prefix} Studies {index + 1}",
+            "StartTime": "0001-01-01T00:00:00",
+            "EndTime": "0001-01-01T00:00:00",
+            "Duration": 0,
+            "Location": None,
+            "ErrorMessage": None,
+            "ErrorState": False,
+            "ExcelRowID": 0,
+            "UpdateStatus": None,
+            "Shift": None,
+        })
+    return courses
+
+
+def format_date_ranges(dates):
+    """
+    Describe sorted teaching dates as "03/03 to 04/07, 04/21 to 05/26",
+    starting a new range wherever a week is skipped
+    """
+    ranges = []
+    for day in dates:
+        if ranges and day - ranges[-1][1] == timedelta(weeks=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ", ".join(f"{first:%m/%d} to {last:%m/%d}" for first, last in ranges)
+
+
+def build_course_events(settings, term, course):
+    """
+    Build the IsAllWeek events of one course: a weekly lecture plus several
+    groups of each other session kind, one event per teaching date, with
+    descriptions in the portal's format
+
+    Returns:
+        List of DataList events
+    """
+    rng = random.Random(f"{settings.seed}-{term['id']}-{course['CourseID']}")
+    code = course["CourseCode"]
+    sessions = [("LE1", "01", 2)]
+    for kind, max_groups in SESSION_KINDS:
+        if rng.random() < 0.6:
+            for group in range(1, rng.randint(1, max_groups) + 1):
+                sessions.append((f"{kind}1", f"{group:02d}", rng.choice((1, 2))))
+
+    weeks = [week for week in range(1, settings.weeks + 2) if week != settings.break_week]
+    weeks = weeks[:settings.weeks]
+    events = []
+    for session_type, group, hours in sessions:
+        weekday = rng.randrange(5)
+        start_hour = rng.choice(START_HOURS)
+        room = "ONLINE" if rng.random() < 0.05 else f"{rng.choice(BUILDINGS)}{rng.randint(1, 8)}{rng.randint(1, 20):02d}"
+        instructors = ", ".join(
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.choice((1, 1, 2)))
+        )
+        dates = [term["start"] + timedelta(weeks=week - 1, days=weekday) for week in weeks]
+        description = f"{code} - {session_type} - {group}, {instructors}; {room} - {format_date_ranges(dates)}"
+        for day in dates:
+            events.append({
+                "Id": 0,
+                "EventDate": f"{day.isoformat()}T00:00:00",
+                "EventStartTime": f"{day.isoformat()}T{start_hour:02d}:00:00",
+                "EventEndTime": f"{day.isoformat()}T{start_hour + hours:02d}:00:00",
+                "EventDescription": description,
+                "CourseId": 0,
+                "TermId": 0,
+                "SubComponentId": 0,
+                "ComponentGroupName": None,
+            })
+    return events
+
+
+class MockCatalogue:
+    """
+    Synthetic terms, courses and events, generated once per course on first
+    use so the server itself stays cheap to call.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.terms = build_terms(settings)
+        self.courses = {
+            term["id"]: build_courses(settings, term) for term in self.terms if term["start"]
+        }
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def course_events(self, term_id, course_id):
+        key = (term_id, course_id)
+        with self._lock:
+            if key not in self._events:
+                term = next(term for term in self.terms if term["id"] == term_id)
+                course = next(c for c in self.courses[term_id] if c["CourseID"] == course_id)
+                self._events[key] = build_course_events(self.settings, term, course)
+            return self._events[key]
+
+    def schedule(self, term_id, course_ids):
+        """
+        Return the events of the requested courses in start time order, as
+        the portal does; unknown course IDs are ignored
+        """
+        known = {course["CourseID"] for course in self.courses.get(term_id, [])}
+        events = []
+        for course_id in course_ids:
+            if course_id in known:
+                events.extend(self.course_events(term_id, course_id))
+        events.sort(key=lambda event: event["EventStartTime"])
+        return events
+
+    def event_count(self, term_ids=None):
+        """
+        Count the events the crawler should end up with for the given terms
+        """
+        return sum(
+            len(self.course_events(term_id, course["CourseID"]))
+            for term_id, courses in self.courses.items()
+            if term_ids is None or term_id in term_ids
+            for course in courses
+        )
+
+
+class MockStats:
+    """
+    Thread-safe request counters of the mock server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.statuses = {}
+        self.endpoints = {}
+
+    def record(self, endpoint, status, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the portal, so the crawler's connection pool is exercised
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {"ErrorMessage": "Invalid JSON"}, None)
+            return
+
+        endpoint = next(
+            (e for e in (TERMS_ENDPOINT, COURSES_ENDPOINT, SCHEDULE_ENDPOINT) if self.path.endswith(e)),
+            None,
+        )
+        settings = server.settings
+        with server.lock:
+            server.request_count += 1
+            request_number = server.request_count
+            roll = server.rng.random()
+            delay = settings.latency + server.rng.uniform(0, settings.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if endpoint is None:
+            self.send_json(404, {"ErrorMessage": f"Unknown endpoint {self.path}"}, endpoint)
+        elif not self.headers.get("token"):
+            self.send_json(401, {"ErrorMessage": "Missing token"}, endpoint)
+        elif settings.token_requests and request_number > settings.token_requests:
+            self.send_json(401, {"ErrorMessage": "Token expired"}, endpoint)
+        elif roll < settings.throttle_rate:
+            self.send_json(429, {"ErrorMessage": "Too many requests"}, endpoint, {"Retry-After": "0"})
+        elif roll < settings.throttle_rate + settings.error_rate:
+            self.send_json(500, {"ErrorMessage": "Internal server error"}, endpoint)
+        elif endpoint == TERMS_ENDPOINT:
+            self.send_json(200, self.envelope([
+                {"DropdownId": term["id"], "DropdownName": term["name"], "DropdownCode": term["code"]}
+                for term in server.catalogue.terms
+            ]), endpoint)
+        elif endpoint == COURSES_ENDPOINT:
+            courses = server.catalogue.courses.get(payload.get("TermId"), [])
+            self.send_json(200, self.envelope(courses), endpoint)
+        else:
+            course_ids = [int(i) for i in str(payload.get("CourseIds") or "").split(",") if i.strip().isdigit()]
+            if settings.max_batch_courses and len(course_ids) > settings.max_batch_courses:
+                self.send_json(500, {"ErrorMessage": "Request too large"}, endpoint)
+                return
+            if settings.failing_courses.intersection(course_ids):
+                self.send_json(500, {"ErrorMessage": "Internal server error"}, endpoint)
+                return
+            events = server.catalogue.schedule(payload.get("TermId"), course_ids)
+            self.send_json(200, self.envelope(events), endpoint)
+
+    def envelope(self, data_list):
+        # The portal hands out a new token with every answer
+        token = base64.b64encode(random.randbytes(48)).decode("ascii")
+        return {"DataList": data_list, "ServiceResult": 0, "ErrorMessage": None, "ExtendedToken": token}
+
+    def send_json(self, status, data, endpoint, extra_headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.record(endpoint, status, len(body))
+
+
+def start_server(settings=None, host=DEFAULT_HOST, port=0):
+    """
+    Start a mock portal on a background thread
+
+    Args:
+        settings: MockSettings, defaults to a small error-free catalogue
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free one
+
+    Returns:
+        The running server. server.base_url is the value for
+        fetch_all_timetables.py --api-url, server.catalogue the synthetic data
+        and server.stats the request counters; call server.shutdown() to stop.
+    """
+    settings = settings or MockSettings()
+    server = ThreadingHTTPServer((host, port), MockPortalHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    server.catalogue = MockCatalogue(settings)
+    server.stats = MockStats()
+    server.lock = threading.Lock()
+    server.rng = random.Random(settings.seed)
+    server.request_count = 0
+    server.base_url = f"http://{host}:{server.server_port}{API_PATH}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve synthetic timetables in the CampusNexus portal API shape for local crawls."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--terms", type=int, default=2, help="Current terms to publish (default: 2)")
+    parser.add_argument("--courses", type=int, default=200, help="Courses per term (default: 200)")
+    parser.add_argument("--weeks", type=int, default=12, help="Teaching weeks per term (default: 12)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many random extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument(
+        "--token-requests", type=int, default=0, help="Expire the token after this many requests (0 = never)"
+    )
+    parser.add_argument(
+        "--max-batch-courses", type=int, default=0,
+        help="Fail schedule requests for more courses than this with a 500 (0 = no limit)",
+    )
+    parser.add_argument(
+        "--failing-courses", type=int, nargs="+", default=[],
+        help="Course IDs whose schedule requests always fail with a 500",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic data (default: 1)")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        terms=args.terms,
+        courses=args.courses,
+        weeks=args.weeks,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        token_requests=args.token_requests,
+        max_batch_courses=args.max_batch_courses,
+        failing_courses=args.failing_courses,
+        seed=args.seed,
+    )
+    server = start_server(settings, args.host, args.port)
+    print(f"Mock portal listening on {server.base_url}")
+    print(f"Crawl it with: python fetch_all_timetables.py --api-url {server.base_url} --token mock --data-dir <dir>")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(
+            f"\nServed {server.stats.requests} requests "
+            f"({server.stats.bytes_sent / 1024:.1f} KB), statuses: {server.stats.statuses}"
+        )
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
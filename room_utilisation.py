@@ -0,0 +1,353 @@
+import argparse
+import glob
+import os
+import re
+from datetime import date, datetime, timedelta
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from timetable_clashes import SHARED_ROOMS, load_occurrences
+from timetable_heatmap import DAYS_ORDER
+from timetable_output import write_json
+from timetable_planner import SLOT_MINUTES, SLOTS_PER_DAY
+
+ROOM_REPORT_FILE_NAME = "room_utilisation.json"
+ROOM_HEATMAPS_DIR_NAME = "room_heatmaps"
+
+DAYS_PER_WEEK = 7
+WEEK_SLOTS = DAYS_PER_WEEK * SLOTS_PER_DAY
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Utilisation is measured against the teaching week: Monday to Friday,
+# 8:00 to 22:00, the hours timetable_heatmap.py charts
+TEACHING_DAYS = 5
+TEACHING_HOURS = (8, 22)
+
+# "G407" -> "G", "EN506" -> "EN"
+BUILDING_PATTERN = re.compile(r"^([A-Za-z]+)")
+
+
+def building_of(room):
+    match = BUILDING_PATTERN.match(room)
+    return match.group(1).upper() if match else room
+
+
+def week_start(day):
+    """
+    Return the Monday of the week a date falls in
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def slot_range(start, end):
+    """
+    Return the first and one-past-last week slot of a time span within a
+    week; partial slots count as taken, spans past midnight are cut there
+    """
+    first = start.weekday() * SLOTS_PER_DAY + (start.hour * 60 + start.minute) // SLOT_MINUTES
+    if end.date() != start.date():
+        return first, (start.weekday() + 1) * SLOTS_PER_DAY
+    last = start.weekday() * SLOTS_PER_DAY - (-(end.hour * 60 + end.minute) // SLOT_MINUTES)
+    return first, last
+
+
+class RoomOccupancy:
+    """
+    Dense room x week x slot occupancy counts.
+
+    occupancy[r, w, s] is the number of classes using room r during slot s
+    (30 minutes, Monday 0:00 first) of week w. Every query is an array
+    operation over this matrix: free rooms are the rows that are zero over
+    a slot range, utilisation is the share of non-zero teaching slots, and
+    a count above one is a double booking.
+    """
+
+    def __init__(self, rooms, weeks, occupancy):
+        self.rooms = rooms
+        self.room_index = {room: i for i, room in enumerate(rooms)}
+        self.weeks = weeks
+        self.week_index = {week: i for i, week in enumerate(weeks)}
+        self.occupancy = occupancy
+        self.buildings = np.array([building_of(room) for room in rooms])
+
+    @classmethod
+    def from_occurrences(cls, occurrences, include_shared_rooms=False):
+        """
+        Build the matrix from class occurrences
+
+        Args:
+            occurrences: List from timetable_clashes.load_occurrences()
+            include_shared_rooms: Also count rooms listed in SHARED_ROOMS
+
+        Returns:
+            RoomOccupancy
+        """
+        spans = []
+        for occurrence in occurrences:
+            # A few descriptions leave a separator behind: "A202, "
+            room = (occurrence["room"] or "").strip(" ,")
+            if not room or (not include_shared_rooms and room.upper() in SHARED_ROOMS):
+                continue
+            start = datetime.strptime(occurrence["start"], TIMESTAMP_FORMAT)
+            end = datetime.strptime(occurrence["end"], TIMESTAMP_FORMAT)
+            first, last = slot_range(start, end)
+            if last > first:
+                spans.append((room, week_start(start.date()), first, last))
+
+        rooms = sorted({room for room, _, _, _ in spans})
+        weeks = sorted({week for _, week, _, _ in spans})
+        occupancy = np.zeros((len(rooms), len(weeks), WEEK_SLOTS), dtype=np.int16)
+        if not spans:
+            return cls(rooms, weeks, occupancy)
+
+        room_index = {room: i for i, room in enumerate(rooms)}
+        week_index = {week: i for i, week in enumerate(weeks)}
+        room_rows = np.array([room_index[room] for room, _, _, _ in spans])
+        week_rows = np.array([week_index[week] for _, week, _, _ in spans])
+        firsts = np.array([first for _, _, first, _ in spans])
+        lengths = np.array([last - first for _, _, first, last in spans])
+
+        # One entry per slot of every span, added in one call so that
+        # overlapping classes in a room add up
+        rows = np.repeat(np.arange(len(spans)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        np.add.at(occupancy, (room_rows[rows], week_rows[rows], firsts[rows] + offsets), 1)
+        return cls(rooms, weeks, occupancy)
+
+    def room_mask(self, building=None):
+        if building is None:
+            return np.ones(len(self.rooms), dtype=bool)
+        return self.buildings == building.upper()
+
+    def free_rooms(self, start, end, building=None):
+        """
+        Rooms without a class at any time between start and end on that date
+
+        Args:
+            start: datetime the room is needed from
+            end: datetime the room is needed until, on the same day
+            building: Only rooms of this building, e.g. "G"
+
+        Returns:
+            Sorted list of room codes; every known room in a week without
+            any timetabled classes
+        """
+        first, last = slot_range(start, end)
+        week = self.week_index.get(week_start(start.date()))
+        mask = self.room_mask(building)
+        if week is not None:
+            mask &= ~self.occupancy[:, week, first:last].any(axis=1)
+        return [self.rooms[i] for i in np.flatnonzero(mask)]
+
+    def weekly_free_rooms(self, weekday, start_time, end_time, building=None):
+        """
+        Rooms without a class in the given slot of any week
+
+        Args:
+            weekday: 0 for Monday
+            start_time: time the room is needed from
+            end_time: time the room is needed until
+            building: Only rooms of this building
+
+        Returns:
+            Sorted list of room codes
+        """
+        day = date(2001, 1, 1) + timedelta(days=weekday)  # 2001-01-01 was a Monday
+        first, last = slot_range(datetime.combine(day, start_time), datetime.combine(day, end_time))
+        mask = self.room_mask(building) & ~self.occupancy[:, :, first:last].any(axis=(1, 2))
+        return [self.rooms[i] for i in np.flatnonzero(mask)]
+
+    def teaching_slots(self):
+        """
+        Return a boolean mask over the week slots of the teaching week
+        """
+        slots = np.zeros((DAYS_PER_WEEK, SLOTS_PER_DAY), dtype=bool)
+        first_hour, last_hour = TEACHING_HOURS
+        slots[:TEACHING_DAYS, first_hour * 60 // SLOT_MINUTES:last_hour * 60 // SLOT_MINUTES] = True
+        return slots.reshape(WEEK_SLOTS)
+
+    def teaching_weeks(self):
+        """
+        Return a boolean mask over the weeks with classes in teaching hours;
+        a week that only holds a weekend class would otherwise halve the
+        utilisation of every room
+        """
+        return self.occupancy[:, :, self.teaching_slots()].any(axis=(0, 2))
+
+    def utilisation(self):
+        """
+        Share of teaching slots each room is in use, over the teaching weeks
+
+        Returns:
+            Dictionary of room to percentage, busiest room first
+        """
+        weeks = self.teaching_weeks()
+        if not weeks.any():
+            return {room: 0.0 for room in self.rooms}
+        teaching = self.teaching_slots()
+        used = (self.occupancy[:, weeks][:, :, teaching] > 0).sum(axis=(1, 2))
+        percentages = 100.0 * used / (weeks.sum() * teaching.sum())
+        order = np.argsort(-percentages, kind="stable")
+        return {self.rooms[i]: round(float(percentages[i]), 1) for i in order}
+
+    def slot_time(self, week, slot):
+        start = datetime.combine(self.weeks[week], datetime.min.time()) + timedelta(minutes=int(slot) * SLOT_MINUTES)
+        return start.isoformat(timespec="minutes")
+
+    def contention(self):
+        """
+        Peak demand for rooms
+
+        Returns:
+            Dictionary with the largest number of rooms in use at once and
+            when that first happened, and the rooms with double bookings:
+            the number of slots with more than one class and the most classes
+            at once
+        """
+        if not self.rooms:
+            return {"peak_rooms_in_use": 0, "peak_time": None, "double_booked": {}}
+        in_use = (self.occupancy > 0).sum(axis=0)
+        week, slot = np.unravel_index(np.argmax(in_use), in_use.shape)
+        overbooked = (self.occupancy > 1).sum(axis=(1, 2))
+        peaks = self.occupancy.max(axis=(1, 2))
+        return {
+            "peak_rooms_in_use": int(in_use[week, slot]),
+            "peak_time": self.slot_time(week, slot),
+            "double_booked": {
+                self.rooms[i]: {"slots": int(overbooked[i]), "max_classes": int(peaks[i])}
+                for i in np.flatnonzero(overbooked)
+            },
+        }
+
+    def building_matrix(self, building):
+        """
+        Average share of a building's rooms in use per hour and day over
+        the teaching weeks
+
+        Returns:
+            Array of len(range(*TEACHING_HOURS)) hours x 7 days, in percent
+        """
+        weeks = self.teaching_weeks()
+        if not weeks.any():
+            weeks = np.ones(len(self.weeks), dtype=bool)
+        in_use = self.occupancy[self.room_mask(building)][:, weeks] > 0
+        # rooms x weeks x days x hours x slots per hour
+        hourly = in_use.reshape(in_use.shape[0], in_use.shape[1], DAYS_PER_WEEK, 24, 60 // SLOT_MINUTES)
+        by_hour = hourly.any(axis=4).mean(axis=(0, 1)) * 100
+        first_hour, last_hour = TEACHING_HOURS
+        return by_hour[:, first_hour:last_hour].T
+
+
+def save_building_heatmaps(occupancy, output_dir):
+    """
+    Save one heatmap per building of the share of its rooms in use by day and
+    hour, drawn like the class schedule heatmap
+
+    Returns:
+        List of the PNG files written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = []
+    for building in sorted(set(occupancy.buildings)):
+        rooms = int(occupancy.room_mask(building).sum())
+        matrix = pd.DataFrame(
+            occupancy.building_matrix(building), index=list(range(*TEACHING_HOURS)), columns=DAYS_ORDER
+        )
+
+        plt.figure(figsize=(14, 10))
+        sns.heatmap(
+            matrix,
+            cmap="YlOrRd",
+            linewidths=0.5,
+            annot=True,
+            fmt=".0f",
+            vmin=0,
+            vmax=100,
+            cbar_kws={'label': 'Rooms in Use (%)'}
+        )
+        plt.title(f'Room Utilisation - Building {building} ({rooms} rooms)', fontsize=16)
+        plt.xlabel('Day of Week', fontsize=12)
+        plt.ylabel('Hour of Day (24h format)', fontsize=12)
+        plt.tight_layout()
+        output_file = os.path.join(output_dir, f'room_utilisation_{building}.png')
+        plt.savefig(output_file, dpi=300)
+        plt.close()
+        output_files.append(output_file)
+    return output_files
+
+
+def parse_time(value):
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Room utilisation, peak contention and free rooms from the batch timetable files."
+    )
+    parser.add_argument("terms", nargs="*", type=int, help="Term IDs to include (default: every term)")
+    parser.add_argument("--free", metavar="YYYY-MM-DDTHH:MM", help="List the rooms free at this time")
+    parser.add_argument("--day", help="List the rooms free in this slot every week: day name, e.g. Monday")
+    parser.add_argument("--at", default="09:00", help="Start of the slot for --day (default: 09:00)")
+    parser.add_argument("--minutes", type=int, default=60, help="Length of the slot (default: 60)")
+    parser.add_argument("--building", help="Only rooms of this building, e.g. G")
+    parser.add_argument("--top", type=int, default=10, help="Busiest rooms to print (default: 10)")
+    parser.add_argument(
+        "--heatmaps", action="store_true", help=f"Also save a heatmap per building to {ROOM_HEATMAPS_DIR_NAME}/"
+    )
+    args = parser.parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    timetables_dir = os.path.join(current_dir, "course_timetables")
+    term_dirs = sorted(glob.glob(os.path.join(timetables_dir, "term_*")))
+    if args.terms:
+        term_dirs = [d for d in term_dirs if int(os.path.basename(d).split("_", 2)[1]) in args.terms]
+
+    occupancy = RoomOccupancy.from_occurrences(load_occurrences(term_dirs))
+    print(f"{len(occupancy.rooms)} rooms over {len(occupancy.weeks)} weeks from {len(term_dirs)} terms")
+
+    if args.free:
+        start = datetime.strptime(args.free, "%Y-%m-%dT%H:%M")
+        end = start + timedelta(minutes=args.minutes)
+        free = occupancy.free_rooms(start, end, args.building)
+        print(f"\nFree {start:%a %Y-%m-%d %H:%M}-{end:%H:%M}: {len(free)} rooms")
+        print("  " + " ".join(free))
+    if args.day:
+        days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        matches = [i for i, name in enumerate(days) if name.startswith(args.day.lower())]
+        if len(matches) != 1:
+            parser.error(f"Unknown day: {args.day}")
+        start = datetime.combine(date.min, parse_time(args.at))
+        end = start + timedelta(minutes=args.minutes)
+        free = occupancy.weekly_free_rooms(matches[0], start.time(), end.time(), args.building)
+        print(f"\nFree every {days[matches[0]].title()} {start:%H:%M}-{end:%H:%M}: {len(free)} rooms")
+        print("  " + " ".join(free))
+
+    utilisation = occupancy.utilisation()
+    contention = occupancy.contention()
+    print(f"\n=== Busiest rooms (share of teaching hours, Mon-Fri {TEACHING_HOURS[0]}:00-{TEACHING_HOURS[1]}:00) ===")
+    for room, percentage in list(utilisation.items())[:args.top]:
+        print(f"  {room:<12} {percentage:>5.1f}%")
+    print(f"\nPeak: {contention['peak_rooms_in_use']} rooms in use at {contention['peak_time']}")
+    print(f"Double-booked rooms: {len(contention['double_booked'])}")
+
+    output_file = os.path.join(timetables_dir, ROOM_REPORT_FILE_NAME)
+    write_json(output_file, {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "terms": [int(os.path.basename(d).split("_", 2)[1]) for d in term_dirs],
+        "weeks": [week.isoformat() for week in occupancy.weeks],
+        "slot_minutes": SLOT_MINUTES,
+        "utilisation": utilisation,
+        **contention,
+    })
+    print(f"\nRoom report saved to {output_file}")
+
+    if args.heatmaps:
+        output_files = save_building_heatmaps(occupancy, os.path.join(current_dir, ROOM_HEATMAPS_DIR_NAME))
+        print(f"Saved {len(output_files)} building heatmaps to {os.path.join(current_dir, ROOM_HEATMAPS_DIR_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -70,6 +70,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let timetableData = {};
     let groupSelections = {}; // Store user's group selections for each course
     let currentTermId = null; // Track currently selected term
+    let searchShards = {}; // Search index of each term, fetched on first use
     
     // Load course data
     loadCourseSummary();
@@ -77,14 +78,24 @@ document.addEventListener('DOMContentLoaded', function() {
     // Event listeners
     courseSearch.addEventListener('input', handleSearchInput);
     searchResults.addEventListener('click', handleSearchResultClick);
-    downloadIcsBtn.addEventListener('click', generateAndDownloadICS);
+    downloadIcsBtn.addEventListener('click', () => generateAndDownloadICS());
     
     // Add term selector event listener
     document.getElementById('term-selector').addEventListener('change', handleTermChange);
-      // Load the course summary JSON
+      // Load the term list of the search index; the courses of a term are
+    // fetched once it is selected
     function loadCourseSummary() {
-        fetch('course_summary.json')
-            .then(response => response.json())
+        fetch('search_index/terms.json')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load search index: ${response.status}`);
+                }
+                return response.json();
+            })
+            .catch(error => {
+                console.warn('No search index, using course_summary.json:', error);
+                return loadFullCourseSummary();
+            })
             .then(data => {
                 availableCourses = data;
                 console.log('Course summary loaded:', availableCourses.total_courses, 'courses');
@@ -97,6 +108,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     const termSelector = document.getElementById('term-selector');
                     if (termSelector && termSelector.options.length > 0) {
                         currentTermId = parseInt(termSelector.value);
+                        loadSearchShard(currentTermId).catch(error => {
+                            console.error('Error loading search index:', error);
+                        });
                     }
                 }
             })
@@ -105,6 +119,109 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
     
+    // Deployments without a search index: build shards without postings
+    // from the full summary, searched course by course
+    function loadFullCourseSummary() {
+        return fetch('course_summary.json')
+            .then(response => response.json())
+            .then(data => {
+                data.terms.forEach(term => {
+                    searchShards[term.id] = Promise.resolve({
+                        term: term,
+                        courses: data.courses
+                            .filter(course => course.term_id === term.id)
+                            .map(course => [course.id, course.code, course.name])
+                    });
+                });
+                return data;
+            });
+    }
+    
+    // Fetch the search shard of a term once
+    function loadSearchShard(termId) {
+        if (!searchShards[termId]) {
+            const termInfo = availableCourses.terms.find(term => term.id === termId);
+            const shardUrl = termInfo && termInfo.shard ? termInfo.shard : `search_index/term_${termId}.json`;
+            searchShards[termId] = fetch(shardUrl)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`Failed to load ${shardUrl}: ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .catch(error => {
+                    // Try again on the next keystroke
+                    delete searchShards[termId];
+                    throw error;
+                });
+        }
+        return searchShards[termId];
+    }
+    
+    // Rows of the courses whose code or name contains the query, in shard
+    // order. Only courses holding every gram of the query are checked.
+    function searchShard(shard, query, limit) {
+        let candidates;
+        if (shard.grams && query.length >= shard.gram_size) {
+            const postings = [];
+            for (let i = 0; i + shard.gram_size <= query.length; i++) {
+                const posting = decodePosting(shard, query.slice(i, i + shard.gram_size));
+                if (!posting) {
+                    return [];
+                }
+                postings.push(posting);
+            }
+            postings.sort((a, b) => a.length - b.length);
+            candidates = postings[0].filter(row => postings.every(posting => includesSorted(posting, row)));
+        } else {
+            candidates = shard.courses.map((_, row) => row);
+        }
+        
+        const matches = [];
+        for (const row of candidates) {
+            const [, code, name] = shard.courses[row];
+            if (code.toUpperCase().includes(query) || name.toUpperCase().includes(query)) {
+                matches.push(shard.courses[row]);
+                if (matches.length >= limit) {
+                    break;
+                }
+            }
+        }
+        return matches;
+    }
+    
+    // Turn the gaps of a gram's posting ("3,1,6") into ascending rows
+    // ([3, 4, 10]), once per gram
+    function decodePosting(shard, gram) {
+        if (!shard.grams[gram]) {
+            return null;
+        }
+        shard.decoded = shard.decoded || {};
+        if (!shard.decoded[gram]) {
+            let row = 0;
+            shard.decoded[gram] = shard.grams[gram].split(',').map(gap => (row += parseInt(gap, 10)));
+        }
+        return shard.decoded[gram];
+    }
+    
+    // Binary search in an ascending posting list
+    function includesSorted(posting, row) {
+        let low = 0;
+        let high = posting.length - 1;
+        while (low <= high) {
+            const middle = (low + high) >> 1;
+            if (posting[middle] === row) {
+                return true;
+            }
+            if (posting[middle] < row) {
+                low = middle + 1;
+            } else {
+                high = middle - 1;
+            }
+        }
+        return false;
+    }
+    
     // Populate the term selector dropdown with available terms
     function populateTermSelector() {
         const termSelector = document.getElementById('term-selector');
@@ -133,6 +250,9 @@ document.addEventListener('DOMContentLoaded', function() {
         courseSearch.value = '';
         
         console.log(`Switched to term ID: ${currentTermId}`);
+        loadSearchShard(currentTermId).catch(error => {
+            console.error('Error loading search index:', error);
+        });
         
         // Could refresh the selected courses based on term, but for now we'll let users manage this
     }
@@ -148,19 +268,33 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Filter courses based on query and current term
-        const filteredCourses = availableCourses.courses
-            .filter(course => {
-                // Match by code or name
-                const matchesQuery = course.code.toUpperCase().includes(query) || 
-                                    course.name.toUpperCase().includes(query);
-                
-                // Filter by current term if one is selected
-                const matchesTerm = currentTermId ? course.term_id === currentTermId : true;
-                
-                return matchesQuery && matchesTerm;
+        if (!currentTermId) {
+            searchResults.style.display = 'none';
+            return;
+        }
+        
+        loadSearchShard(currentTermId)
+            .then(shard => {
+                // Ignore answers for a query the user has typed past
+                if (courseSearch.value.trim().toUpperCase() !== query || shard.term.id !== currentTermId) {
+                    return;
+                }
+                const filteredCourses = searchShard(shard, query, 10).map(([id, code, name]) => ({
+                    id: id,
+                    code: code,
+                    name: name,
+                    term_id: shard.term.id,
+                    term_name: shard.term.name
+                }));
+                showSearchResults(filteredCourses);
             })
-            .slice(0, 10); // Limit to 10 results
+            .catch(error => {
+                console.error('Error loading search index:', error);
+            });
+    }
+    
+    function showSearchResults(filteredCourses) {
+        searchResults.innerHTML = '';
         
         if (filteredCourses.length === 0) {
             searchResults.style.display = 'none';
@@ -337,16 +471,12 @@ document.addEventListener('DOMContentLoaded', function() {
         const groups = new Map();
         
         data.DataList.forEach(event => {
-            if (event.EventDescription.includes(courseCode)) {
-                // Extract group information from description
-                // Format is typically: "COURSECODE - TYPE# - GROUP#, Instructor; Location - dates"
-                // For example: "COS10003 - TU1 - 01, Colin Choon Lin Tan; G401 - 03/06 to 04/10, 04/24 to 05/29"
-                const match = event.EventDescription.match(/([A-Z0-9]+) - ([A-Z]+\d+) - (\d+)/);
+            if (eventBelongsToCourse(event, courseCode)) {
+                const groupInfo = getEventGroupInfo(event);
                 
-                if (match && match.length >= 4) {
-                    const eventCourseCode = match[1];
-                    const sessionType = match[2];    // e.g., "TU1", "LA1", "LE1"
-                    const groupNumber = match[3];    // e.g., "01", "02"
+                if (groupInfo) {
+                    const sessionType = groupInfo.sessionType;    // e.g., "TU1", "LA1", "LE1"
+                    const groupNumber = groupInfo.groupNumber;    // e.g., "01", "02"
                     
                     // Skip lecture groups - we'll include all lectures automatically
                     if (sessionType.startsWith('LE')) {
@@ -490,15 +620,15 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 data.DataList.forEach(event => {
                     // Check if the event belongs to the course
-                    if (event.EventDescription.includes(courseCode)) {
+                    if (eventBelongsToCourse(event, courseCode)) {
                         let shouldInclude = false;
                         
                         // Extract session type if possible
-                        const match = event.EventDescription.match(/([A-Z0-9]+) - ([A-Z]+\d+) - (\d+)/);
+                        const groupInfo = getEventGroupInfo(event);
                         
-                        if (match) {
-                            const sessionType = match[2];
-                            const groupNumber = match[3];
+                        if (groupInfo) {
+                            const sessionType = groupInfo.sessionType;
+                            const groupNumber = groupInfo.groupNumber;
                             const groupId = `${sessionType}-${groupNumber}`;
                             
                             // Always include lectures
@@ -585,13 +715,120 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Check whether an event belongs to a course, using the parsed course code when present
+    function eventBelongsToCourse(event, courseCode) {
+        if (event.CourseCode) {
+            return event.CourseCode === courseCode;
+        }
+        return event.EventDescription.includes(courseCode);
+    }
+    
+    // Get the session type and group of an event from the fields added by the
+    // Python pipeline, falling back to parsing the description for older files.
+    // Format is typically: "COURSECODE - TYPE# - GROUP#, Instructor; Location - dates"
+    // For example: "COS10003 - TU1 - 01, Colin Choon Lin Tan; G401 - 03/06 to 04/10, 04/24 to 05/29"
+    function getEventGroupInfo(event) {
+        if (event.SessionType && event.GroupNumber) {
+            return { sessionType: event.SessionType, groupNumber: event.GroupNumber };
+        }
+        
+        const match = event.EventDescription.match(/([A-Z0-9]+) - ([A-Z]+\d+) - (\d+)/);
+        if (!match) {
+            return null;
+        }
+        return { sessionType: match[2], groupNumber: match[3] };
+    }
+    
+    // Download the selection by joining the per-group calendars pre-built by
+    // timetable_ics.py, one weekly event per session. Resolves to false when a
+    // piece is missing so the caller can fall back to building it here.
+    function downloadPrecomputedICS() {
+        const urls = [];
+        const fileParts = [];
+        
+        for (const course of selectedCourses) {
+            const courseKey = `${course.code}_${course.termId}`;
+            const data = timetableData[courseKey];
+            const termInfo = availableCourses.terms.find(term => term.id === course.termId);
+            if (!data || !data.DataList || !termInfo) {
+                return Promise.resolve(false);
+            }
+            
+            // Lectures plus the selected groups, as in the browser export
+            const selectedGroups = groupSelections[courseKey]?.includedGroups || [];
+            const groupIds = new Set();
+            for (const event of data.DataList) {
+                if (!eventBelongsToCourse(event, course.code)) {
+                    continue;
+                }
+                const groupInfo = getEventGroupInfo(event);
+                if (!groupInfo) {
+                    // Events without a group are only handled by the browser export
+                    return Promise.resolve(false);
+                }
+                const groupId = `${groupInfo.sessionType}-${groupInfo.groupNumber}`;
+                if (groupInfo.sessionType.replace(/\d+/g, '') === 'LE' || selectedGroups.includes(groupId)) {
+                    groupIds.add(groupId);
+                }
+            }
+            
+            const termFolder = `term_${course.termId}_${termInfo.code}`;
+            groupIds.forEach(groupId => {
+                urls.push(`course_timetables/${termFolder}/ics/${course.code}_${groupId}.ics`);
+            });
+            fileParts.push(`${course.code}_${termInfo.code}`);
+        }
+        
+        if (urls.length === 0) {
+            return Promise.resolve(false);
+        }
+        
+        return Promise.all(urls.map(url => fetch(url).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load ${url}: ${response.status}`);
+                }
+                return response.text();
+            })))
+            .then(calendars => {
+                // Keep the header of the first calendar and the events of all of them
+                const header = calendars[0].substring(0, calendars[0].indexOf('BEGIN:VEVENT'));
+                const events = calendars.map(calendar => calendar.substring(
+                    calendar.indexOf('BEGIN:VEVENT'),
+                    calendar.lastIndexOf('END:VEVENT') + 'END:VEVENT'.length
+                ));
+                const calendar = `${header}${events.join('\r\n')}\r\nEND:VCALENDAR\r\n`;
+                const eventCount = (calendar.match(/^BEGIN:VEVENT/gm) || []).length;
+                
+                saveCalendarFile(calendar, `swinburne-timetable-${fileParts.join('-')}.ics`);
+                alert(`Timetable downloaded with ${eventCount} weekly classes.`);
+                return true;
+            })
+            .catch(error => {
+                console.warn('Pre-built calendars unavailable, building the calendar in the browser:', error);
+                return false;
+            });
+    }
+    
+    // Offer calendar text as a file download
+    function saveCalendarFile(calendar, fileName) {
+        const blob = new Blob([calendar], {type: 'text/calendar;charset=utf-8'});
+        const link = document.createElement('a');
+        link.href = window.URL.createObjectURL(blob);
+        link.setAttribute('download', fileName);
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+    }
+    
     // Format time for display
     function formatTime(date) {
         return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
     }
     
     // Generate and download ICS file
-    function generateAndDownloadICS() {
+    // Pre-built calendars are used when available; skipPrecomputed builds the
+    // calendar from the expanded events in the browser instead
+    function generateAndDownloadICS(skipPrecomputed) {
         if (selectedCourses.length === 0) {
             alert('Please select at least one course');
             return;
@@ -634,6 +871,15 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
+        if (!skipPrecomputed) {
+            downloadPrecomputedICS().then(downloaded => {
+                if (!downloaded) {
+                    generateAndDownloadICS(true);
+                }
+            });
+            return;
+        }
+        
         const cal = window.ics();
         let eventCount = 0;
         let totalStudyHours = 0;
@@ -649,15 +895,15 @@ document.addEventListener('DOMContentLoaded', function() {
                 // First filter events based on selected groups
                 data.DataList.forEach(event => {
                     // Check if the event belongs to the course
-                    if (event.EventDescription.includes(courseCode)) {
+                    if (eventBelongsToCourse(event, courseCode)) {
                         let shouldInclude = false;
                         
                         // Extract session type if possible
-                        const match = event.EventDescription.match(/([A-Z0-9]+) - ([A-Z]+\d+) - (\d+)/);
+                        const groupInfo = getEventGroupInfo(event);
                         
-                        if (match) {
-                            const sessionType = match[2];
-                            const groupNumber = match[3];
+                        if (groupInfo) {
+                            const sessionType = groupInfo.sessionType;
+                            const groupNumber = groupInfo.groupNumber;
                             const groupId = `${sessionType}-${groupNumber}`;
                             const basicType = sessionType.replace(/\d+/g, '');
                             
@@ -706,77 +952,23 @@ document.addEventListener('DOMContentLoaded', function() {
         const studyHoursPerWeek = Math.round(totalStudyHours * 10) / 10;
         alert(`Timetable downloaded with ${eventCount} classes.\nEstimated study hours per week: ${studyHoursPerWeek} hours`);
         
-        // Helper function to parse event description
-        function parseEventDescription(description) {
-            try {
-                const parts = description.split(' - ');
-                const courseCode = parts[0].trim();
-                
-                let sessionType = '';
-                let groupNumber = '';
-                
-                if (parts.length > 1) {
-                    const sessionParts = parts[1].split(' ');
-                    sessionType = sessionParts[0].trim();
-                    
-                    if (sessionParts.length > 1) {
-                        groupNumber = sessionParts[sessionParts.length - 1].trim();
-                    }
-                }
-                
-                let instructor = '';
-                let location = '';
-                let dateRanges = [];
-                
-                if (parts.length > 2) {
-                    const detailParts = parts[2].split(';');
-                    if (detailParts.length > 0) {
-                        instructor = detailParts[0].trim();
-                    }
-                    
-                    if (detailParts.length > 1) {
-                        const locationAndDates = detailParts[1].trim().split(' - ');
-                        if (locationAndDates.length > 0) {
-                            location = locationAndDates[0].trim();
-                        }
-                        
-                        if (locationAndDates.length > 1) {
-                            const datesText = locationAndDates.slice(1).join(' - ');
-                            const dateRangeParts = datesText.split(',');
-                            
-                            dateRanges = dateRangeParts.map(range => range.trim());
-                        }
-                    }
-                }
-                
-                return {
-                    courseCode,
-                    sessionType,
-                    groupNumber,
-                    instructor,
-                    location,
-                    dateRanges
-                };
-            } catch (e) {
-                // If parsing fails, return a basic object with the full description
-                console.warn('Failed to parse event description:', description);
-                return {
-                    courseCode: description,
-                    description
-                };
-            }
-        }
-        
         // Helper function to process events into recurring calendar events
         function processEvents(events, cal) {
             events.forEach(event => {
-                // Parse the description to extract important information
-                const descInfo = parseEventDescription(event.EventDescription);
-                
                 // Extract location and date ranges from the description
                 const parts = event.EventDescription.split(";");
                 const title = parts[0].trim();
                 
+                // Use the rooms and date ranges parsed by the Python pipeline when present
+                if (event.Locations) {
+                    event.Locations.forEach(location => {
+                        location.DateRanges.forEach(range => {
+                            createSeriesEvent(isoToMonthDay(range.Start), isoToMonthDay(range.End), event, title, location.Room, cal);
+                        });
+                    });
+                    return;
+                }
+                
                 for (let i = 1; i < parts.length; i++) {
                     let info = parts[i].split("-");
                     let eventLocation = info[0].trim();
@@ -855,6 +1047,11 @@ document.addEventListener('DOMContentLoaded', function() {
             );
         }
         
+        // Convert "2025-03-03" to the "03/03" form used in descriptions
+        function isoToMonthDay(isoDate) {
+            return `${isoDate.substring(5, 7)}/${isoDate.substring(8, 10)}`;
+        }
+        
         // Helper function to format date for iCalendar
         function formatDateForICal(date) {
             return date.toISOString().replace(/[-:]/g, '').substring(0, 15) + 'Z';
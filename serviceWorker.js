@@ -1,4 +1,4 @@
-const CACHE_NAME = 'swinburne-timetable-cache-v1';
+const CACHE_NAME = 'swinburne-timetable-cache-v2';
 const urlsToCache = [
   './',
   './index.html',
@@ -7,18 +7,144 @@ const urlsToCache = [
   './ics.js'
 ];
 
+// Data files are cached under their content hash from data_manifest.json,
+// so a file is only downloaded again once its hash changes
+const DATA_CACHE_NAME = 'swinburne-timetable-data';
+const DATA_MANIFEST_URL = 'data_manifest.json';
+// Downloaded as soon as a new version is listed; other data files on first use
+const PRECACHED_DATA = ['search_index/terms.json'];
+
+let manifestPromise = null;
+
+// Path of a same-origin request relative to the app, or null
+function appPath(request) {
+  const url = new URL(request.url);
+  const scope = new URL(self.registration.scope);
+  if (url.origin !== scope.origin || !url.pathname.startsWith(scope.pathname)) {
+    return null;
+  }
+  return decodeURIComponent(url.pathname.slice(scope.pathname.length));
+}
+
+function isDataPath(path) {
+  return path === 'course_summary.json' || path.startsWith('course_timetables/') || path.startsWith('search_index/');
+}
+
+function versionedUrl(path, hash) {
+  return new URL(`${path}?v=${hash}`, self.registration.scope).href;
+}
+
+// Serve a data file from the cache, downloading it once per hash
+function cachedDataFile(cache, path, hash) {
+  const key = versionedUrl(path, hash);
+  return cache.match(key).then(cached => cached || fetch(key).then(response => {
+    if (!response.ok) {
+      return response;
+    }
+    return cache.put(key, response.clone()).then(() => response);
+  }));
+}
+
+function loadCachedManifest() {
+  return caches.open(DATA_CACHE_NAME)
+    .then(cache => cache.match(DATA_MANIFEST_URL))
+    .then(response => response ? response.json() : null)
+    .catch(() => null);
+}
+
+// Drop cached files whose hash is no longer listed and precache the new
+// versions of PRECACHED_DATA; the manifest is stored last, once that worked
+function syncDataCache(manifest, response) {
+  return caches.open(DATA_CACHE_NAME).then(cache => {
+    const current = new Set(
+      Object.entries(manifest.files).map(([path, entry]) => versionedUrl(path, entry.hash))
+    );
+    return cache.keys()
+      .then(requests => Promise.all(requests
+        .filter(request => request.url.includes('?v=') && !current.has(request.url))
+        .map(request => cache.delete(request))))
+      .then(() => Promise.all(PRECACHED_DATA
+        .filter(path => manifest.files[path])
+        .map(path => cachedDataFile(cache, path, manifest.files[path].hash))))
+      .then(() => cache.put(DATA_MANIFEST_URL, response))
+      .then(() => manifest);
+  });
+}
+
+// Fetch the latest manifest, falling back to the cached one when offline
+function refreshManifest() {
+  return fetch(DATA_MANIFEST_URL, {cache: 'no-cache'})
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`Failed to load ${DATA_MANIFEST_URL}: ${response.status}`);
+      }
+      return response.clone().json().then(manifest => syncDataCache(manifest, response));
+    })
+    .catch(error => {
+      console.warn('Using the cached data manifest:', error);
+      return loadCachedManifest();
+    });
+}
+
+function getManifest() {
+  if (!manifestPromise) {
+    manifestPromise = loadCachedManifest().then(manifest => manifest || refreshManifest());
+  }
+  return manifestPromise;
+}
+
+function respondWithData(request, path) {
+  return getManifest().then(manifest => {
+    const entry = manifest && manifest.files[path];
+    if (!entry) {
+      // Not listed (or no manifest at all): plain network request
+      return fetch(request);
+    }
+    return caches.open(DATA_CACHE_NAME).then(cache => cachedDataFile(cache, path, entry.hash));
+  });
+}
+
 self.addEventListener('install', event => {
   event.waitUntil(
-    caches.open(CACHE_NAME).then(cache => {
-      return cache.addAll(urlsToCache);
-    })
+    Promise.all([
+      caches.open(CACHE_NAME).then(cache => {
+        return cache.addAll(urlsToCache);
+      }),
+      refreshManifest()
+    ])
+  );
+});
+
+self.addEventListener('activate', event => {
+  // Remove the app shell of earlier versions
+  event.waitUntil(
+    caches.keys().then(names => Promise.all(names
+      .filter(name => name !== CACHE_NAME && name !== DATA_CACHE_NAME)
+      .map(name => caches.delete(name))))
   );
 });
 
 self.addEventListener('fetch', event => {
+  const request = event.request;
+  if (request.method !== 'GET') {
+    return;
+  }
+
+  if (request.mode === 'navigate') {
+    // Look for new data on every visit; data requests wait for the check
+    manifestPromise = refreshManifest();
+    event.waitUntil(manifestPromise);
+  }
+
+  const path = appPath(request);
+  if (path !== null && isDataPath(path)) {
+    event.respondWith(respondWithData(request, path));
+    return;
+  }
+
   event.respondWith(
-    caches.match(event.request).then(response => {
-      return response || fetch(event.request);
+    caches.match(request).then(response => {
+      return response || fetch(request);
     })
   );
-});
\ No newline at end of file
+});
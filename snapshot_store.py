@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from crawl_manifest import content_hash
+from timetable_output import write_json
+
+STORE_INDEX_FILE_NAME = "snapshots.json"
+STORE_INDEX_VERSION = 1
+OBJECTS_DIR_NAME = "objects"
+# Same timestamps as the courses_term_{id}_{timestamp}.json snapshots
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+DEFAULT_KEEP_LAST = 5
+DEFAULT_KEEP_DAILY = 30
+
+# courses_term_{term_id}_{YYYYmmdd_HHMMSS}.json, written before the store existed
+SNAPSHOT_FILE_PATTERN = re.compile(r"^courses_term_(\d+)_(\d{8}_\d{6})\.json$")
+
+TERMS_KEY = "terms"
+COURSE_LIST_KEY_PATTERN = re.compile(r"^courses_term_(\d+)$")
+# Changes with every response, so it would defeat the deduplication
+VOLATILE_FIELDS = ("ExtendedToken",)
+
+
+def course_list_key(term_id):
+    return f"courses_term_{term_id}"
+
+
+class SnapshotStore:
+    """
+    Content-addressed store for the API responses the crawler keeps.
+
+    Every response is saved once under objects/{hash}.json, the hash taken
+    over its content without the ExtendedToken. snapshots.json lists, per key
+    (the published terms, or the course list of one term), the timestamps the
+    response was fetched at and the object each one refers to, newest last.
+    Fetching an unchanged course list therefore only adds a timestamp.
+
+    Retention keeps the newest `keep_last` snapshots of a key plus the newest
+    snapshot of each of its last `keep_daily` days; objects no snapshot refers
+    to any more are deleted.
+    """
+
+    def __init__(self, api_data_dir, keep_last=DEFAULT_KEEP_LAST, keep_daily=DEFAULT_KEEP_DAILY):
+        self.api_data_dir = api_data_dir
+        self.objects_dir = os.path.join(api_data_dir, OBJECTS_DIR_NAME)
+        self.index_file = os.path.join(api_data_dir, STORE_INDEX_FILE_NAME)
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r") as f:
+                    index = json.load(f)
+                if index.get("version") == STORE_INDEX_VERSION:
+                    return index
+                print(f"Ignoring snapshot index with unsupported version in {self.index_file}")
+            except ValueError:
+                print(f"Ignoring unreadable snapshot index {self.index_file}")
+        return {"version": STORE_INDEX_VERSION, "snapshots": {}}
+
+    def _save_index(self):
+        # Replaced in one step so an interrupted run never leaves half an index
+        os.makedirs(self.api_data_dir, exist_ok=True)
+        temp_file = self.index_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump(self.index, f, indent=4)
+        os.replace(temp_file, self.index_file)
+
+    def object_path(self, object_hash):
+        return os.path.join(self.objects_dir, f"{object_hash}.json")
+
+    def relative_path(self, entry):
+        """
+        Path of a snapshot's object relative to the api_data directory
+        """
+        return f"{OBJECTS_DIR_NAME}/{entry['hash']}.json"
+
+    def put(self, key, data, timestamp=None):
+        """
+        Record a response fetched now (or at `timestamp`), writing its object
+        only if no earlier snapshot had the same content, then apply retention
+
+        Args:
+            key: TERMS_KEY or course_list_key(term_id)
+            data: The JSON response
+            timestamp: datetime the response was fetched at, default now
+
+        Returns:
+            Tuple of (snapshot entry, whether a new object was written)
+        """
+        stored = {k: v for k, v in data.items() if k not in VOLATILE_FIELDS}
+        object_hash = content_hash(stored)
+        entry = {"time": (timestamp or datetime.now()).strftime(TIMESTAMP_FORMAT), "hash": object_hash}
+
+        with self._lock:
+            object_file = self.object_path(object_hash)
+            written = not os.path.exists(object_file)
+            if written:
+                os.makedirs(self.objects_dir, exist_ok=True)
+                write_json(object_file, stored)
+            snapshots = self.index["snapshots"].setdefault(key, [])
+            snapshots.append(entry)
+            snapshots.sort(key=lambda snapshot: snapshot["time"])
+            self._apply_retention(key)
+            self._save_index()
+            self._delete_unreferenced()
+        return entry, written
+
+    def latest(self, key):
+        """
+        Return the newest snapshot entry of a key, or None
+        """
+        with self._lock:
+            snapshots = self.index["snapshots"].get(key)
+            return dict(snapshots[-1]) if snapshots else None
+
+    def load(self, entry):
+        with open(self.object_path(entry["hash"]), "r") as f:
+            return json.load(f)
+
+    def fresh(self, key, max_age_seconds, now=None):
+        """
+        Return the newest response of a key if it is younger than
+        max_age_seconds, so the request can be skipped; otherwise None
+        """
+        entry = self.latest(key)
+        if not entry or max_age_seconds <= 0:
+            return None
+        age = ((now or datetime.now()) - datetime.strptime(entry["time"], TIMESTAMP_FORMAT)).total_seconds()
+        if age > max_age_seconds or not os.path.exists(self.object_path(entry["hash"])):
+            return None
+        return self.load(entry)
+
+    def latest_course_lists(self):
+        """
+        Return the newest course list snapshot of every term
+
+        Returns:
+            Dictionary of term ID to (timestamp, path relative to api_data)
+        """
+        latest = {}
+        with self._lock:
+            for key, snapshots in self.index["snapshots"].items():
+                match = COURSE_LIST_KEY_PATTERN.match(key)
+                if match and snapshots:
+                    latest[int(match.group(1))] = (snapshots[-1]["time"], self.relative_path(snapshots[-1]))
+        return latest
+
+    def _apply_retention(self, key):
+        snapshots = self.index["snapshots"][key]
+        # The newest snapshot is always kept
+        keep = set(range(max(len(snapshots) - max(self.keep_last, 1), 0), len(snapshots)))
+        days = {}
+        for position, snapshot in enumerate(snapshots):
+            days[snapshot["time"][:8]] = position  # The newest of each day wins
+        for day in sorted(days)[-self.keep_daily:] if self.keep_daily > 0 else []:
+            keep.add(days[day])
+        self.index["snapshots"][key] = [s for position, s in enumerate(snapshots) if position in keep]
+        return len(snapshots) - len(keep)
+
+    def _delete_unreferenced(self):
+        referenced = {
+            snapshot["hash"] for snapshots in self.index["snapshots"].values() for snapshot in snapshots
+        }
+        removed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed
+        for file_name in os.listdir(self.objects_dir):
+            object_hash = file_name.split(".", 1)[0]
+            if object_hash not in referenced:
+                os.remove(os.path.join(self.objects_dir, file_name))
+                removed += 1
+        return removed
+
+    def prune(self):
+        """
+        Apply the retention policy to every key
+
+        Returns:
+            Tuple of (snapshots evicted, object files deleted)
+        """
+        with self._lock:
+            evicted = sum(self._apply_retention(key) for key in list(self.index["snapshots"]))
+            self._save_index()
+            return evicted, self._delete_unreferenced()
+
+    def import_legacy_snapshots(self, remove=False):
+        """
+        Move courses_term_{id}_{timestamp}.json files written before the store
+        existed into it, oldest first
+
+        Args:
+            remove: Delete each file once it is in the store
+
+        Returns:
+            Number of files imported
+        """
+        if not os.path.isdir(self.api_data_dir):
+            return 0
+        legacy = sorted(
+            (match.group(2), match.group(0), int(match.group(1)))
+            for match in map(SNAPSHOT_FILE_PATTERN.match, os.listdir(self.api_data_dir))
+            if match
+        )
+        for timestamp, file_name, term_id in legacy:
+            path = os.path.join(self.api_data_dir, file_name)
+            with open(path, "r") as f:
+                data = json.load(f)
+            self.put(course_list_key(term_id), data, datetime.strptime(timestamp, TIMESTAMP_FORMAT))
+            if remove:
+                os.remove(path)
+        return len(legacy)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply the retention policy to the api_data snapshot store."
+    )
+    parser.add_argument(
+        "--keep-last", type=int, default=DEFAULT_KEEP_LAST,
+        help=f"Snapshots to keep per key (default: {DEFAULT_KEEP_LAST})",
+    )
+    parser.add_argument(
+        "--keep-daily", type=int, default=DEFAULT_KEEP_DAILY,
+        help=f"Also keep the newest snapshot of each of the last N days (default: {DEFAULT_KEEP_DAILY})",
+    )
+    parser.add_argument(
+        "--import-legacy", action="store_true",
+        help="Move courses_term_*_<timestamp>.json files into the store first",
+    )
+    args = parser.parse_args()
+
+    api_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_data")
+    store = SnapshotStore(api_data_dir, args.keep_last, args.keep_daily)
+    if args.import_legacy:
+        print(f"Imported {store.import_legacy_snapshots(remove=True)} legacy snapshot files")
+    evicted, deleted = store.prune()
+    print(f"Evicted {evicted} snapshots and deleted {deleted} unreferenced objects in {api_data_dir}")
+
+
+if __name__ == "__main__":
+    main()
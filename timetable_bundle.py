@@ -0,0 +1,180 @@
+import glob
+import json
+import os
+
+from timetable_events import (
+    NORMALISED_FIELDS,
+    join_description,
+    normalise_event,
+    split_description,
+)
+from timetable_output import write_json
+
+BUNDLE_FILE_NAME = "bundle.json"
+BUNDLE_FORMAT = "columnar-v1"
+
+
+def build_columnar_bundle(events):
+    """
+    Store events column by column with every distinct value kept once.
+    Rooms, instructors, session types, dates and times repeat across events,
+    so each column is a list of indexes into a shared "values" list.
+
+    Args:
+        events: List of DataList events
+
+    Returns:
+        Bundle dictionary; load_columnar_bundle() restores the original events.
+        Normalised fields are not stored since they are rebuilt on load.
+    """
+    normalised = bool(events) and "CourseCode" in events[0]
+    values = []
+    value_indexes = {}
+
+    def ref(value):
+        key = json.dumps(value)
+        if key not in value_indexes:
+            value_indexes[key] = len(values)
+            values.append(value)
+        return value_indexes[key]
+
+    columns = {
+        "date": [],
+        "start": [],
+        "end": [],
+        "course": [],
+        "session": [],
+        "group": [],
+        "instructors": [],
+        "locations": [],
+        "description": [],
+        "fields": [],
+    }
+    for event in events:
+        event = dict(event)
+        date = event.pop("EventDate")
+        start = event.pop("EventStartTime")
+        end = event.pop("EventEndTime")
+        description = event.pop("EventDescription")
+
+        columns["date"].append(ref(date[:10] if date.endswith("T00:00:00") else date))
+        # Times are stored without their date when it matches the event date
+        columns["start"].append(ref(start[11:] if start[:10] == date[:10] else start))
+        columns["end"].append(ref(end[11:] if end[:10] == date[:10] else end))
+
+        parts = split_description(description)
+        if parts:
+            columns["course"].append(ref(parts["course"]))
+            columns["session"].append(ref(parts["session"]))
+            columns["group"].append(ref(parts["group"]))
+            columns["instructors"].append(ref(parts["instructors"]))
+            columns["locations"].append(
+                [[ref(room), ref(dates)] for room, dates in parts["locations"]]
+            )
+            columns["description"].append(-1)
+        else:
+            # Unusual descriptions are kept whole
+            for name in ("course", "session", "group", "instructors"):
+                columns[name].append(-1)
+            columns["locations"].append([])
+            columns["description"].append(ref(description))
+
+        # Remaining fields (Id, CourseId, ...) are nearly always the same
+        for field in NORMALISED_FIELDS:
+            event.pop(field, None)
+        columns["fields"].append(ref(event))
+
+    return {
+        "format": BUNDLE_FORMAT,
+        "count": len(events),
+        "normalised": normalised,
+        "values": values,
+        "columns": columns,
+    }
+
+
+def load_columnar_bundle(bundle):
+    """
+    Restore the DataList events stored by build_columnar_bundle()
+
+    Args:
+        bundle: Bundle dictionary
+
+    Returns:
+        List of events with the original keys and values
+    """
+    values = bundle["values"]
+    columns = bundle["columns"]
+    events = []
+    for i in range(bundle["count"]):
+        date = values[columns["date"][i]]
+        if "T" not in date:
+            date += "T00:00:00"
+        start = values[columns["start"][i]]
+        end = values[columns["end"][i]]
+
+        if columns["description"][i] >= 0:
+            description = values[columns["description"][i]]
+        else:
+            description = join_description(
+                {
+                    "course": values[columns["course"][i]],
+                    "session": values[columns["session"][i]],
+                    "group": values[columns["group"][i]],
+                    "instructors": values[columns["instructors"][i]],
+                    "locations": [
+                        [values[room], values[dates]] for room, dates in columns["locations"][i]
+                    ],
+                }
+            )
+
+        event = {
+            "EventDate": date,
+            "EventStartTime": start if "T" in start else f"{date[:10]}T{start}",
+            "EventEndTime": end if "T" in end else f"{date[:10]}T{end}",
+            "EventDescription": description,
+        }
+        event.update(values[columns["fields"][i]])
+        if bundle.get("normalised"):
+            normalise_event(event)
+        events.append(event)
+    return events
+
+
+def read_term_events(term_dir):
+    """
+    Read the events of every batch file in a term directory
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+
+    Returns:
+        List of events in batch file order
+    """
+    events = []
+    batch_files = glob.glob(os.path.join(term_dir, "batch_*_timetable.json"))
+    # batch_2 before batch_10
+    batch_files.sort(key=lambda path: int(os.path.basename(path).split("_")[1]))
+    for batch_file in batch_files:
+        with open(batch_file, "r") as f:
+            events.extend(json.load(f).get("DataList") or [])
+    return events
+
+
+def write_term_bundle(term_dir, term):
+    """
+    Write the columnar bundle of all events of a term
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+        term: Term dictionary with id, name and code
+
+    Returns:
+        Path of the bundle file
+    """
+    bundle = build_columnar_bundle(read_term_events(term_dir))
+    bundle["term_id"] = term["id"]
+    bundle["term_code"] = term["code"]
+    bundle_file = os.path.join(term_dir, BUNDLE_FILE_NAME)
+    write_json(bundle_file, bundle)
+    return bundle_file
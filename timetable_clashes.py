@@ -0,0 +1,227 @@
+import argparse
+import glob
+import heapq
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from timetable_events import iter_file_events, normalise_event
+from timetable_output import write_json
+
+CLASH_REPORT_FILE_NAME = "clash_report.json"
+
+# Rooms that can hold any number of classes at once
+SHARED_ROOMS = ("ONLINE",)
+
+
+def load_occurrences(term_dirs):
+    """
+    Read every batch file of the given terms into unique class occurrences.
+    The same class is often listed in several batch files or terms; those
+    copies are merged so they do not clash with themselves.
+
+    Args:
+        term_dirs: List of term_{id}_{code} directories
+
+    Returns:
+        List of occurrence dictionaries with start, end, course, session,
+        group, room, instructors, description and the term IDs listing it
+    """
+    occurrences = {}
+    for term_dir in term_dirs:
+        term_id = int(os.path.basename(term_dir).split("_", 2)[1])
+        for path in sorted(glob.glob(os.path.join(term_dir, "batch_*_timetable.json"))):
+            for event in iter_file_events(path):
+                if not event.get("EventStartTime") or not event.get("EventEndTime"):
+                    continue
+                key = (event.get("EventDescription"), event["EventStartTime"], event["EventEndTime"])
+                if key in occurrences:
+                    if term_id not in occurrences[key]["terms"]:
+                        occurrences[key]["terms"].append(term_id)
+                    continue
+                normalise_event(event)
+                occurrences[key] = {
+                    "start": event["EventStartTime"],
+                    "end": event["EventEndTime"],
+                    "course": event.get("CourseCode"),
+                    "session": event.get("SessionType"),
+                    "group": event.get("GroupNumber"),
+                    "room": event.get("Room"),
+                    "instructors": event.get("Instructors") or [],
+                    "description": event.get("EventDescription"),
+                    "terms": [term_id],
+                }
+    return list(occurrences.values())
+
+
+def build_interval_index(occurrences, key_function):
+    """
+    Group occurrences by a resource and sort each group by start time
+
+    Args:
+        occurrences: List from load_occurrences()
+        key_function: Returns the resources (rooms or instructors) an
+            occurrence uses
+
+    Returns:
+        Dictionary of resource to its occurrences sorted by (start, end)
+    """
+    index = defaultdict(list)
+    for occurrence in occurrences:
+        for resource in key_function(occurrence):
+            index[resource].append(occurrence)
+    for intervals in index.values():
+        intervals.sort(key=lambda o: (o["start"], o["end"]))
+    return index
+
+
+def sweep_overlaps(intervals):
+    """
+    Find every overlapping pair in a list of intervals sorted by start.
+    Intervals still running are kept in a heap ordered by end time, so the
+    cost is O(n log n) plus the number of overlaps instead of O(n^2).
+    Intervals that only touch (one ends when the next starts) do not overlap.
+
+    Args:
+        intervals: Occurrences sorted by (start, end)
+
+    Yields:
+        Tuples of (earlier occurrence, later occurrence)
+    """
+    active = []
+    for position, interval in enumerate(intervals):
+        while active and active[0][0] <= interval["start"]:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, interval
+        heapq.heappush(active, (interval["end"], position, interval))
+
+
+def describe(occurrence):
+    return {
+        "course": occurrence["course"],
+        "session": occurrence["session"],
+        "group": occurrence["group"],
+        "room": occurrence["room"],
+        "instructors": occurrence["instructors"],
+        "start": occurrence["start"],
+        "end": occurrence["end"],
+        "terms": occurrence["terms"],
+    }
+
+
+def find_clashes(occurrences, include_shared_rooms=False):
+    """
+    Find double-booked rooms and instructors
+
+    Args:
+        occurrences: List from load_occurrences()
+        include_shared_rooms: Also report rooms listed in SHARED_ROOMS
+
+    Returns:
+        Dictionary with "rooms" and "instructors", each mapping a resource to
+        its clashes. A clash holds the overlapping time, both occurrences and
+        whether they are sessions of the same course (often combined groups).
+    """
+    def rooms(occurrence):
+        room = occurrence["room"]
+        if room and (include_shared_rooms or room.upper() not in SHARED_ROOMS):
+            return [room]
+        return []
+
+    def instructors(occurrence):
+        return occurrence["instructors"]
+
+    report = {}
+    for kind, key_function in (("rooms", rooms), ("instructors", instructors)):
+        clashes = defaultdict(list)
+        for resource, intervals in sorted(build_interval_index(occurrences, key_function).items()):
+            for first, second in sweep_overlaps(intervals):
+                clashes[resource].append({
+                    "overlap_start": max(first["start"], second["start"]),
+                    "overlap_end": min(first["end"], second["end"]),
+                    "same_course": first["course"] == second["course"],
+                    "first": describe(first),
+                    "second": describe(second),
+                })
+        report[kind] = dict(clashes)
+    return report
+
+
+def summarise_by_term(report):
+    """
+    Count the clashes of each term, or of each pair of terms for clashes
+    between classes of different terms
+
+    Returns:
+        Dictionary of "303" or "303+308" to {"rooms": n, "instructors": n}
+    """
+    summary = defaultdict(lambda: {"rooms": 0, "instructors": 0})
+    for kind in ("rooms", "instructors"):
+        for clashes in report[kind].values():
+            for clash in clashes:
+                terms = sorted(set(clash["first"]["terms"]) | set(clash["second"]["terms"]))
+                summary["+".join(map(str, terms))][kind] += 1
+    return dict(sorted(summary.items()))
+
+
+def print_report(report, by_term, details=True):
+    for kind, label in (("rooms", "Room"), ("instructors", "Instructor")):
+        total = sum(len(clashes) for clashes in report[kind].values())
+        print(f"\n=== {label} clashes: {total} ===")
+        if not details:
+            continue
+        for resource, clashes in report[kind].items():
+            print(f"{resource}: {len(clashes)}")
+            for clash in clashes:
+                start = datetime.fromisoformat(clash["overlap_start"])
+                end = datetime.fromisoformat(clash["overlap_end"])
+                first, second = clash["first"], clash["second"]
+                note = "  (same course)" if clash["same_course"] else ""
+                print(
+                    f"  {start:%Y-%m-%d %a %H:%M}-{end:%H:%M}  "
+                    f"{first['course']} {first['session']}-{first['group']} vs "
+                    f"{second['course']} {second['session']}-{second['group']}{note}"
+                )
+
+    print("\n=== Clashes by term ===")
+    for terms, counts in by_term.items():
+        print(f"  {terms:<16} rooms: {counts['rooms']:>4}  instructors: {counts['instructors']:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find double-booked rooms and instructors across terms."
+    )
+    parser.add_argument("terms", nargs="*", type=int, help="Term IDs to check (default: every term)")
+    parser.add_argument(
+        "--include-online", action="store_true", help="Also report overlapping ONLINE sessions"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Only print the per-term summary")
+    args = parser.parse_args()
+
+    timetables_dir = os.path.join(os.path.dirname(__file__), "course_timetables")
+    term_dirs = sorted(glob.glob(os.path.join(timetables_dir, "term_*")))
+    if args.terms:
+        term_dirs = [d for d in term_dirs if int(os.path.basename(d).split("_", 2)[1]) in args.terms]
+
+    occurrences = load_occurrences(term_dirs)
+    print(f"Checking {len(occurrences)} class occurrences from {len(term_dirs)} terms")
+
+    report = find_clashes(occurrences, args.include_online)
+    by_term = summarise_by_term(report)
+    print_report(report, by_term, details=not args.quiet)
+
+    output_file = os.path.join(timetables_dir, CLASH_REPORT_FILE_NAME)
+    write_json(output_file, {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "terms": [int(os.path.basename(d).split("_", 2)[1]) for d in term_dirs],
+        "occurrences": len(occurrences),
+        "by_term": by_term,
+        **report,
+    })
+    print(f"\nClash report saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
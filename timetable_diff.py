@@ -0,0 +1,267 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from timetable_events import NORMALISED_FIELDS, iter_file_events, normalise_event
+from timetable_output import write_json
+
+CHANGE_FEED_FILE_NAME = "change_feed.jsonl"
+CHANGE_FORMAT = "timetable-changes-v1"
+
+# Fields of a change record, and where a modified event says what changed
+CHANGE_FIELDS = ("start", "end", "room", "instructors", "description")
+
+
+def event_digest(event):
+    """
+    Hash the API fields of an event; the parsed fields are left out because
+    they follow from the description, so raw and normalised copies match
+    """
+    fields = {k: v for k, v in event.items() if k not in NORMALISED_FIELDS}
+    encoded = json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def describe_event(event):
+    """
+    Reduce an event to the compact form used in the change feed
+    """
+    if "CourseCode" not in event:
+        event = dict(event)
+        normalise_event(event)
+    start = event.get("EventStartTime") or ""
+    end = event.get("EventEndTime") or ""
+    return {
+        "course": event.get("CourseCode"),
+        "session": event.get("SessionType"),
+        "group": event.get("GroupNumber"),
+        "date": (event.get("EventDate") or start)[:10],
+        "start": start[11:16],
+        "end": end[11:16],
+        "room": event.get("Room"),
+        "instructors": event.get("Instructors") or [],
+        "description": event.get("EventDescription"),
+    }
+
+
+def event_identity(described):
+    """
+    Stable identity of an occurrence: course, session type, group, date and start time
+    """
+    return (described["course"], described["session"], described["group"], described["date"], described["start"])
+
+
+def pair_changes(removed, added, key_function):
+    """
+    Pair removed and added occurrences that share a key, in order
+
+    Returns:
+        Tuple of (list of (old, new) pairs, unpaired removed, unpaired added)
+    """
+    added_by_key = defaultdict(list)
+    for described in added:
+        added_by_key[key_function(described)].append(described)
+    pairs = []
+    unpaired_removed = []
+    for described in removed:
+        candidates = added_by_key.get(key_function(described))
+        if candidates:
+            pairs.append((described, candidates.pop(0)))
+        else:
+            unpaired_removed.append(described)
+    unpaired_added = [described for candidates in added_by_key.values() for described in candidates]
+    return pairs, unpaired_removed, unpaired_added
+
+
+def diff_events(old_events, new_events):
+    """
+    Compare two snapshots of a term's events.
+
+    Every event is hashed first; events whose hash appears on both sides are
+    unchanged and never looked at again, so an unchanged refresh costs one
+    hash per event. The rest are matched by event_identity() into modified
+    events (e.g. a new room), and then by course, session, group and date
+    alone, which catches classes moved to another time on the same day.
+    Whatever is left was added or removed. The same class listed twice on a
+    date counts twice.
+
+    Args:
+        old_events: Events of the earlier snapshot
+        new_events: Events of the later snapshot
+
+    Returns:
+        Dictionary with "added" and "removed" lists of describe_event()
+        records and a "modified" list of {"before", "after", "changed"}
+        records, "changed" naming the CHANGE_FIELDS that differ
+    """
+    old_digests = [event_digest(event) for event in old_events]
+    new_digests = [event_digest(event) for event in new_events]
+    unchanged = Counter(old_digests) & Counter(new_digests)
+
+    def leftovers(events, digests):
+        remaining = Counter(unchanged)
+        result = []
+        for event, digest in zip(events, digests):
+            if remaining[digest]:
+                remaining[digest] -= 1
+            else:
+                result.append(describe_event(event))
+        return result
+
+    removed = leftovers(old_events, old_digests)
+    added = leftovers(new_events, new_digests)
+
+    pairs, removed, added = pair_changes(removed, added, event_identity)
+    moved, removed, added = pair_changes(removed, added, lambda d: event_identity(d)[:4])
+    modified = []
+    for before, after in pairs + moved:
+        changed = [field for field in CHANGE_FIELDS if before[field] != after[field]]
+        modified.append({"before": before, "after": after, "changed": changed})
+
+    def order(described):
+        return (described["course"] or "", described["date"], described["start"], described["session"] or "")
+
+    return {
+        "added": sorted(added, key=order),
+        "removed": sorted(removed, key=order),
+        "modified": sorted(modified, key=lambda change: order(change["after"])),
+    }
+
+
+def affected_courses(changes):
+    courses = set()
+    for kind in ("added", "removed"):
+        courses.update(described["course"] for described in changes[kind])
+    for change in changes["modified"]:
+        courses.update((change["before"]["course"], change["after"]["course"]))
+    return sorted(course for course in courses if course)
+
+
+def exclude_courses(changes, course_codes):
+    """
+    Drop the changes of the given courses, e.g. those a crawl could not fetch
+    """
+    course_codes = set(course_codes)
+    if not course_codes:
+        return changes
+    return {
+        "added": [d for d in changes["added"] if d["course"] not in course_codes],
+        "removed": [d for d in changes["removed"] if d["course"] not in course_codes],
+        "modified": [
+            change for change in changes["modified"]
+            if change["before"]["course"] not in course_codes and change["after"]["course"] not in course_codes
+        ],
+    }
+
+
+def build_change_document(changes, term=None):
+    """
+    Wrap a diff into the change feed format
+
+    Args:
+        changes: Result of diff_events()
+        term: Optional term dictionary with id and code
+
+    Returns:
+        Dictionary with the format, time, term, counts, affected course
+        codes and the changes
+    """
+    document = {
+        "format": CHANGE_FORMAT,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+    }
+    if term:
+        document["term_id"] = term["id"]
+        document["term_code"] = term["code"]
+    document["summary"] = {kind: len(changes[kind]) for kind in ("added", "removed", "modified")}
+    document["courses"] = affected_courses(changes)
+    document.update(changes)
+    return document
+
+
+def append_change_feed(output_dir, document):
+    """
+    Append one change document to course_timetables/change_feed.jsonl
+
+    Returns:
+        Path of the change feed
+    """
+    feed_file = os.path.join(output_dir, CHANGE_FEED_FILE_NAME)
+    with open(feed_file, "a") as f:
+        f.write(json.dumps(document, separators=(",", ":")) + "\n")
+    return feed_file
+
+
+def read_batch_events(term_dir, batch_files=None):
+    """
+    Read the events of a term's batch files
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+        batch_files: Batch file names to read, e.g. those a crawl manifest
+            lists for the term; None for every batch file in the directory
+
+    Returns:
+        List of events
+    """
+    if batch_files is None:
+        paths = glob.glob(os.path.join(term_dir, "batch_*_timetable.json"))
+    else:
+        paths = [os.path.join(term_dir, name) for name in batch_files]
+    # batch_2 before batch_10
+    paths.sort(key=lambda path: int(os.path.basename(path).split("_")[1]))
+    events = []
+    for path in paths:
+        if os.path.exists(path):
+            events.extend(iter_file_events(path))
+    return events
+
+
+def read_snapshot(path):
+    """
+    Read the events of a term directory or of a single timetable JSON file
+    """
+    if os.path.isdir(path):
+        return read_batch_events(path)
+    return list(iter_file_events(path))
+
+
+def print_changes(document):
+    summary = document["summary"]
+    print(f"{summary['added']} added, {summary['removed']} removed, {summary['modified']} modified")
+    for kind, sign in (("removed", "-"), ("added", "+")):
+        for described in document[kind]:
+            print(
+                f"  {sign} {described['course']} {described['session']}-{described['group']} "
+                f"{described['date']} {described['start']}-{described['end']} {described['room']}"
+            )
+    for change in document["modified"]:
+        before, after = change["before"], change["after"]
+        details = ", ".join(
+            f"{field} {before[field]} -> {after[field]}" for field in change["changed"] if field != "description"
+        ) or "description"
+        print(f"  ~ {after['course']} {after['session']}-{after['group']} {after['date']} {after['start']}: {details}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare two snapshots of a term's events (term directories or timetable JSON files)."
+    )
+    parser.add_argument("old", help="Earlier term directory or timetable file")
+    parser.add_argument("new", help="Later term directory or timetable file")
+    parser.add_argument("--output", help="Write the change document as JSON")
+    args = parser.parse_args()
+
+    document = build_change_document(diff_events(read_snapshot(args.old), read_snapshot(args.new)))
+    print_changes(document)
+    if args.output:
+        write_json(args.output, document)
+        print(f"Changes saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+from datetime import date
+from crawl_manifest import content_hash
+from timetable_output import write_json
+
+# "DBC121 - LE1 - 01, Melinda LianFah Kong; G407 - 03/03 to 04/07" -> "DBC121"
+COURSE_CODE_PATTERN = re.compile(r"^\s*([A-Za-z0-9]+)\s+-\s+")
+
+# "DBC121 - LE1 - 01, Melinda LianFah Kong" before the first "; "
+DESCRIPTION_HEAD_PATTERN = re.compile(
+    r"^(?P<course>[A-Za-z0-9]+) - (?P<session>[A-Za-z]+\d*) - (?P<group>\d+), (?P<instructors>.*)$"
+)
+
+# "03/03 to 04/07" or a single week "04/21"
+DATE_RANGE_PATTERN = re.compile(r"^(\d{1,2})/(\d{1,2})(?:\s+to\s+(\d{1,2})/(\d{1,2}))?$")
+
+# Filler name the portal adds to some instructor lists
+PLACEHOLDER_INSTRUCTORS = ("Class Schedule Instructor",)
+
+# Fields added by normalise_event(); everything in them comes from EventDescription
+NORMALISED_FIELDS = (
+    "CourseCode",
+    "SessionType",
+    "GroupNumber",
+    "Instructors",
+    "Room",
+    "Locations",
+)
+
+INDEX_FILE_NAME = "index.json"
+
+# Read size for iter_file_events(); memory use stays around one chunk plus one event
+STREAM_CHUNK_SIZE = 64 * 1024
+DATALIST_START_PATTERN = re.compile(r'"DataList"\s*:\s*\[')
+
+
+def extract_course_code(description):
+    """
+    Extract the course code from the start of an EventDescription
+
+    Args:
+        description: EventDescription string from the timetable API
+
+    Returns:
+        Upper-case course code, or None if the description has no code prefix
+    """
+    if not description:
+        return None
+    match = COURSE_CODE_PATTERN.match(description)
+    if not match:
+        return None
+    return match.group(1).upper()
+
+
+def split_description(description):
+    """
+    Split an EventDescription into its raw text parts.
+    Classes that move rooms mid-term list several "room - dates" segments:
+    "COS10003 - TU1 - 01, Jane Doe; A316 - 03/03 to 03/24; B516 - 03/31 to 04/07"
+
+    Args:
+        description: EventDescription string from the timetable API
+
+    Returns:
+        Dictionary with course, session, group, instructors and locations (a list
+        of [room, dates] pairs), or None if the description has another shape.
+        join_description() turns it back into the identical string.
+    """
+    if not description:
+        return None
+    head, *segments = description.split("; ")
+    match = DESCRIPTION_HEAD_PATTERN.match(head)
+    if not match or not segments:
+        return None
+
+    locations = []
+    for segment in segments:
+        room, separator, dates = segment.partition(" - ")
+        if not separator:
+            return None
+        locations.append([room, dates])
+
+    parts = match.groupdict()
+    parts["locations"] = locations
+    return parts
+
+
+def join_description(parts):
+    head = f"{parts['course']} - {parts['session']} - {parts['group']}, {parts['instructors']}"
+    segments = [f"{room} - {dates}" for room, dates in parts["locations"]]
+    return "; ".join([head] + segments)
+
+
+def parse_date_ranges(dates_text, year, month=None):
+    """
+    Parse "03/03 to 04/07, 04/21 to 05/26" into ISO date ranges
+
+    Args:
+        dates_text: Date part of a location segment (MM/DD, without a year)
+        year: Year of the event the dates belong to; a range ending in an
+            earlier month ends in the following year
+        month: Month of the event; a range crossing New Year that starts in
+            a later month started in the previous year, so "11/17 to 01/30"
+            of a January class runs from November of the year before
+
+    Returns:
+        List of {"Start": "YYYY-MM-DD", "End": "YYYY-MM-DD"}; parts that are not
+        dates are skipped
+    """
+    ranges = []
+    for part in dates_text.split(","):
+        match = DATE_RANGE_PATTERN.match(part.strip())
+        if not match:
+            continue
+        start_month, start_day, end_month, end_day = match.groups()
+        wraps = end_month and int(end_month) < int(start_month)
+        start_year = year - 1 if wraps and month and int(start_month) > month else year
+        try:
+            start = date(start_year, int(start_month), int(start_day))
+            if end_month:
+                end_year = start_year + 1 if wraps else start_year
+                end = date(end_year, int(end_month), int(end_day))
+            else:
+                end = start
+        except ValueError:
+            continue
+        ranges.append({"Start": start.isoformat(), "End": end.isoformat()})
+    return ranges
+
+
+def parse_event_description(description, year, month=None):
+    """
+    Parse an EventDescription once into typed fields
+
+    Args:
+        description: EventDescription string from the timetable API
+        year: Year of the event the MM/DD date ranges belong to
+        month: Month of the event, see parse_date_ranges()
+
+    Returns:
+        Dictionary with CourseCode, SessionType ("TU1"), GroupNumber ("01"),
+        Instructors (list, duplicates and placeholders removed) and Locations
+        (list of {"Room", "DateRanges"}), or None if the description has
+        another shape
+    """
+    parts = split_description(description)
+    if not parts:
+        return None
+
+    instructors = []
+    for name in parts["instructors"].split(","):
+        name = name.strip()
+        if name and name not in PLACEHOLDER_INSTRUCTORS and name not in instructors:
+            instructors.append(name)
+
+    return {
+        "CourseCode": parts["course"].upper(),
+        "SessionType": parts["session"],
+        "GroupNumber": parts["group"],
+        "Instructors": instructors,
+        "Locations": [
+            {"Room": room, "DateRanges": parse_date_ranges(dates, year, month)}
+            for room, dates in parts["locations"]
+        ],
+    }
+
+
+def normalise_event(event):
+    """
+    Add the parsed EventDescription fields to an event, next to the raw string.
+    Room is the room in use on the event's own date when the class moves rooms
+    during the term.
+
+    Args:
+        event: DataList event, updated in place
+
+    Returns:
+        True if the description could be parsed
+    """
+    event_date = event.get("EventDate") or ""
+    year = int(event_date[:4]) if event_date[:4].isdigit() else date.today().year
+    month = int(event_date[5:7]) if event_date[5:7].isdigit() else None
+    parsed = parse_event_description(event.get("EventDescription"), year, month)
+    if not parsed:
+        for field in NORMALISED_FIELDS:
+            event.pop(field, None)
+        event["CourseCode"] = extract_course_code(event.get("EventDescription"))
+        return False
+
+    day = event_date[:10]
+    room = parsed["Locations"][0]["Room"]
+    for location in parsed["Locations"]:
+        if any(r["Start"] <= day <= r["End"] for r in location["DateRanges"]):
+            room = location["Room"]
+            break
+    parsed["Room"] = room
+
+    event.update(parsed)
+    return True
+
+
+def normalise_events(timetable_data):
+    """
+    Normalise every event of a batch or course response in place
+
+    Args:
+        timetable_data: Dictionary with a DataList
+
+    Returns:
+        Number of events whose description could not be parsed
+    """
+    failures = 0
+    for event in timetable_data.get("DataList") or []:
+        if not normalise_event(event):
+            failures += 1
+    return failures
+
+
+def iter_file_events(path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the DataList events of one timetable file one at a time.
+    The file is read in chunks and each event is decoded as soon as it is
+    complete, so memory use does not grow with the size of the file.
+    Precompressed .gz files are read transparently.
+
+    Args:
+        path: Batch or per-course timetable file
+        chunk_size: Number of characters read at a time
+
+    Yields:
+        Event dictionaries in file order
+    """
+    decoder = json.JSONDecoder()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        buffer = ""
+        eof = False
+
+        def read_more():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+        # Skip ahead to the opening bracket of the DataList array
+        while True:
+            match = DATALIST_START_PATTERN.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            if eof:
+                return
+            # Keep a tail in case the key is split across chunks
+            buffer = buffer[-32:]
+            read_more()
+
+        while True:
+            position = 0
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            buffer = buffer[position:]
+
+            if not buffer:
+                if eof:
+                    raise ValueError(f"Unterminated DataList in {path}")
+                read_more()
+                continue
+            if buffer[0] == "]":
+                return
+
+            try:
+                event, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise
+                # The event continues in the next chunk
+                read_more()
+                continue
+            buffer = buffer[end:]
+            yield event
+
+
+def iter_events(paths, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the events of many timetable files, one file and one event at a time
+
+    Args:
+        paths: Iterable of batch or per-course timetable file paths
+        chunk_size: Number of characters read at a time
+
+    Yields:
+        Event dictionaries
+    """
+    for path in paths:
+        yield from iter_file_events(path, chunk_size)
+
+
+def course_file_name(course_code):
+    return f"{course_code}_timetable.json"
+
+
+def partition_events(timetable_data, course_codes):
+    """
+    Route each event of a batch response to the course it belongs to
+
+    Args:
+        timetable_data: Batch response from GetClassScheduleByTermId
+        course_codes: Course codes that were requested in the batch
+
+    Returns:
+        Tuple of (dictionary of course code to {"DataList": [...]}, list of
+        events whose course code was not part of the batch)
+    """
+    partitions = {code: {"DataList": []} for code in course_codes}
+    codes_by_key = {code.upper(): code for code in course_codes}
+    unmatched = []
+
+    for event in timetable_data.get("DataList") or []:
+        code = codes_by_key.get(extract_course_code(event.get("EventDescription")))
+        if code is not None:
+            partitions[code]["DataList"].append(event)
+        else:
+            unmatched.append(event)
+
+    return partitions, unmatched
+
+
+def write_course_partitions(term_dir, partitions, batch_file_name, known_hashes=None):
+    """
+    Write one timetable file per course and describe them for the term index
+
+    Args:
+        term_dir: Output directory for the term
+        partitions: Result of partition_events
+        batch_file_name: Name of the batch file the events came from
+        known_hashes: Optional dictionary of course code to the hash of the file
+            already on disk; matching files are left untouched
+
+    Returns:
+        Dictionary of course code to its index entry, with "written" set to
+        whether the file was (re)written
+    """
+    known_hashes = known_hashes or {}
+    entries = {}
+    for code, course_data in partitions.items():
+        file_name = course_file_name(code)
+        file_path = os.path.join(term_dir, file_name)
+        data_hash = content_hash(course_data["DataList"])
+
+        written = known_hashes.get(code) != data_hash or not os.path.exists(file_path)
+        if written:
+            write_json(file_path, course_data)
+        entries[code] = {
+            "file": file_name,
+            "batch_file": batch_file_name,
+            "events": len(course_data["DataList"]),
+            "hash": data_hash,
+            "written": written,
+        }
+    return entries
+
+
+def write_term_index(term_dir, term, course_entries):
+    """
+    Merge course entries into the term's index.json.
+    Entries from earlier runs are kept so a failed batch does not drop its courses.
+
+    Args:
+        term_dir: Output directory for the term
+        term: Term dictionary with id, name and code
+        course_entries: Dictionary of course code to index entry
+
+    Returns:
+        Path of the index file
+    """
+    index_file = os.path.join(term_dir, INDEX_FILE_NAME)
+    courses = {}
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, "r") as f:
+                courses = json.load(f).get("courses", {})
+        except (ValueError, OSError) as e:
+            print(f"  Warning: Ignoring unreadable index {index_file}: {str(e)}")
+
+    for code, entry in course_entries.items():
+        courses[code] = {key: value for key, value in entry.items() if key != "written"}
+    index_data = {
+        "term_id": term["id"],
+        "term_name": term["name"],
+        "term_code": term["code"],
+        "courses": dict(sorted(courses.items())),
+    }
+    write_json(index_file, index_data)
+    return index_file
+
+
+def partition_term_directory(term_dir):
+    """
+    Rebuild the per-course files and index.json of an existing term directory
+    from its batch files, replacing the duplicated full-batch copies. Batch
+    files are normalised in place first.
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+
+    Returns:
+        Number of course files written
+    """
+    dir_name = os.path.basename(os.path.normpath(term_dir))
+    parts = dir_name.split("_", 2)
+    term = {
+        "id": int(parts[1]),
+        "code": parts[2],
+        "name": parts[2].replace("_", " "),
+    }
+
+    # Courses that already have a file keep one, even if they have no events
+    existing_codes = {
+        os.path.basename(path)[: -len("_timetable.json")]
+        for path in glob.glob(os.path.join(term_dir, "*_timetable.json"))
+        if not os.path.basename(path).startswith("batch_")
+    }
+
+    entries = {}
+    for batch_file in sorted(glob.glob(os.path.join(term_dir, "batch_*_timetable.json"))):
+        with open(batch_file, "r") as f:
+            timetable_data = json.load(f)
+        normalise_events(timetable_data)
+        write_json(batch_file, timetable_data)
+        batch_codes = {
+            extract_course_code(event.get("EventDescription"))
+            for event in timetable_data.get("DataList") or []
+        }
+        batch_codes.discard(None)
+        partitions, _ = partition_events(timetable_data, batch_codes)
+        entries.update(
+            write_course_partitions(term_dir, partitions, os.path.basename(batch_file))
+        )
+
+    empty = {code: {"DataList": []} for code in existing_codes - set(entries)}
+    entries.update(write_course_partitions(term_dir, empty, None))
+
+    write_term_index(term_dir, term, entries)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Normalise batch timetable files and split them into per-course files and a term index."
+    )
+    parser.add_argument(
+        "term_dirs",
+        nargs="*",
+        help="Term directories to partition (default: every course_timetables/term_* directory)",
+    )
+    args = parser.parse_args()
+
+    term_dirs = args.term_dirs or sorted(
+        glob.glob(os.path.join(os.path.dirname(__file__), "course_timetables", "term_*"))
+    )
+    for term_dir in term_dirs:
+        count = partition_term_directory(term_dir)
+        print(f"Partitioned {count} courses in {term_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,187 +1,779 @@
+import argparse
+import csv
 import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import os
 import glob
+from collections import Counter
+from itertools import islice
+from course_catalogue import load_course_lookup
+from crawl_manifest import content_hash
+from data_manifest import file_hash
+from timetable_events import COURSE_CODE_PATTERN, iter_file_events
+from timetable_output import write_json
 
 # File paths
 current_dir = os.path.dirname(__file__)
 timetables_dir = os.path.join(current_dir, 'course_timetables')
 course_summary_file = os.path.join(current_dir, 'course_summary.json')
 
-print("Loading course summary...")
-# Load course ID to course code mapping
-with open(course_summary_file, 'r') as file:
-    course_lookup = json.load(file)
-
-# Process all batch timetable files
-print("Processing timetable data...")
-batch_files = glob.glob(os.path.join(timetables_dir, 'batch_*_timetable.json'))
-print(f"Found {len(batch_files)} batch files to process")
-
-# Process the schedule data
-classes = []
-total_events = 0
-
-for batch_file in batch_files:
-    print(f"Processing {os.path.basename(batch_file)}...")
-    with open(batch_file, 'r') as file:
-        schedule_data = json.load(file)
-    
-    # Process each event in the batch
-    if 'DataList' in schedule_data:
-        batch_events = 0
-        for event in schedule_data['DataList']:
-            try:
-                event_date = datetime.strptime(event['EventDate'], '%Y-%m-%dT%H:%M:%S')
-                event_start = datetime.strptime(event['EventStartTime'], '%Y-%m-%dT%H:%M:%S')
-                event_end = datetime.strptime(event['EventEndTime'], '%Y-%m-%dT%H:%M:%S')
-                
-                # Extract day of week and hour
-                day_of_week = event_date.strftime('%A')
-                start_hour = event_start.hour
-                end_hour = event_end.hour
-                
-                # Extract course code - use either from the event or lookup by course ID
-                course_code = None
-                if 'CourseCode' in event:
-                    course_code = event['CourseCode']
-                elif 'CourseID' in event and str(event['CourseID']) in course_lookup:
-                    course_code = course_lookup[str(event['CourseID'])]
-                
-                # If we still don't have a course code, try to extract from description
-                if not course_code:
-                    description = event['EventDescription']
-                    if ' - ' in description:
-                        course_code = description.split(' - ')[0]
-                    else:
-                        course_code = 'Unknown'
-                
-                # Create a record for each hour block the class occupies
-                for hour in range(start_hour, end_hour + 1):
-                    classes.append({
-                        'Day': day_of_week,
-                        'Hour': hour,
-                        'CourseCode': course_code,
-                        'StartHour': start_hour,
-                        'EndHour': end_hour,
-                        'Description': event['EventDescription'],
-                        'EventDate': event_date.strftime('%Y-%m-%d')
-                    })
-                batch_events += 1
-            except (ValueError, KeyError) as e:
-                # Skip events with invalid format
-                print(f"  Warning: Skipped an event due to {str(e)}")
+DAYS_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS_RANGE = list(range(8, 22))  # 8am to 9pm
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# pandas and numpy are imported by the functions that aggregate events, and
+# matplotlib and seaborn by the ones that draw; the data-only outputs of an
+# up-to-date aggregate store need none of them
+
+# Events converted to arrays at a time; bounds memory while keeping pandas busy
+EVENT_CHUNK_SIZE = 20000
+
+AGGREGATES_FILE_NAME = 'heatmap_aggregates.json'
+AGGREGATES_VERSION = 1
+
+
+def find_batch_files(timetables_dir):
+    """
+    Find the batch files of every term. Per-course files hold the same events
+    again, so they are not included.
+
+    Args:
+        timetables_dir: The course_timetables directory
+
+    Returns:
+        Sorted list of batch file paths
+    """
+    return sorted(glob.glob(os.path.join(timetables_dir, 'term_*', 'batch_*_timetable.json')))
+
+
+def iter_event_chunks(events, chunk_size=EVENT_CHUNK_SIZE):
+    """
+    Group an event stream into lists of at most chunk_size events
+    """
+    events = iter(events)
+    while True:
+        chunk = list(islice(events, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def expand_class_hours(events, course_lookup):
+    """
+    Turn events into one row per hour block each class occupies.
+    Timestamps are parsed in bulk and the hour blocks are expanded with array
+    operations; a class from 9:00 to 11:00 counts for hours 9, 10 and 11.
+
+    Args:
+        events: List of event dictionaries
+        course_lookup: Dictionary of str(CourseID) to course code
+
+    Returns:
+        Tuple of (DataFrame with Day, Hour, CourseCode and Description columns,
+        number of events skipped because of missing or invalid fields)
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(events)
+    for column in ('EventDate', 'EventStartTime', 'EventEndTime', 'EventDescription'):
+        if column not in frame:
+            frame[column] = None
+
+    dates = pd.to_datetime(frame['EventDate'], format=TIMESTAMP_FORMAT, errors='coerce')
+    starts = pd.to_datetime(frame['EventStartTime'], format=TIMESTAMP_FORMAT, errors='coerce')
+    ends = pd.to_datetime(frame['EventEndTime'], format=TIMESTAMP_FORMAT, errors='coerce')
+    valid = (dates.notna() & starts.notna() & ends.notna() & frame['EventDescription'].notna()).to_numpy()
+    skipped = int((~valid).sum())
+
+    # Use the normalised field, then the lookup by course ID, then the description
+    course_codes = pd.Series(np.nan, index=frame.index, dtype=object)
+    if 'CourseCode' in frame:
+        course_codes = frame['CourseCode'].where(frame['CourseCode'].fillna('') != '')
+    if 'CourseId' in frame and course_lookup:
+        course_codes = course_codes.fillna(frame['CourseId'].astype(str).map(course_lookup))
+    course_codes = course_codes.fillna(
+        frame['EventDescription'].str.extract(COURSE_CODE_PATTERN, expand=False).str.upper()
+    ).fillna('Unknown')
+
+    start_hours = starts.dt.hour.to_numpy()[valid].astype(np.int64)
+    end_hours = ends.dt.hour.to_numpy()[valid].astype(np.int64)
+    lengths = np.clip(end_hours - start_hours + 1, 0, None)
+
+    # Row i of the result belongs to event rows[i] and is offsets[i] hours after its start
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    class_hours = pd.DataFrame({
+        'Day': dates.dt.day_name().to_numpy()[valid][rows],
+        'Hour': start_hours[rows] + offsets,
+        'CourseCode': course_codes.to_numpy()[valid][rows],
+        'Description': frame['EventDescription'].to_numpy()[valid][rows],
+    })
+    return class_hours, skipped
+
+
+def aggregate_class_hours(events, course_lookup, chunk_size=EVENT_CHUNK_SIZE):
+    """
+    Aggregate an event stream chunk by chunk, so memory use depends on the
+    chunk size and the number of distinct days, hours and courses rather than
+    on the number of events
+
+    Args:
+        events: Iterable of event dictionaries, e.g. from iter_file_events()
+        course_lookup: Dictionary of str(CourseID) to course code
+        chunk_size: Number of events converted to arrays at a time
+
+    Returns:
+        Dictionary with the class hour counts per (Day, Hour) and per course,
+        the distinct (Day, CourseCode) and (Hour, CourseCode) pairs, the set of
+        descriptions and the number of events processed and skipped
+    """
+    import numpy as np
+    import pandas as pd
+
+    counts = course_hours = day_courses = hour_courses = None
+    descriptions = set()
+    total_events = 0
+    skipped_events = 0
+
+    for chunk in iter_event_chunks(events, chunk_size):
+        class_hours, skipped = expand_class_hours(chunk, course_lookup)
+        total_events += len(chunk) - skipped
+        skipped_events += skipped
+        print(f"  Processed {total_events} events")
+        if class_hours.empty:
+            continue
+
+        chunk_counts = class_hours.groupby(['Day', 'Hour']).size()
+        chunk_course_hours = class_hours['CourseCode'].value_counts()
+        chunk_day_courses = class_hours[['Day', 'CourseCode']].drop_duplicates()
+        chunk_hour_courses = class_hours[['Hour', 'CourseCode']].drop_duplicates()
+        if counts is None:
+            counts, course_hours = chunk_counts, chunk_course_hours
+            day_courses, hour_courses = chunk_day_courses, chunk_hour_courses
+        else:
+            counts = counts.add(chunk_counts, fill_value=0)
+            course_hours = course_hours.add(chunk_course_hours, fill_value=0)
+            day_courses = pd.concat([day_courses, chunk_day_courses]).drop_duplicates()
+            hour_courses = pd.concat([hour_courses, chunk_hour_courses]).drop_duplicates()
+        descriptions.update(class_hours['Description'].unique())
+
+    if counts is None:
+        counts = pd.Series(dtype=np.int64)
+        course_hours = pd.Series(dtype=np.int64)
+        day_courses = pd.DataFrame(columns=['Day', 'CourseCode'])
+        hour_courses = pd.DataFrame(columns=['Hour', 'CourseCode'])
+
+    return {
+        'counts': counts.astype(np.int64),
+        'course_hours': course_hours.astype(np.int64),
+        'day_courses': day_courses,
+        'hour_courses': hour_courses,
+        'descriptions': descriptions,
+        'total_events': total_events,
+        'skipped_events': skipped_events,
+    }
+
+
+def build_heatmap_matrix(counts):
+    """
+    Turn class hour counts per (Day, Hour) into an hour x day matrix covering
+    HOURS_RANGE and DAYS_ORDER, with zeros where there are no classes
+    """
+    import numpy as np
+    import pandas as pd
+
+    if counts.empty:
+        return pd.DataFrame(0, index=HOURS_RANGE, columns=DAYS_ORDER)
+    return counts.unstack('Day').reindex(index=HOURS_RANGE, columns=DAYS_ORDER).fillna(0).astype(np.int64)
+
+
+def batch_file_contribution(path, course_lookup):
+    """
+    Aggregate the events of one batch file into plain, JSON-ready totals
+
+    Args:
+        path: Batch file path
+        course_lookup: Dictionary of str(CourseID) to course code
+
+    Returns:
+        Dictionary with the events and skipped events of the file, the class
+        hours per [Day, Hour] and per course, the distinct [Day, CourseCode]
+        and [Hour, CourseCode] pairs and the distinct descriptions
+    """
+    counts = Counter()
+    course_hours = Counter()
+    day_courses = set()
+    hour_courses = set()
+    descriptions = set()
+    total_events = 0
+    skipped_events = 0
+
+    for chunk in iter_event_chunks(iter_file_events(path)):
+        class_hours, skipped = expand_class_hours(chunk, course_lookup)
+        total_events += len(chunk) - skipped
+        skipped_events += skipped
+        if class_hours.empty:
+            continue
+        for (day, hour), count in class_hours.groupby(['Day', 'Hour']).size().items():
+            counts[(day, int(hour))] += int(count)
+        for course_code, count in class_hours['CourseCode'].value_counts().items():
+            course_hours[course_code] += int(count)
+        day_courses.update(
+            class_hours[['Day', 'CourseCode']].drop_duplicates().itertuples(index=False, name=None)
+        )
+        hour_courses.update(
+            (int(hour), code)
+            for hour, code in class_hours[['Hour', 'CourseCode']].drop_duplicates().itertuples(index=False, name=None)
+        )
+        descriptions.update(class_hours['Description'].unique())
+
+    return {
+        'events': total_events,
+        'skipped': skipped_events,
+        'counts': [[day, hour, count] for (day, hour), count in sorted(counts.items())],
+        'course_hours': dict(sorted(course_hours.items())),
+        'day_courses': sorted([day, code] for day, code in day_courses),
+        'hour_courses': sorted([hour, code] for hour, code in hour_courses),
+        'descriptions': sorted(descriptions),
+    }
+
+
+def batch_file_contributions(paths, course_lookup):
+    """
+    Return batch_file_contribution() of each path; the unit of work a
+    process pool worker takes, one term directory at a time
+    """
+    return [batch_file_contribution(path, course_lookup) for path in paths]
+
+
+class HeatmapAggregates:
+    """
+    Persisted chart aggregates of every batch file, in heatmap_aggregates.json.
+
+    Each batch file's contribution (see batch_file_contribution()) is kept
+    with the size, modification time and content hash of the file, next to
+    running totals over all files. The distinct day/course, hour/course
+    pairs and descriptions are totalled as the number of files they occur
+    in, so a file's pairs can be taken out again. update() only reads the
+    batch files that were added, changed or removed since the last run and
+    adds or subtracts their contributions; the charts are drawn from the
+    totals. With no path the aggregates are only kept in memory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {}
+        self.lookup_hash = None
+        self.changed = False
+        self._reset_totals()
+        self._load()
+
+    def _reset_totals(self):
+        self.events = 0
+        self.skipped = 0
+        self.counts = Counter()
+        self.course_hours = Counter()
+        self.day_courses = Counter()
+        self.hour_courses = Counter()
+        self.descriptions = Counter()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except ValueError:
+            print(f"Ignoring unreadable aggregates in {self.path}")
+            return
+        if data.get('version') != AGGREGATES_VERSION:
+            return
+        self.files = data['files']
+        self.lookup_hash = data['lookup_hash']
+        totals = data['totals']
+        self.events = totals['events']
+        self.skipped = totals['skipped']
+        self.counts = Counter({(day, hour): count for day, hour, count in totals['counts']})
+        self.course_hours = Counter(totals['course_hours'])
+        self.day_courses = Counter({(day, code): files for day, code, files in totals['day_courses']})
+        self.hour_courses = Counter({(hour, code): files for hour, code, files in totals['hour_courses']})
+        self.descriptions = Counter(totals['descriptions'])
+
+    def _apply(self, contribution, sign):
+        def add(counter, key, amount):
+            counter[key] += sign * amount
+            if counter[key] <= 0:
+                del counter[key]
+
+        self.events += sign * contribution['events']
+        self.skipped += sign * contribution['skipped']
+        for day, hour, count in contribution['counts']:
+            add(self.counts, (day, hour), count)
+        for course_code, count in contribution['course_hours'].items():
+            add(self.course_hours, course_code, count)
+        for day, code in contribution['day_courses']:
+            add(self.day_courses, (day, code), 1)
+        for hour, code in contribution['hour_courses']:
+            add(self.hour_courses, (hour, code), 1)
+        for description in contribution['descriptions']:
+            add(self.descriptions, description, 1)
+
+    def update(self, batch_files, root_dir, course_lookup, executor=None):
+        """
+        Bring the totals up to date with the batch files on disk
+
+        Args:
+            batch_files: Paths of every batch file, see find_batch_files()
+            root_dir: Directory the stored paths are relative to
+            course_lookup: Dictionary of str(CourseID) to course code; when it
+                changes, every file is read again
+            executor: Optional process pool; the changed files of each term
+                directory are then read by a worker of their own. The
+                contributions are applied in file order either way, so the
+                totals are the same.
+
+        Returns:
+            Tuple of (files read, files removed, files unchanged)
+        """
+        lookup_hash = content_hash(course_lookup)
+        if lookup_hash != self.lookup_hash:
+            self.files = {}
+            self._reset_totals()
+            self.lookup_hash = lookup_hash
+            self.changed = True
+
+        unchanged = 0
+        seen = set()
+        to_read = []
+        for path in batch_files:
+            relative_path = os.path.relpath(path, root_dir).replace(os.sep, '/')
+            seen.add(relative_path)
+            stat = os.stat(path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            entry = self.files.get(relative_path)
+            if entry and entry['signature'] == signature:
+                unchanged += 1
                 continue
-        
-        total_events += batch_events
-        print(f"  Processed {batch_events} events")
-    else:
-        print(f"  Warning: No data list found in {batch_file}")
-
-# Convert to DataFrame for easier analysis
-df = pd.DataFrame(classes)
-
-print(f"Total events processed: {total_events}")
-print(f"Total class hours: {len(df)}")
-
-# Create pivot table for the heatmap
-days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-hours_range = list(range(8, 22))  # 8am to 9pm
-
-# Count classes by day and hour
-heatmap_data = pd.pivot_table(
-    df, 
-    values='CourseCode', 
-    index='Hour', 
-    columns='Day', 
-    aggfunc='count',
-    fill_value=0
-)
+            # Rewritten with the same content: only the signature is new
+            digest = file_hash(path)
+            self.changed = True
+            if entry and entry['hash'] == digest:
+                entry['signature'] = signature
+                unchanged += 1
+                continue
+            to_read.append((relative_path, path, signature, digest))
 
-# Reorder columns to standard week order
-heatmap_data = heatmap_data.reindex(columns=days_order)
+        if executor:
+            by_term = {}
+            for relative_path, path, _, _ in to_read:
+                by_term.setdefault(os.path.dirname(path), []).append(path)
+            futures = [
+                executor.submit(batch_file_contributions, paths, course_lookup) for paths in by_term.values()
+            ]
+            contributions = {}
+            for paths, future in zip(by_term.values(), futures):
+                contributions.update(zip(paths, future.result()))
+        else:
+            contributions = {path: batch_file_contribution(path, course_lookup) for _, path, _, _ in to_read}
 
-# Create a more complete heatmap with all hours
-complete_heatmap = pd.DataFrame(
-    index=hours_range,
-    columns=days_order,
-    data=0
-)
+        for relative_path, path, signature, digest in to_read:
+            entry = self.files.get(relative_path)
+            if entry:
+                self._apply(entry['contribution'], -1)
+            self._apply(contributions[path], 1)
+            self.files[relative_path] = {'signature': signature, 'hash': digest, 'contribution': contributions[path]}
+
+        removed = [relative_path for relative_path in self.files if relative_path not in seen]
+        for relative_path in removed:
+            self._apply(self.files.pop(relative_path)['contribution'], -1)
+            self.changed = True
+        return len(to_read), len(removed), unchanged
+
+    def term_aggregates(self):
+        """
+        Total the stored contributions per term directory
+
+        Returns:
+            Dictionary of term directory name to a HeatmapAggregates of its
+            batch files, in name order
+        """
+        terms = {}
+        for relative_path, entry in sorted(self.files.items()):
+            term_name = relative_path.split('/', 1)[0]
+            if term_name not in terms:
+                terms[term_name] = HeatmapAggregates()
+            terms[term_name]._apply(entry['contribution'], 1)
+        return terms
+
+    def tables(self):
+        """
+        Return the numbers behind the charts as plain rows, without pandas
+
+        Returns:
+            Dictionary of table name to a list of rows, the first row holding
+            the column names: class_hours per day and hour (zeros included for
+            HOURS_RANGE), courses_per_day, courses_per_hour and course_hours,
+            busiest course first
+        """
+        hours = sorted(set(HOURS_RANGE) | {hour for _, hour in self.counts})
+        courses_per_day = Counter(day for day, _ in self.day_courses)
+        courses_per_hour = Counter(hour for hour, _ in self.hour_courses)
+        return {
+            'class_hours': [['Day', 'Hour', 'Classes']] + [
+                [day, hour, self.counts.get((day, hour), 0)] for day in DAYS_ORDER for hour in hours
+            ],
+            'courses_per_day': [['Day', 'Courses']] + [[day, courses_per_day.get(day, 0)] for day in DAYS_ORDER],
+            'courses_per_hour': [['Hour', 'Courses']] + [
+                [hour, count] for hour, count in sorted(courses_per_hour.items())
+            ],
+            'course_hours': [['CourseCode', 'ClassHours']] + [
+                [code, hours] for code, hours in sorted(self.course_hours.items(), key=lambda item: (-item[1], item[0]))
+            ],
+        }
+
+    def save(self):
+        """
+        Write the aggregates if update() changed them
+
+        Returns:
+            Path of the aggregates file
+        """
+        if not self.changed:
+            return self.path
+        write_json(self.path, {
+            'version': AGGREGATES_VERSION,
+            'lookup_hash': self.lookup_hash,
+            'totals': {
+                'events': self.events,
+                'skipped': self.skipped,
+                'counts': [[day, hour, count] for (day, hour), count in sorted(self.counts.items())],
+                'course_hours': dict(sorted(self.course_hours.items())),
+                'day_courses': [[day, code, files] for (day, code), files in sorted(self.day_courses.items())],
+                'hour_courses': [[hour, code, files] for (hour, code), files in sorted(self.hour_courses.items())],
+                'descriptions': dict(sorted(self.descriptions.items())),
+            },
+            'files': dict(sorted(self.files.items())),
+        })
+        self.changed = False
+        return self.path
+
+    def to_aggregates(self):
+        """
+        Return the totals in the shape aggregate_class_hours() returns
+        """
+        import numpy as np
+        import pandas as pd
+
+        if self.counts:
+            counts = pd.Series(self.counts, dtype=np.int64)
+            counts.index.names = ['Day', 'Hour']
+        else:
+            counts = pd.Series(dtype=np.int64)
+        return {
+            'counts': counts.sort_index(),
+            'course_hours': pd.Series(self.course_hours, dtype=np.int64).sort_index(),
+            'day_courses': pd.DataFrame(sorted(self.day_courses), columns=['Day', 'CourseCode']),
+            'hour_courses': pd.DataFrame(sorted(self.hour_courses), columns=['Hour', 'CourseCode']),
+            'descriptions': set(self.descriptions),
+            'total_events': self.events,
+            'skipped_events': self.skipped,
+        }
+
+
+def import_plotting():
+    """
+    Import matplotlib and seaborn on the first chart that is drawn
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
 
-# Fill in the data we have
-for hour in heatmap_data.index:
-    for day in heatmap_data.columns:
-        if day in complete_heatmap.columns and hour in complete_heatmap.index:
-            complete_heatmap.at[hour, day] = heatmap_data.at[hour, day]
-
-# Plotting
-plt.figure(figsize=(14, 10))
-ax = sns.heatmap(
-    complete_heatmap,
-    cmap="YlOrRd",
-    linewidths=0.5,
-    annot=True,
-    fmt=".0f",
-    cbar_kws={'label': 'Number of Classes'}
+
+def plot_heatmap(aggregates, output_file):
+    plt, sns = import_plotting()
+    complete_heatmap = build_heatmap_matrix(aggregates['counts'])
+
+    # Plotting
+    plt.figure(figsize=(14, 10))
+    ax = sns.heatmap(
+        complete_heatmap,
+        cmap="YlOrRd",
+        linewidths=0.5,
+        annot=True,
+        fmt=".0f",
+        cbar_kws={'label': 'Number of Classes'}
+    )
+
+    # Format the plot
+    plt.title('Class Schedule Heatmap - Number of Classes by Day and Hour', fontsize=16)
+    plt.xlabel('Day of Week', fontsize=12)
+    plt.ylabel('Hour of Day (24h format)', fontsize=12)
+
+    # Save the figure
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+    return output_file
+
+
+def plot_classes_per_day(aggregates, output_file):
+    plt, sns = import_plotting()
+    plt.figure(figsize=(10, 6))
+    day_counts = aggregates['day_courses'].groupby('Day')['CourseCode'].nunique().reindex(DAYS_ORDER)
+    sns.barplot(x=day_counts.index, y=day_counts.values)
+    plt.title('Number of Unique Courses per Day', fontsize=16)
+    plt.xlabel('Day of Week', fontsize=12)
+    plt.ylabel('Number of Courses', fontsize=12)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+    return output_file
+
+
+def plot_classes_per_hour(aggregates, output_file):
+    plt, sns = import_plotting()
+    plt.figure(figsize=(10, 6))
+    hour_counts = aggregates['hour_courses'].groupby('Hour')['CourseCode'].nunique()
+    sns.barplot(x=hour_counts.index, y=hour_counts.values)
+    plt.title('Number of Unique Courses per Hour', fontsize=16)
+    plt.xlabel('Hour of Day (24h format)', fontsize=12)
+    plt.ylabel('Number of Courses', fontsize=12)
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+    return output_file
+
+
+def plot_top_courses(aggregates, output_file):
+    plt, sns = import_plotting()
+    plt.figure(figsize=(12, 6))
+    course_hours = aggregates['course_hours'].sort_values(ascending=False, kind='stable').head(10)
+    sns.barplot(x=course_hours.index, y=course_hours.values)
+    plt.title('Top 10 Courses with Most Class Hours', fontsize=16)
+    plt.xlabel('Course Code', fontsize=12)
+    plt.ylabel('Number of Class Hours', fontsize=12)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+    return output_file
+
+
+# (output name, file name, plotting function, label) of every chart, in the
+# order they are reported
+CHARTS = (
+    ('heatmap', 'class_schedule_heatmap.png', plot_heatmap, 'heatmap'),
+    ('per-day', 'classes_per_day.png', plot_classes_per_day, 'classes per day chart'),
+    ('per-hour', 'classes_per_hour.png', plot_classes_per_hour, 'classes per hour chart'),
+    ('top-courses', 'top_courses_by_hours.png', plot_top_courses, 'top courses chart'),
 )
+CHART_OUTPUTS = tuple(name for name, _, _, _ in CHARTS)
+# Written without pandas or matplotlib, see HeatmapAggregates.tables()
+DATA_OUTPUTS = ('summary', 'csv', 'json')
+DATA_FILE_NAME = 'heatmap_data.json'
+
+
+def draw_charts(aggregates, output_dir, executor=None, charts=CHART_OUTPUTS):
+    """
+    Draw the heatmap and the per-day, per-hour and top-course charts
+
+    Args:
+        aggregates: Dictionary returned by aggregate_class_hours()
+        output_dir: Directory the PNG files are written to
+        executor: Optional process pool to draw the charts on in parallel;
+            every chart is drawn by the same function either way
+        charts: Output names of the charts to draw, see CHART_OUTPUTS
+
+    Returns:
+        List of (label, output file or future of it), see report_charts()
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # The descriptions are only counted, so they are not sent to the workers
+    chart_data = {key: value for key, value in aggregates.items() if key != 'descriptions'}
+    results = []
+    for name, file_name, plot, label in CHARTS:
+        if name not in charts:
+            continue
+        output_file = os.path.join(output_dir, file_name)
+        if executor:
+            results.append((label, executor.submit(plot, chart_data, output_file)))
+        else:
+            results.append((label, plot(chart_data, output_file)))
+    return results
+
+
+def report_charts(results):
+    """
+    Wait for the charts of draw_charts() and print where they were saved
+    """
+    for label, result in results:
+        output_file = result if isinstance(result, str) else result.result()
+        print(f"Saved {label} to {output_file}")
+
+
+def save_charts(aggregates, output_dir, executor=None):
+    """
+    Save the heatmap and the per-day, per-hour and top-course charts
+
+    Args:
+        aggregates: Dictionary returned by aggregate_class_hours()
+        output_dir: Directory the PNG files are written to
+        executor: Optional process pool to draw the charts on in parallel
+    """
+    report_charts(draw_charts(aggregates, output_dir, executor))
+
+
+def write_csv_tables(tables, output_dir):
+    """
+    Write each table of HeatmapAggregates.tables() to output_dir/{name}.csv
+
+    Returns:
+        List of the CSV files written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = []
+    for name, rows in tables.items():
+        output_file = os.path.join(output_dir, f'{name}.csv')
+        with open(output_file, 'w', newline='') as f:
+            csv.writer(f).writerows(rows)
+        output_files.append(output_file)
+    return output_files
+
+
+def print_summary(store, tables):
+    class_hours = Counter()
+    for day, _, count in tables['class_hours'][1:]:
+        class_hours[day] += count
+    print(f"\n{'Day':<10} {'Class hours':>11} {'Courses':>8}")
+    for day, courses in tables['courses_per_day'][1:]:
+        print(f"{day:<10} {class_hours[day]:>11} {courses:>8}")
+    print(f"Total events: {store.events}, class hours: {sum(store.counts.values())}, courses: {len(store.course_hours)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Draw the class schedule heatmap and bar charts from the batch timetable files, "
+        "or write the numbers behind them."
+    )
+    parser.add_argument(
+        "outputs",
+        nargs="*",
+        help=f"Outputs to produce, from {', '.join(CHART_OUTPUTS + DATA_OUTPUTS)} and charts (default: "
+        "charts, i.e. all four). summary prints class hours and courses per day, csv and json write the "
+        "chart data; none of these three load matplotlib",
+    )
+    parser.add_argument(
+        "--data-only",
+        action="store_true",
+        help="Write the chart data as CSV and JSON instead of drawing charts",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=current_dir,
+        help="Directory for the charts and data files (default: next to this script)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help=f"Ignore {AGGREGATES_FILE_NAME} and read every batch file again",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes to read term directories and draw charts with (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--per-term",
+        action="store_true",
+        help="Also draw a chart set per term in term_charts/",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    outputs = set(args.outputs)
+    unknown = outputs - set(CHART_OUTPUTS + DATA_OUTPUTS + ('charts',))
+    if unknown:
+        parser.error(f"unknown outputs: {', '.join(sorted(unknown))}")
+    if args.data_only:
+        outputs.update(('csv', 'json'))
+    if 'charts' in outputs or not outputs:
+        outputs.discard('charts')
+        outputs.update(CHART_OUTPUTS)
+    args.outputs = outputs
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        run_analysis(args, executor)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def run_analysis(args, executor=None):
+    print("Loading course summary...")
+    # Load course ID to course code mapping
+    course_lookup = load_course_lookup(course_summary_file)
+
+    # Process all batch timetable files
+    print("Processing timetable data...")
+    batch_files = find_batch_files(timetables_dir)
+    print(f"Found {len(batch_files)} batch files to process")
+
+    # Only batch files changed since the last run are read
+    aggregates_file = os.path.join(timetables_dir, AGGREGATES_FILE_NAME)
+    if args.rebuild and os.path.exists(aggregates_file):
+        os.remove(aggregates_file)
+    store = HeatmapAggregates(aggregates_file)
+    read, removed, unchanged = store.update(batch_files, timetables_dir, course_lookup, executor)
+    print(f"  Read {read} changed batch files, dropped {removed} removed ones, {unchanged} unchanged")
+    print(f"Aggregates saved to {store.save()}")
+    if store.skipped:
+        print(f"  Warning: Skipped {store.skipped} events with missing or invalid fields")
+
+    print(f"Total events processed: {store.events}")
+    print(f"Total class hours: {sum(store.counts.values())}")
+
+    if args.outputs & set(DATA_OUTPUTS):
+        tables = store.tables()
+        if 'summary' in args.outputs:
+            print_summary(store, tables)
+        if 'csv' in args.outputs:
+            output_files = write_csv_tables(tables, args.output_dir)
+            print(f"Saved {len(output_files)} CSV tables to {args.output_dir}")
+        if 'json' in args.outputs:
+            output_file = os.path.join(args.output_dir, DATA_FILE_NAME)
+            os.makedirs(args.output_dir, exist_ok=True)
+            write_json(output_file, {
+                'events': store.events,
+                'skipped_events': store.skipped,
+                'sessions': len(store.descriptions),
+                **{name: [dict(zip(rows[0], row)) for row in rows[1:]] for name, rows in tables.items()},
+            })
+            print(f"Saved chart data to {output_file}")
+
+    charts = [name for name in CHART_OUTPUTS if name in args.outputs]
+    if charts:
+        aggregates = store.to_aggregates()
+        # Every chart set is handed to the pool before waiting for any of them
+        chart_sets = [(None, draw_charts(aggregates, args.output_dir, executor, charts))]
+        if args.per_term:
+            for term_name, term_store in store.term_aggregates().items():
+                term_dir = os.path.join(args.output_dir, 'term_charts', term_name)
+                chart_sets.append((term_name, draw_charts(term_store.to_aggregates(), term_dir, executor, charts)))
+        for term_name, results in chart_sets:
+            if term_name:
+                print(f"\nCharts for {term_name}:")
+            report_charts(results)
+        print(f"\nAnalysis complete! Images saved to: {args.output_dir}")
+
+    print(f"Total class sessions analyzed: {len(store.descriptions)}")
+    print(f"Total unique courses found: {len(store.course_hours)}")
+
 
-# Format the plot
-plt.title('Class Schedule Heatmap - Number of Classes by Day and Hour', fontsize=16)
-plt.xlabel('Day of Week', fontsize=12)
-plt.ylabel('Hour of Day (24h format)', fontsize=12)
-
-# Save the figure
-plt.tight_layout()
-output_file = os.path.join(current_dir, 'class_schedule_heatmap.png')
-plt.savefig(output_file, dpi=300)
-print(f"Saved heatmap to {output_file}")
-plt.close()
-
-# ADDITIONAL ANALYSIS: Classes per day
-plt.figure(figsize=(10, 6))
-day_counts = df.groupby('Day')['CourseCode'].nunique().reindex(days_order)
-sns.barplot(x=day_counts.index, y=day_counts.values)
-plt.title('Number of Unique Courses per Day', fontsize=16)
-plt.xlabel('Day of Week', fontsize=12)
-plt.ylabel('Number of Courses', fontsize=12)
-plt.xticks(rotation=45)
-plt.tight_layout()
-output_file = os.path.join(current_dir, 'classes_per_day.png')
-plt.savefig(output_file, dpi=300)
-print(f"Saved classes per day chart to {output_file}")
-plt.close()
-
-# ADDITIONAL ANALYSIS: Classes per hour
-plt.figure(figsize=(10, 6))
-hour_counts = df.groupby('Hour')['CourseCode'].nunique()
-sns.barplot(x=hour_counts.index, y=hour_counts.values)
-plt.title('Number of Unique Courses per Hour', fontsize=16)
-plt.xlabel('Hour of Day (24h format)', fontsize=12)
-plt.ylabel('Number of Courses', fontsize=12)
-plt.tight_layout()
-output_file = os.path.join(current_dir, 'classes_per_hour.png')
-plt.savefig(output_file, dpi=300)
-print(f"Saved classes per hour chart to {output_file}")
-plt.close()
-
-# NEW ANALYSIS: Top 10 courses with most class hours
-plt.figure(figsize=(12, 6))
-course_hours = df['CourseCode'].value_counts().head(10)
-sns.barplot(x=course_hours.index, y=course_hours.values)
-plt.title('Top 10 Courses with Most Class Hours', fontsize=16)
-plt.xlabel('Course Code', fontsize=12)
-plt.ylabel('Number of Class Hours', fontsize=12)
-plt.xticks(rotation=45)
-plt.tight_layout()
-output_file = os.path.join(current_dir, 'top_courses_by_hours.png')
-plt.savefig(output_file, dpi=300)
-print(f"Saved top courses chart to {output_file}")
-plt.close()
-
-print(f"\nAnalysis complete! Images saved to: {current_dir}")
-print(f"Total class sessions analyzed: {len(df['Description'].unique())}")
-print(f"Total unique courses found: {df['CourseCode'].nunique()}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import glob
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from data_manifest import write_data_manifest
+from timetable_events import iter_file_events, normalise_event
+
+ICS_DIR_NAME = "ics"
+LINE_SEPARATOR = "\r\n"
+# RFC 5545 lines are folded at 75 octets
+MAX_LINE_OCTETS = 75
+
+# Same calendar header and reminder as ics.js, so both exports look alike
+CALENDAR_START = [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Swinburne Timetable//ICS Generator//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+]
+CALENDAR_END = ["END:VCALENDAR"]
+ALARM = [
+    "BEGIN:VALARM",
+    "TRIGGER:-PT15M",
+    "ACTION:DISPLAY",
+    "DESCRIPTION:Reminder",
+    "END:VALARM",
+]
+
+
+def escape_text(text):
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def fold_line(line):
+    """
+    Fold a content line into 75-octet pieces, never splitting a UTF-8 character
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line
+    pieces = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        # Continuation lines start with a space, which counts towards the limit
+        limit = MAX_LINE_OCTETS - 1
+    return (LINE_SEPARATOR + " ").join(pieces)
+
+
+def local_time(day, clock):
+    """
+    Format a floating local date-time ("20250303T080000"); the calendar app
+    shows it at that wall-clock time, which is campus time for students
+    """
+    return f"{day.strftime('%Y%m%d')}T{clock.replace(':', '')}"
+
+
+def weekly_dates(first, last):
+    dates = []
+    day = first
+    while day <= last:
+        dates.append(day)
+        day += timedelta(weeks=1)
+    return dates
+
+
+def collect_sessions(events):
+    """
+    Group a course's events into weekly sessions, one per session type,
+    group, weekday, time and room
+
+    The dates of a session are the weeks inside the date ranges the
+    description gives for its room, plus any date the API actually listed.
+    Events are expected to be normalised.
+
+    Args:
+        events: Normalised events of one course
+
+    Returns:
+        List of session dictionaries with course, session, group, title,
+        description, room, start, end and the sorted list of dates
+    """
+    sessions = {}
+    for event in events:
+        if not event.get("SessionType") or not event.get("Locations"):
+            continue
+        event_day = date.fromisoformat(event["EventDate"][:10])
+        weekday = event_day.weekday()
+        start = event["EventStartTime"][11:19]
+        end = event["EventEndTime"][11:19]
+
+        for location in event["Locations"]:
+            key = (
+                event["SessionType"], event["GroupNumber"], weekday, start, end,
+                location["Room"], event["EventDescription"],
+            )
+            if key not in sessions:
+                dates = set()
+                for date_range in location["DateRanges"]:
+                    range_start = date.fromisoformat(date_range["Start"])
+                    range_end = date.fromisoformat(date_range["End"])
+                    first = range_start + timedelta(days=(weekday - range_start.weekday()) % 7)
+                    dates.update(weekly_dates(first, range_end))
+                sessions[key] = {
+                    "course": event["CourseCode"],
+                    "session": event["SessionType"],
+                    "group": event["GroupNumber"],
+                    "title": event["EventDescription"].split(";")[0].strip(),
+                    "description": event["EventDescription"],
+                    "room": location["Room"],
+                    "start": start,
+                    "end": end,
+                    "dates": dates,
+                }
+            if location["Room"] == event.get("Room"):
+                sessions[key]["dates"].add(event_day)
+
+    result = []
+    for session in sessions.values():
+        if session["dates"]:
+            session["dates"] = sorted(session["dates"])
+            result.append(session)
+    result.sort(key=lambda s: (s["session"], s["group"], s["dates"][0], s["start"], s["room"]))
+    return result
+
+
+def session_vevent(session, term_id, dtstamp):
+    """
+    Build one VEVENT that repeats weekly from the first to the last date of
+    a session, with an EXDATE for every week it skips (e.g. the mid-term break)
+
+    Returns:
+        List of content lines
+    """
+    first, last = session["dates"][0], session["dates"][-1]
+    skipped = sorted(set(weekly_dates(first, last)) - set(session["dates"]))
+    uid = "-".join([
+        str(term_id), session["course"], session["session"], session["group"],
+        first.strftime("%Y%m%d"), session["start"].replace(":", ""), session["room"],
+    ])
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@swinburne-timetable",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{local_time(first, session['start'])}",
+        f"DTEND:{local_time(first, session['end'])}",
+        f"SUMMARY:{escape_text(session['title'])}",
+        f"DESCRIPTION:{escape_text(session['description'])}",
+        f"LOCATION:{escape_text(session['room'])}",
+    ]
+    if last > first:
+        lines.append(f"RRULE:FREQ=WEEKLY;UNTIL={local_time(last, session['end'])}")
+    if skipped:
+        lines.append("EXDATE:" + ",".join(local_time(day, session["start"]) for day in skipped))
+    lines += ALARM
+    lines.append("END:VEVENT")
+    return lines
+
+
+def build_calendar(vevents):
+    """
+    Wrap VEVENT line lists into a calendar string with folded lines
+    """
+    lines = list(CALENDAR_START)
+    for vevent in vevents:
+        lines += vevent
+    lines += CALENDAR_END
+    return LINE_SEPARATOR.join(fold_line(line) for line in lines) + LINE_SEPARATOR
+
+
+def write_calendar(path, vevents):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(build_calendar(vevents))
+
+
+def write_course_calendars(term_dir, term_id, course_code, events, dtstamp):
+    """
+    Write {course}.ics with every session of a course and {course}_{group}.ics
+    per group ("TU1-01"), so a selection is a handful of small files
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+        term_id: Term ID, part of every UID
+        course_code: Course code
+        events: Events of the course
+        dtstamp: DTSTAMP value shared by all files of a run
+
+    Returns:
+        Number of VEVENTs written for the course
+    """
+    for event in events:
+        normalise_event(event)
+    events = [event for event in events if event.get("CourseCode") == course_code]
+    sessions = collect_sessions(events)
+
+    ics_dir = os.path.join(term_dir, ICS_DIR_NAME)
+    # Drop the files of groups that no longer exist, and of the course when
+    # it has no sessions left
+    stale_files = glob.glob(os.path.join(ics_dir, f"{course_code}_*.ics"))
+    stale_files.append(os.path.join(ics_dir, f"{course_code}.ics"))
+    for stale in stale_files:
+        if os.path.exists(stale):
+            os.remove(stale)
+    if not sessions:
+        return 0
+
+    os.makedirs(ics_dir, exist_ok=True)
+
+    by_group = defaultdict(list)
+    all_vevents = []
+    for session in sessions:
+        vevent = session_vevent(session, term_id, dtstamp)
+        by_group[f"{session['session']}-{session['group']}"].append(vevent)
+        all_vevents.append(vevent)
+
+    write_calendar(os.path.join(ics_dir, f"{course_code}.ics"), all_vevents)
+    for group_id, vevents in by_group.items():
+        write_calendar(os.path.join(ics_dir, f"{course_code}_{group_id}.ics"), vevents)
+    return len(all_vevents)
+
+
+def write_term_calendars(term_dir, term_id, course_codes=None):
+    """
+    Pre-build the calendars of every course of a term from its per-course files
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+        term_id: Term ID
+        course_codes: Only rebuild these courses, e.g. those a change feed
+            entry names; None for every course
+
+    Returns:
+        Tuple of (courses written, VEVENTs written)
+    """
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    courses = vevents = 0
+    if course_codes is None:
+        paths = glob.glob(os.path.join(term_dir, "*_timetable.json"))
+    else:
+        paths = [os.path.join(term_dir, f"{code}_timetable.json") for code in course_codes]
+    for path in sorted(paths):
+        file_name = os.path.basename(path)
+        if file_name.startswith("batch_") or not os.path.exists(path):
+            continue
+        course_code = file_name[: -len("_timetable.json")]
+        count = write_course_calendars(term_dir, term_id, course_code, list(iter_file_events(path)), dtstamp)
+        if count:
+            courses += 1
+            vevents += count
+    return courses, vevents
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-build weekly recurring ICS calendars per course and per course group."
+    )
+    parser.add_argument(
+        "term_dirs",
+        nargs="*",
+        help="Term directories (default: every course_timetables/term_* directory)",
+    )
+    args = parser.parse_args()
+
+    term_dirs = args.term_dirs or sorted(
+        glob.glob(os.path.join(os.path.dirname(__file__), "course_timetables", "term_*"))
+    )
+    for term_dir in term_dirs:
+        term_id = int(os.path.basename(os.path.normpath(term_dir)).split("_", 2)[1])
+        courses, vevents = write_term_calendars(term_dir, term_id)
+        print(f"Wrote calendars for {courses} courses ({vevents} weekly events) in {term_dir}")
+
+    manifest_file, changed, removed = write_data_manifest(os.path.dirname(os.path.abspath(__file__)))
+    print(f"Data manifest saved to {manifest_file} ({changed} changed, {removed} removed files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz siblings are written
+    brotli = None
+
+# Set once by the entry point with configure_output()
+OUTPUT_OPTIONS = {"compact": False, "precompress": False}
+
+PRECOMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def configure_output(compact=False, precompress=False):
+    """
+    Choose how write_json() writes every JSON output of the pipeline
+
+    Args:
+        compact: Write minified JSON instead of indent=4
+        precompress: Also write .gz (and .br when brotli is installed) siblings
+            that a static server can serve directly
+    """
+    OUTPUT_OPTIONS["compact"] = compact
+    OUTPUT_OPTIONS["precompress"] = precompress
+    if precompress and brotli is None:
+        print("Note: brotli is not installed, writing .gz files only")
+
+
+def dumps_json(data):
+    if OUTPUT_OPTIONS["compact"]:
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, indent=4)
+
+
+def write_json(path, data):
+    """
+    Write data as JSON in the configured format, with precompressed siblings.
+    Siblings left over from an earlier precompressed run are removed so they
+    can never be served with stale content.
+
+    Args:
+        path: Output file path
+        data: JSON-serialisable data
+
+    Returns:
+        Number of bytes written to the .json file
+    """
+    encoded = dumps_json(data).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(encoded)
+
+    if OUTPUT_OPTIONS["precompress"]:
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(encoded, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(encoded, quality=11))
+    else:
+        for suffix in PRECOMPRESSED_SUFFIXES:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return len(encoded)
+
+
+def remove_json(path):
+    """
+    Remove a JSON output together with its precompressed siblings
+
+    Args:
+        path: Path of the .json file
+    """
+    for file_path in (path,) + tuple(path + suffix for suffix in PRECOMPRESSED_SUFFIXES):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rewrite existing timetable JSON in the chosen output format."
+    )
+    parser.add_argument("--compact", action="store_true", help="Write minified JSON")
+    parser.add_argument(
+        "--precompress", action="store_true", help="Also write .gz/.br siblings"
+    )
+    parser.add_argument(
+        "--bundle", action="store_true", help="Write a columnar bundle.json per term"
+    )
+    parser.add_argument(
+        "--recurrences", action="store_true", help="Write a weekly recurrences.json per term"
+    )
+    args = parser.parse_args()
+    configure_output(args.compact, args.precompress)
+
+    from data_manifest import write_data_manifest
+    from timetable_bundle import BUNDLE_FILE_NAME, write_term_bundle
+    from timetable_recurrence import RECURRENCE_FILE_NAME, write_term_recurrences
+
+    current_dir = os.path.dirname(__file__)
+    paths = glob.glob(os.path.join(current_dir, "course_timetables", "term_*", "*.json"))
+    paths += glob.glob(os.path.join(current_dir, "api_data", "*.json"))
+    paths.append(os.path.join(current_dir, "course_summary.json"))
+
+    before = after = 0
+    for path in paths:
+        if not os.path.exists(path) or os.path.basename(path) in (BUNDLE_FILE_NAME, RECURRENCE_FILE_NAME):
+            continue
+        before += os.path.getsize(path)
+        with open(path, "r") as f:
+            data = json.load(f)
+        after += write_json(path, data)
+    print(f"Rewrote {len(paths)} files: {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+
+    for term_dir in sorted(glob.glob(os.path.join(current_dir, "course_timetables", "term_*"))):
+        parts = os.path.basename(term_dir).split("_", 2)
+        term = {"id": int(parts[1]), "code": parts[2]}
+        if args.bundle:
+            print(f"Wrote {write_term_bundle(term_dir, term)}")
+        if args.recurrences:
+            print(f"Wrote {write_term_recurrences(term_dir, term)}")
+
+    manifest_file, changed, removed = write_data_manifest(current_dir)
+    print(f"Wrote {manifest_file} ({changed} changed, {removed} removed files)")
+
+
+if __name__ == "__main__":
+    main()
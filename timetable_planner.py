@@ -0,0 +1,284 @@
+import argparse
+import glob
+import heapq
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from timetable_events import course_file_name, iter_file_events, normalise_event
+from timetable_output import write_json
+
+# A week is encoded as 7 days x 48 half-hour slots, one bit per slot
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+DEFAULT_LIMIT = 20
+DEFAULT_EARLY_HOUR = 9
+
+RANKINGS = {
+    # Lower is better; every component may only grow as groups are added,
+    # which is what lets find_selections() prune on the ranking
+    "days": lambda score: (score["days"], score["early_starts"]),
+    "early": lambda score: (score["early_starts"], score["days"]),
+}
+
+
+def slot_mask(event):
+    """
+    Encode the weekly time slots of one event as a bitset
+
+    Args:
+        event: Event dictionary with EventStartTime and EventEndTime
+
+    Returns:
+        Integer with one bit set per half-hour slot the event touches
+    """
+    start = datetime.strptime(event["EventStartTime"], "%Y-%m-%dT%H:%M:%S")
+    end = datetime.strptime(event["EventEndTime"], "%Y-%m-%dT%H:%M:%S")
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    last = -(-(end.hour * 60 + end.minute) // SLOT_MINUTES)  # Round partial slots up
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (start.weekday() * SLOTS_PER_DAY + first)
+
+
+def basic_type(session_type):
+    """
+    Strip the digits from a session type the way script.js does: "TU2" -> "TU"
+    """
+    return "".join(c for c in session_type if not c.isdigit())
+
+
+def find_term_dir(timetables_dir, term_id):
+    matches = glob.glob(os.path.join(timetables_dir, f"term_{term_id}_*"))
+    if not matches:
+        raise ValueError(f"No timetable directory for term {term_id}")
+    return matches[0]
+
+
+def load_course_groups(term_dir, course_code):
+    """
+    Collect the weekly slots of a course's lectures and of each of its groups
+
+    Lectures, and events whose description cannot be parsed, are always
+    attended, as in extractAvailableGroups() in script.js. Every other group
+    is a choice within its basic type (TU, LA, ...).
+
+    Args:
+        term_dir: term_{id}_{code} directory with per-course files
+        course_code: Course code
+
+    Returns:
+        Tuple of (bitset of the always-attended slots, dictionary of basic
+        type to {group ID ("TU1-01"): bitset})
+    """
+    path = os.path.join(term_dir, course_file_name(course_code))
+    if not os.path.exists(path):
+        raise ValueError(f"No timetable for {course_code} in {os.path.basename(term_dir)}")
+
+    fixed = 0
+    choices = defaultdict(lambda: defaultdict(int))
+    for event in iter_file_events(path):
+        normalise_event(event)
+        if event.get("CourseCode") != course_code:
+            continue
+        mask = slot_mask(event)
+        session_type = event.get("SessionType")
+        if not session_type or basic_type(session_type) == "LE":
+            fixed |= mask
+        else:
+            choices[basic_type(session_type)][f"{session_type}-{event['GroupNumber']}"] |= mask
+    return fixed, {kind: dict(groups) for kind, groups in choices.items()}
+
+
+def score_mask(mask, early_hour=DEFAULT_EARLY_HOUR):
+    """
+    Describe how a week looks: days on campus and days starting before early_hour
+    """
+    early_slots = early_hour * 60 // SLOT_MINUTES
+    early_mask = (1 << early_slots) - 1
+    days = early_starts = 0
+    for day in range(7):
+        day_slots = (mask >> (day * SLOTS_PER_DAY)) & DAY_MASK
+        if day_slots:
+            days += 1
+            if day_slots & early_mask:
+                early_starts += 1
+    return {"days": days, "early_starts": early_starts}
+
+
+def find_selections(courses, limit=DEFAULT_LIMIT, rank=None, early_hour=DEFAULT_EARLY_HOUR):
+    """
+    Enumerate clash-free group selections with a depth-first search.
+
+    Each choice (one course's tutorial groups, its lab groups, ...) is a list
+    of bitsets, so a clash check is a single AND. Groups of a choice with
+    identical slots are merged and reported as equivalents, the choice with
+    the fewest fitting groups is expanded first, and with a ranking the best
+    scoring groups are tried first and any branch that already scores worse
+    than the current top `limit` is cut.
+
+    Args:
+        courses: Dictionary of course key to the (fixed, choices) tuple from
+            load_course_groups()
+        limit: Number of selections to return; 0 for all of them
+        rank: None to return selections in search order, or a RANKINGS key
+        early_hour: Classes before this hour count as early starts
+
+    Returns:
+        Tuple of (list of selection dictionaries, list of course keys whose
+        always-attended slots clash with another course)
+    """
+    base = 0
+    lecture_clashes = []
+    for key, (fixed, _) in courses.items():
+        if base & fixed:
+            lecture_clashes.append(key)
+        base |= fixed
+    if lecture_clashes:
+        return [], lecture_clashes
+
+    # One variable per (course, basic type), with groups merged by their slots
+    variables = []
+    for key, (_, choices) in courses.items():
+        for kind, groups in sorted(choices.items()):
+            by_mask = defaultdict(list)
+            for group_id, mask in sorted(groups.items()):
+                by_mask[mask].append(group_id)
+            variables.append((key, kind, list(by_mask.items())))
+
+    rank_key = RANKINGS[rank] if rank else None
+    best = []  # Heap of (-rank, counter, selection) keeping the best `limit`
+    found = []
+    counter = 0
+
+    def worst_rank():
+        return tuple(-value for value in best[0][0])
+
+    def search(mask, remaining, chosen):
+        nonlocal counter
+        if rank_key and limit and len(best) >= limit:
+            if rank_key(score_mask(mask, early_hour)) >= worst_rank():
+                return False
+        if not remaining:
+            selection = {"mask": mask, "groups": dict(chosen)}
+            if rank_key:
+                value = rank_key(score_mask(mask, early_hour))
+                counter += 1
+                entry = (tuple(-v for v in value), counter, selection)
+                if limit and len(best) >= limit:
+                    heapq.heapreplace(best, entry)
+                else:
+                    heapq.heappush(best, entry)
+                return False
+            found.append(selection)
+            return bool(limit) and len(found) >= limit
+
+        # Expand the variable with the fewest groups that still fit
+        fitting = [
+            (index, [(m, ids) for m, ids in remaining[index][2] if not mask & m])
+            for index in range(len(remaining))
+        ]
+        index, options = min(fitting, key=lambda item: len(item[1]))
+        if not options:
+            return False
+        if rank_key:
+            # Every remaining choice has to add one of its groups, so its
+            # cheapest group bounds the final score from below
+            ranked = [
+                sorted(
+                    (rank_key(score_mask(mask | m, early_hour)), m, ids) for m, ids in group_options
+                )
+                for _, group_options in fitting
+            ]
+            if limit and len(best) >= limit and max(r[0][0] for r in ranked) >= worst_rank():
+                return False
+            # Try the groups that hurt the score least first, so the top
+            # `limit` fills with good selections early and prunes more
+            options = [(m, ids) for _, m, ids in ranked[index]]
+        key, kind, _ = remaining[index]
+        rest = remaining[:index] + remaining[index + 1:]
+        for option_mask, group_ids in options:
+            chosen.append(((key, kind), group_ids))
+            stop = search(mask | option_mask, rest, chosen)
+            chosen.pop()
+            if stop:
+                return True
+        return False
+
+    search(base, variables, [])
+    if rank_key:
+        found = [entry[2] for entry in sorted(best, key=lambda entry: tuple(-v for v in entry[0]) + (entry[1],))]
+
+    selections = []
+    for selection in found:
+        group_selections = {key: {"includedGroups": [], "equivalentGroups": {}} for key in courses}
+        for (key, kind), group_ids in selection["groups"].items():
+            group_selections[key]["includedGroups"].append(group_ids[0])
+            if len(group_ids) > 1:
+                group_selections[key]["equivalentGroups"][group_ids[0]] = group_ids[1:]
+        for selections_of_course in group_selections.values():
+            selections_of_course["includedGroups"].sort()
+        selections.append({
+            "score": score_mask(selection["mask"], early_hour),
+            "groupSelections": group_selections,
+        })
+    return selections, []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List clash-free tutorial/lab group selections for a set of courses."
+    )
+    parser.add_argument("term", type=int, help="Term ID")
+    parser.add_argument("courses", nargs="+", help="Course codes")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Selections to list (0 = all, which can be a very long list)")
+    parser.add_argument(
+        "--rank", choices=sorted(RANKINGS), default=None,
+        help="Order by fewest days on campus (days) or fewest early starts (early)",
+    )
+    parser.add_argument(
+        "--early-hour", type=int, default=DEFAULT_EARLY_HOUR,
+        help=f"Classes before this hour are early starts (default: {DEFAULT_EARLY_HOUR})",
+    )
+    parser.add_argument("--output", help="Write the selections as JSON for the web app")
+    args = parser.parse_args(argv)
+
+    timetables_dir = os.path.join(os.path.dirname(__file__), "course_timetables")
+    try:
+        term_dir = find_term_dir(timetables_dir, args.term)
+        courses = {
+            f"{code.upper()}_{args.term}": load_course_groups(term_dir, code.upper())
+            for code in args.courses
+        }
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return 1
+
+    selections, lecture_clashes = find_selections(courses, args.limit, args.rank, args.early_hour)
+    if lecture_clashes:
+        print(f"Lectures that cannot be attended together: {', '.join(lecture_clashes)}")
+    print(f"Found {len(selections)} clash-free selections" + (" (limit reached)" if args.limit and len(selections) == args.limit else ""))
+    for number, selection in enumerate(selections, start=1):
+        score = selection["score"]
+        groups = "  ".join(
+            f"{key.split('_')[0]}: {','.join(value['includedGroups']) or '-'}"
+            for key, value in selection["groupSelections"].items()
+        )
+        print(f"{number:>3}. {score['days']} days, {score['early_starts']} early  {groups}")
+
+    if args.output:
+        write_json(args.output, {
+            "term_id": args.term,
+            "courses": list(courses),
+            "rank": args.rank,
+            "selections": selections,
+        })
+        print(f"Selections saved to {args.output}")
+    return 0 if selections else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
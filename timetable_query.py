@@ -0,0 +1,190 @@
+import argparse
+import os
+import sys
+
+from timetable_store import DAY_NAMES, connect, default_store_path, ingest
+
+EVENT_COLUMNS = (
+    "term_code", "event_date", "weekday", "start_time", "end_time", "course_code",
+    "session_type", "group_number", "room", "instructors",
+)
+
+
+def parse_weekday(value):
+    """
+    Turn a day name, prefix ("tue") or number (0 = Monday) into a weekday number
+    """
+    if value is None:
+        return None
+    if str(value).isdigit():
+        return int(value)
+    matches = [i for i, name in enumerate(DAY_NAMES) if name.lower().startswith(str(value).lower())]
+    if len(matches) != 1:
+        raise ValueError(f"Unknown day: {value}")
+    return matches[0]
+
+
+def build_filters(course=None, room=None, instructor=None, term_id=None, weekday=None, hour=None, date=None):
+    """
+    Build the WHERE clause shared by the queries
+
+    Args:
+        course: Course code
+        room: Room code, e.g. "G407"
+        instructor: Instructor name as it appears in the description
+        term_id: Term ID
+        weekday: Weekday number, 0 = Monday
+        hour: Only events running at some point during this hour (24h)
+        date: Only events on this YYYY-MM-DD date
+
+    Returns:
+        Tuple of (SQL condition, parameters)
+    """
+    conditions = []
+    params = []
+    if course:
+        conditions.append("e.course_code = ?")
+        params.append(course)
+    if room:
+        conditions.append("e.room = ?")
+        params.append(room)
+    if instructor:
+        conditions.append("e.id IN (SELECT event_rowid FROM event_instructors WHERE instructor = ?)")
+        params.append(instructor)
+    if term_id is not None:
+        conditions.append("e.term_id = ?")
+        params.append(term_id)
+    if weekday is not None:
+        conditions.append("e.weekday = ?")
+        params.append(weekday)
+    if hour is not None:
+        # start_hour <= hour narrows the search through the (weekday, start_hour) index
+        conditions.append("e.start_hour <= ? AND e.start_time < ? AND e.end_time > ?")
+        params.extend([hour, f"{hour + 1:02d}:00", f"{hour:02d}:00"])
+    if date:
+        conditions.append("e.event_date = ?")
+        params.append(date)
+    return " AND ".join(conditions) or "1", params
+
+
+def find_events(connection, **filters):
+    """
+    Return the event occurrences matching the filters, in date and time order
+
+    Args:
+        connection: Open event store
+        **filters: Keyword arguments of build_filters()
+
+    Returns:
+        List of dictionaries with the EVENT_COLUMNS
+    """
+    where, params = build_filters(**filters)
+    rows = connection.execute(
+        f"SELECT {', '.join('e.' + c for c in EVENT_COLUMNS)} FROM events e "
+        f"WHERE {where} ORDER BY e.event_date, e.start_time, e.course_code",
+        params,
+    )
+    return [dict(row) for row in rows]
+
+
+def find_sessions(connection, **filters):
+    """
+    Return the distinct class sessions (course, session type and group) of
+    the matching events, with how often and between which dates they run
+
+    Args:
+        connection: Open event store
+        **filters: Keyword arguments of build_filters()
+
+    Returns:
+        List of dictionaries with term_code, course_code, session_type,
+        group_number, occurrences, first_date and last_date
+    """
+    where, params = build_filters(**filters)
+    rows = connection.execute(
+        "SELECT e.term_code, e.course_code, e.session_type, e.group_number, "
+        "COUNT(*) AS occurrences, MIN(e.event_date) AS first_date, MAX(e.event_date) AS last_date "
+        f"FROM events e WHERE {where} "
+        "GROUP BY e.term_id, e.course_code, e.session_type, e.group_number "
+        "ORDER BY e.term_code, e.course_code, e.session_type, e.group_number",
+        params,
+    )
+    return [dict(row) for row in rows]
+
+
+def print_events(events):
+    for event in events:
+        print(
+            f"{event['event_date']} {DAY_NAMES[event['weekday']][:3]} "
+            f"{event['start_time']}-{event['end_time']}  "
+            f"{event['course_code'] or '?':<10} {event['session_type'] or '':<4} {event['group_number'] or '':<3} "
+            f"{event['room'] or '':<10} {event['instructors'] or ''}"
+        )
+    print(f"{len(events)} events")
+
+
+def print_sessions(sessions):
+    for session in sessions:
+        print(
+            f"{session['term_code']:<16} {session['course_code'] or '?':<10} "
+            f"{session['session_type'] or '':<4} {session['group_number'] or '':<3} "
+            f"{session['occurrences']:>3}x  {session['first_date']} to {session['last_date']}"
+        )
+    print(f"{len(sessions)} sessions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Query the SQLite timetable event store, e.g. --room G407 --day tue"
+    )
+    parser.add_argument("--db", default=None, help="Database file (default: course_timetables/timetable.db)")
+    parser.add_argument("--refresh", action="store_true", help="Ingest new or changed batch files first")
+    parser.add_argument("--course", help="Course code")
+    parser.add_argument("--room", help="Room code")
+    parser.add_argument("--instructor", help="Instructor name")
+    parser.add_argument("--term", type=int, help="Term ID")
+    parser.add_argument("--day", help="Day name, prefix or number (0 = Monday)")
+    parser.add_argument("--hour", type=int, help="Only events running during this hour (24h)")
+    parser.add_argument("--date", help="Only events on this date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--sessions", action="store_true", help="List distinct sessions instead of every occurrence"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        weekday = parse_weekday(args.day)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db_path = args.db or default_store_path()
+    if not args.refresh and not os.path.exists(db_path):
+        print(f"No event store at {db_path}; run timetable_store.py or pass --refresh")
+        return 1
+
+    connection = connect(db_path)
+    try:
+        if args.refresh:
+            timetables_dir = os.path.join(os.path.dirname(__file__), "course_timetables")
+            totals = ingest(connection, timetables_dir)
+            print(f"Ingested {totals['ingested']} batch files ({totals['events']} events)")
+
+        filters = {
+            "course": args.course,
+            "room": args.room,
+            "instructor": args.instructor,
+            "term_id": args.term,
+            "weekday": weekday,
+            "hour": args.hour,
+            "date": args.date,
+        }
+        if args.sessions:
+            print_sessions(find_sessions(connection, **filters))
+        else:
+            print_events(find_events(connection, **filters))
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
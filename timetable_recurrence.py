@@ -0,0 +1,201 @@
+import os
+from datetime import date, timedelta
+
+from timetable_bundle import read_term_events
+from timetable_events import NORMALISED_FIELDS, normalise_event
+from timetable_output import write_json
+
+RECURRENCE_FILE_NAME = "recurrences.json"
+RECURRENCE_FORMAT = "weekly-v1"
+
+OCCURRENCE_FIELDS = ("EventDate", "EventStartTime", "EventEndTime")
+
+
+def series_key(event):
+    """
+    Return what weekly repeats of a class have in common, or None when the
+    event cannot be part of a series (a date with a time, or a class that
+    starts or ends on another day)
+    """
+    event_date = event.get("EventDate") or ""
+    start = event.get("EventStartTime") or ""
+    end = event.get("EventEndTime") or ""
+    if not event_date.endswith("T00:00:00") or start[:10] != event_date[:10] or end[:10] != event_date[:10]:
+        return None
+    fields = {k: v for k, v in event.items() if k not in OCCURRENCE_FIELDS and k not in NORMALISED_FIELDS}
+    weekday = date.fromisoformat(event_date[:10]).weekday()
+    return (weekday, start[11:], end[11:], tuple(sorted((k, repr(v)) for k, v in fields.items())))
+
+
+def compact_events(events):
+    """
+    Collapse the one-entry-per-date events of IsAllWeek responses into
+    weekly recurrences. A series runs every week from FirstDate to LastDate
+    except on its ExceptDates (for example the mid-term break).
+
+    Args:
+        events: List of DataList events
+
+    Returns:
+        Dictionary with "Recurrences", "Singles" for events that do not fit a
+        series, and "Order" when expand_events() would not restore the
+        original order on its own
+    """
+    normalised = bool(events) and "CourseCode" in events[0]
+    series_by_key = {}
+    series = []
+    singles = []
+
+    for event in events:
+        key = series_key(event)
+        if key is None:
+            singles.append(event)
+            continue
+        day = event["EventDate"][:10]
+        # The same class can be listed twice on one date; the copy starts another series
+        candidates = series_by_key.setdefault(key, [])
+        for entry in candidates:
+            if day not in entry["dates"]:
+                break
+        else:
+            entry = {"key": key, "event": event, "dates": set()}
+            candidates.append(entry)
+            series.append(entry)
+        entry["dates"].add(day)
+
+    recurrences = []
+    for entry in series:
+        weekday, start, end, _ = entry["key"]
+        dates = sorted(entry["dates"])
+        first, last = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+        weeks = (last - first).days // 7 + 1
+        weekly = [(first + timedelta(weeks=week)).isoformat() for week in range(weeks)]
+        template = {
+            k: v for k, v in entry["event"].items()
+            if k not in OCCURRENCE_FIELDS and k not in NORMALISED_FIELDS
+        }
+        recurrences.append({
+            "Weekday": weekday,
+            "StartTime": start,
+            "EndTime": end,
+            "FirstDate": dates[0],
+            "LastDate": dates[-1],
+            "ExceptDates": sorted(set(weekly) - entry["dates"]),
+            "Event": template,
+        })
+
+    compacted = {
+        "format": RECURRENCE_FORMAT,
+        "count": len(events),
+        "normalised": normalised,
+        "Recurrences": recurrences,
+        "Singles": singles,
+    }
+
+    # Store the order explicitly only when sorting by start time is not enough
+    expanded = expand_events(compacted)
+    if expanded != events:
+        positions = {}
+        for index, event in enumerate(expanded):
+            positions.setdefault(repr(sorted(event.items())), []).append(index)
+        compacted["Order"] = [positions[repr(sorted(event.items()))].pop(0) for event in events]
+    return compacted
+
+
+def iter_recurrence_events(recurrence):
+    """
+    Yield the events of one weekly recurrence in date order
+
+    Args:
+        recurrence: One entry of the "Recurrences" list
+
+    Yields:
+        Event dictionaries without the normalised fields
+    """
+    first = date.fromisoformat(recurrence["FirstDate"])
+    last = date.fromisoformat(recurrence["LastDate"])
+    excepted = set(recurrence["ExceptDates"])
+    day = first
+    while day <= last:
+        iso_day = day.isoformat()
+        if iso_day not in excepted:
+            event = {
+                "EventDate": f"{iso_day}T00:00:00",
+                "EventStartTime": f"{iso_day}T{recurrence['StartTime']}",
+                "EventEndTime": f"{iso_day}T{recurrence['EndTime']}",
+            }
+            event.update(recurrence["Event"])
+            yield event
+        day += timedelta(weeks=1)
+
+
+def expand_events(compacted):
+    """
+    Restore the events stored by compact_events()
+
+    Args:
+        compacted: Dictionary returned by compact_events()
+
+    Returns:
+        List of events with the original keys, values and order
+    """
+    events = []
+    for recurrence in compacted["Recurrences"]:
+        for event in iter_recurrence_events(recurrence):
+            # Field order as the API sends it: occurrence fields after Id
+            ordered = {}
+            if "Id" in event:
+                ordered["Id"] = event["Id"]
+            ordered.update(event)
+            if compacted.get("normalised"):
+                normalise_event(ordered)
+            events.append(ordered)
+    events.extend(compacted["Singles"])
+    # Stable sort: within one start time the series keep their first-seen order
+    events.sort(key=lambda event: event.get("EventStartTime") or "")
+
+    if "Order" in compacted:
+        events = [events[index] for index in compacted["Order"]]
+    return events
+
+
+def compact_timetable(timetable_data):
+    """
+    Compact a batch or course response, keeping its other top-level fields
+    """
+    compacted = {k: v for k, v in timetable_data.items() if k != "DataList"}
+    compacted.update(compact_events(timetable_data.get("DataList") or []))
+    return compacted
+
+
+def expand_timetable(compacted):
+    """
+    Turn a compacted response back into one with a DataList
+    """
+    timetable_data = {
+        k: v for k, v in compacted.items()
+        if k not in ("format", "count", "normalised", "Recurrences", "Singles", "Order")
+    }
+    timetable_data["DataList"] = expand_events(compacted)
+    return timetable_data
+
+
+def write_term_recurrences(term_dir, term):
+    """
+    Write the weekly recurrences of all events of a term, in start time order
+
+    Args:
+        term_dir: Path to a course_timetables/term_* directory
+        term: Term dictionary with id, name and code
+
+    Returns:
+        Path of the recurrence file
+    """
+    events = read_term_events(term_dir)
+    events.sort(key=lambda event: event.get("EventStartTime") or "")
+    compacted = compact_events(events)
+    compacted["term_id"] = term["id"]
+    compacted["term_code"] = term["code"]
+    recurrence_file = os.path.join(term_dir, RECURRENCE_FILE_NAME)
+    write_json(recurrence_file, compacted)
+    return recurrence_file
@@ -0,0 +1,245 @@
+import argparse
+import glob
+import os
+import sqlite3
+from datetime import datetime
+
+from timetable_events import iter_file_events, normalise_event
+
+STORE_FILE_NAME = "timetable.db"
+SCHEMA_VERSION = 1
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_files (
+    path TEXT PRIMARY KEY,
+    term_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    events INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    source_path TEXT NOT NULL REFERENCES source_files(path) ON DELETE CASCADE,
+    event_id INTEGER,
+    term_id INTEGER NOT NULL,
+    term_code TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    weekday INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    start_hour INTEGER NOT NULL,
+    end_hour INTEGER NOT NULL,
+    course_code TEXT COLLATE NOCASE,
+    session_type TEXT,
+    group_number TEXT,
+    room TEXT COLLATE NOCASE,
+    instructors TEXT,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS event_instructors (
+    event_rowid INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    instructor TEXT NOT NULL COLLATE NOCASE
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_course ON events(course_code);
+CREATE INDEX IF NOT EXISTS idx_events_room ON events(room);
+CREATE INDEX IF NOT EXISTS idx_events_term ON events(term_id);
+CREATE INDEX IF NOT EXISTS idx_events_weekday_hour ON events(weekday, start_hour);
+CREATE INDEX IF NOT EXISTS idx_events_source ON events(source_path);
+CREATE INDEX IF NOT EXISTS idx_event_instructors_name ON event_instructors(instructor);
+CREATE INDEX IF NOT EXISTS idx_event_instructors_event ON event_instructors(event_rowid);
+"""
+
+
+def default_store_path():
+    return os.path.join(os.path.dirname(__file__), "course_timetables", STORE_FILE_NAME)
+
+
+def connect(db_path=None):
+    """
+    Open the event store, creating its tables and indexes if needed
+
+    Args:
+        db_path: SQLite file (default: course_timetables/timetable.db)
+
+    Returns:
+        sqlite3.Connection whose rows can be read by column name
+    """
+    connection = sqlite3.connect(db_path or default_store_path())
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        raise ValueError(f"Unsupported event store schema version {version}")
+    connection.executescript(SCHEMA)
+    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+def event_row(event, term_id, term_code):
+    """
+    Flatten a normalised event into the values of an events row
+
+    Args:
+        event: Event dictionary, normalised with normalise_event()
+        term_id: Term ID of the directory the event was read from
+        term_code: Term code of that directory
+
+    Returns:
+        Tuple of column values in the order used by ingest_file()
+    """
+    event_date = datetime.strptime(event["EventDate"], "%Y-%m-%dT%H:%M:%S")
+    start = datetime.strptime(event["EventStartTime"], "%Y-%m-%dT%H:%M:%S")
+    end = datetime.strptime(event["EventEndTime"], "%Y-%m-%dT%H:%M:%S")
+    return (
+        event.get("Id"),
+        term_id,
+        term_code,
+        event_date.strftime("%Y-%m-%d"),
+        event_date.weekday(),
+        start.strftime("%H:%M"),
+        end.strftime("%H:%M"),
+        start.hour,
+        end.hour,
+        event.get("CourseCode"),
+        event.get("SessionType"),
+        event.get("GroupNumber"),
+        event.get("Room"),
+        ", ".join(event.get("Instructors") or []),
+        event.get("EventDescription"),
+    )
+
+
+def ingest_file(connection, path, source, term_id, term_code):
+    """
+    Replace the rows of one batch file with its current events
+
+    Args:
+        connection: Open event store
+        path: Batch file path
+        source: Path of the batch file relative to course_timetables, which
+            identifies its rows
+        term_id: Term ID the batch belongs to
+        term_code: Term code the batch belongs to
+
+    Returns:
+        Tuple of (events stored, events skipped because of invalid fields)
+    """
+    stat = os.stat(path)
+    connection.execute("DELETE FROM source_files WHERE path = ?", (source,))
+    connection.execute(
+        "INSERT INTO source_files (path, term_id, size, mtime, events) VALUES (?, ?, ?, ?, 0)",
+        (source, term_id, stat.st_size, stat.st_mtime),
+    )
+
+    stored = skipped = 0
+    for event in iter_file_events(path):
+        try:
+            normalise_event(event)
+            row = event_row(event, term_id, term_code)
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            continue
+        cursor = connection.execute(
+            """
+            INSERT INTO events (
+                source_path, event_id, term_id, term_code, event_date, weekday,
+                start_time, end_time, start_hour, end_hour, course_code,
+                session_type, group_number, room, instructors, description
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (source,) + row,
+        )
+        connection.executemany(
+            "INSERT INTO event_instructors (event_rowid, instructor) VALUES (?, ?)",
+            [(cursor.lastrowid, name) for name in event.get("Instructors") or []],
+        )
+        stored += 1
+
+    connection.execute("UPDATE source_files SET events = ? WHERE path = ?", (stored, source))
+    return stored, skipped
+
+
+def ingest(connection, timetables_dir, force=False):
+    """
+    Load every batch file under timetables_dir into the store. Files whose
+    size and modification time match the previous ingestion are skipped, and
+    rows of batch files that no longer exist are removed.
+
+    Args:
+        connection: Open event store
+        timetables_dir: The course_timetables directory
+        force: Re-ingest every file
+
+    Returns:
+        Dictionary with files ingested, files unchanged, files removed,
+        events stored and events skipped
+    """
+    known = {
+        row["path"]: (row["size"], row["mtime"])
+        for row in connection.execute("SELECT path, size, mtime FROM source_files")
+    }
+    totals = {"ingested": 0, "unchanged": 0, "removed": 0, "events": 0, "skipped": 0}
+    seen = set()
+
+    with connection:
+        for term_dir in sorted(glob.glob(os.path.join(timetables_dir, "term_*"))):
+            parts = os.path.basename(term_dir).split("_", 2)
+            if len(parts) < 3 or not parts[1].isdigit():
+                continue
+            term_id, term_code = int(parts[1]), parts[2]
+
+            for path in sorted(glob.glob(os.path.join(term_dir, "batch_*_timetable.json"))):
+                source = os.path.relpath(path, timetables_dir)
+                seen.add(source)
+                stat = os.stat(path)
+                if not force and known.get(source) == (stat.st_size, stat.st_mtime):
+                    totals["unchanged"] += 1
+                    continue
+                stored, skipped = ingest_file(connection, path, source, term_id, term_code)
+                totals["ingested"] += 1
+                totals["events"] += stored
+                totals["skipped"] += skipped
+
+        for source in set(known) - seen:
+            connection.execute("DELETE FROM source_files WHERE path = ?", (source,))
+            totals["removed"] += 1
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load the batch timetable files into a SQLite event store."
+    )
+    parser.add_argument("--db", default=None, help=f"Database file (default: course_timetables/{STORE_FILE_NAME})")
+    parser.add_argument(
+        "--timetables-dir",
+        default=os.path.join(os.path.dirname(__file__), "course_timetables"),
+        help="Directory holding the term_* directories",
+    )
+    parser.add_argument("--force", action="store_true", help="Re-ingest files that have not changed")
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    try:
+        totals = ingest(connection, args.timetables_dir, args.force)
+        stored = connection.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    finally:
+        connection.close()
+
+    print(
+        f"Ingested {totals['ingested']} batch files ({totals['events']} events), "
+        f"{totals['unchanged']} unchanged, {totals['removed']} removed"
+    )
+    if totals["skipped"]:
+        print(f"Skipped {totals['skipped']} events with missing or invalid fields")
+    print(f"Event store now holds {stored} events")
+
+
+if __name__ == "__main__":
+    main()